@@ -1,16 +1,176 @@
-from sqlalchemy import create_engine
+import os
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./linkedin_ai.db"
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./linkedin_ai.db")
+# optional replica for read-only analytics queries; defaults to the primary
+SQLALCHEMY_READ_DATABASE_URL = os.getenv("DATABASE_READ_URL", SQLALCHEMY_DATABASE_URL)
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+# SQLite tuning
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "20000"))
+
+# server database pool sizing (PostgreSQL)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+
+
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def to_async_url(url: str) -> str:
+    """
+    Same database through an asyncio driver (aiosqlite / asyncpg), whatever
+    sync driver the URL names (sqlite+pysqlite, postgresql+psycopg2, ...).
+    """
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend == "postgres":  # Heroku-style alias
+        backend = "postgresql"
+    driver = ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        return url
+    return parsed.set(drivername=f"{backend}+{driver}").render_as_string(hide_password=False)
+
+def is_sqlite(url: str) -> bool:
+    return make_url(url).get_backend_name() == "sqlite"
+
+def dialect_insert(db, model):
+    """INSERT for the session's backend, with on_conflict_do_nothing / on_conflict_do_update."""
+    if db.get_bind().dialect.name == "postgresql":
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
+def engine_options(url: str) -> dict:
+    """create_engine kwargs for the backend behind `url`."""
+    if is_sqlite(url):
+        # busy waits are handled by the busy_timeout pragma below
+        return {"connect_args": {"check_same_thread": False, "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+
+def configure_engine(sync_engine, read_only: bool = False):
+    """
+    Per-connection setup. SQLite gets WAL (readers never block the writer),
+    synchronous=NORMAL (safe with WAL, far fewer fsyncs), a busy timeout so
+    concurrent writers wait instead of failing with "database is locked",
+    and mmap'd reads. Read-only engines refuse writes at the connection.
+    """
+    backend = sync_engine.dialect.name
+
+    @event.listens_for(sync_engine, "connect")
+    def _on_connect(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        try:
+            if backend == "sqlite":
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+                cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+                cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+                cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+                cursor.execute("PRAGMA temp_store=MEMORY")
+                if read_only:
+                    cursor.execute("PRAGMA query_only=ON")
+            elif backend == "postgresql" and read_only:
+                cursor.execute("SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY")
+        finally:
+            cursor.close()
+
+    return sync_engine
+
+# sync engine: background threads (scheduler, publish workers) and scripts
+engine = configure_engine(create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL)))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# async engine: request handlers, so DB waits don't tie up the threadpool
+async_engine = create_async_engine(to_async_url(SQLALCHEMY_DATABASE_URL), **engine_options(SQLALCHEMY_DATABASE_URL))
+configure_engine(async_engine.sync_engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
+# read-only async engine for analytics queries (a replica when DATABASE_READ_URL is set)
+async_read_engine = create_async_engine(
+    to_async_url(SQLALCHEMY_READ_DATABASE_URL), **engine_options(SQLALCHEMY_READ_DATABASE_URL)
+)
+configure_engine(async_read_engine.sync_engine, read_only=True)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
+# tables in the 0001 baseline revision, i.e. what the old create_all() startup produced
+BASELINE_REVISION = "0001"
+BASELINE_TABLES = (
+    "posts", "profiles", "analytics", "completion_cache", "analytics_rollup", "metric_points", "metric_buckets",
+)
+
+def init_db(tables=None):
+    """
+    Legacy schema sync: create missing tables, then any columns and indexes
+    added to existing tables since they were created. Only used to bring a
+    pre-Alembic database up to the baseline revision; see migrate_db().
+    """
+    selected = [t for t in Base.metadata.sorted_tables if tables is None or t.name in tables]
+    Base.metadata.create_all(bind=engine, tables=selected)
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in selected:
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    col_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+    for table in selected:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+
+ALEMBIC_INI = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "alembic.ini")
+
+def alembic_config():
+    from alembic.config import Config
+
+    config = Config(ALEMBIC_INI)
+    config.set_main_option("script_location", os.path.join(os.path.dirname(ALEMBIC_INI), "migrations"))
+    config.set_main_option("sqlalchemy.url", SQLALCHEMY_DATABASE_URL.replace("%", "%%"))
+    return config
+
+def migrate_db():
+    """
+    Upgrade the schema to the latest Alembic revision.
+    A database created by the old create_all() startup (tables but no
+    alembic_version) is first synced to the baseline tables and stamped at
+    the baseline revision, so the later migrations still run on it.
+    """
+    from alembic import command
+
+    config = alembic_config()
+    tables = set(inspect(engine).get_table_names())
+    if "posts" in tables and "alembic_version" not in tables:
+        init_db(BASELINE_TABLES)
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -0,0 +1,53 @@
+# app/import_posts.py
+"""
+Bulk-import posts (drafts, scheduled posts, historical metrics) from
+NDJSON or CSV files, the CLI twin of POST /content/import:
+
+    python -m app.import_posts backlog.ndjson
+    python -m app.import_posts history.csv.gz --dry-run
+
+Rows are matched on `external_id`, so re-running an import is safe.
+Scheduled rows are picked up by the running scheduler on its next wake-up.
+"""
+import os
+import sys
+import gzip
+import json
+import time
+import argparse
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def main():
+    from app.services import importer
+
+    parser = argparse.ArgumentParser(description="Bulk-import posts from NDJSON or CSV")
+    parser.add_argument("path", help="file to import (.ndjson, .jsonl, .csv, optionally .gz); - for stdin")
+    parser.add_argument("--format", choices=importer.FORMATS, help="default: from the file extension")
+    parser.add_argument("--dry-run", action="store_true", help="validate only")
+    parser.add_argument("--batch-size", type=int, default=importer.IMPORT_BATCH_SIZE)
+    args = parser.parse_args()
+
+    name = args.path[:-3] if args.path.endswith(".gz") else args.path
+    fmt = args.format or ("csv" if name.endswith(".csv") else "ndjson")
+
+    if os.getenv("AUTO_MIGRATE", "true").lower() == "true":
+        from app.database import migrate_db
+        migrate_db()
+
+    start = time.perf_counter()
+    if args.path == "-":
+        summary = importer.import_file(sys.stdin, fmt, args.dry_run, args.batch_size)
+    else:
+        opener = gzip.open if args.path.endswith(".gz") else open
+        with opener(args.path, "rt", encoding="utf-8-sig", newline="") as f:
+            summary = importer.import_file(f, fmt, args.dry_run, args.batch_size)
+    summary["seconds"] = round(time.perf_counter() - start, 1)
+    print(json.dumps(summary, indent=2))
+    return 1 if summary["invalid"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
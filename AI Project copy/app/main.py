@@ -1,18 +1,58 @@
+import os
+from contextlib import asynccontextmanager
+from dotenv import load_dotenv
+
+# load .env once, before any module reads its settings
+load_dotenv()
+
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 from app.routes import content, profile, auth, trends, analytics
-from app.models.models import Post
-from app.database import engine, Base
+from app.database import engine, async_engine, async_read_engine
+from app.services import llm_client
+from app.services.background import background_services, run_migrations
+from app.services.generation_jobs import generation_queue
+from app.services.metrics import MetricsMiddleware, instrument_engine, metrics_endpoint
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Startup/shutdown side effects live here rather than at import time, so
+    importing the app (tests, alembic, `uvicorn --workers N`) stays cheap.
+    Background services start in one designated process only; generation
+    job workers start in each.
+    """
+    # Apply Alembic migrations. Set AUTO_MIGRATE=false when deploys run
+    # `alembic upgrade head` themselves.
+    if os.getenv("AUTO_MIGRATE", "true").lower() == "true":
+        await run_in_threadpool(run_migrations)
+    await run_in_threadpool(background_services.start)
+    # generation job workers run in every web process; they share the jobs table
+    await generation_queue.start(content.run_generation_job)
+    yield
+    await generation_queue.stop()
+    await run_in_threadpool(background_services.stop)
+    if llm_client._client is not None:
+        await llm_client._client.aclose()
+    await async_engine.dispose()
+    await async_read_engine.dispose()
+
 
 app = FastAPI(
     title="LinkedIn Branding AI Agent",
     description="An AI agent that creates and posts LinkedIn content for personal branding",
     version="1.0.0",
     docs_url="/docs",      # Swagger UI
-    redoc_url="/redoc"     # Alternative docs UI
+    redoc_url="/redoc",    # Alternative docs UI
+    lifespan=lifespan
 )
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Prometheus metrics: request latency per route, SQL per route, LLM and scheduler
+for _engine in (engine, async_engine.sync_engine, async_read_engine.sync_engine):
+    instrument_engine(_engine)
+app.add_middleware(MetricsMiddleware)
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
 
 # Register routes
 app.include_router(content.router)
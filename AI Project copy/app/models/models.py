@@ -1,6 +1,15 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Boolean, Integer, BigInteger, String, Text, DateTime, Float, Index, ForeignKey, LargeBinary, event
+from sqlalchemy.dialects import sqlite
 from sqlalchemy.sql import func
 from app.database import Base
+from app.services.engagement import engagement_score
+
+# SQLite stores CURRENT_TIMESTAMP as "YYYY-MM-DD HH:MM:SS"; bind datetimes in the
+# same format so keyset comparisons on server-defaulted columns are exact.
+TimestampType = DateTime().with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite",
+)
 
 class Post(Base):
     __tablename__ = "posts"
@@ -9,10 +18,22 @@ class Post(Base):
     prompt = Column(Text, nullable=True)   # Fix: this is missing in your DB
     content = Column(Text, nullable=False)
     hashtags = Column(String, nullable=True)
-    status = Column(String, default="draft")  # draft, scheduled, posted
+    status = Column(String, default="draft")  # draft, scheduled, publishing, posted, failed
     scheduled_time = Column(DateTime, nullable=True)
     posted_at = Column(DateTime, nullable=True)
-    created_at = Column(DateTime, server_default=func.now())
+    claimed_at = Column(DateTime, nullable=True)  # set when the dispatcher moves it to "publishing"
+    publish_attempts = Column(Integer, default=0)
+    last_publish_error = Column(Text, nullable=True)
+    published_urn = Column(String, nullable=True)  # id returned by the publisher
+    created_at = Column(TimestampType, server_default=func.now())
+
+    __table_args__ = (
+        # keyset pagination for /content/list, with and without a status filter
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        Index("ix_posts_status_created_at_id", "status", "created_at", "id"),
+        # due-post claims and next-wakeup lookups
+        Index("ix_posts_status_scheduled_time", "status", "scheduled_time"),
+    )
 
 class Profile(Base):
     __tablename__ = "profiles"
@@ -22,13 +43,191 @@ class Profile(Base):
     headline = Column(String, nullable=True)
     about = Column(Text, nullable=True)
 
+def _default_engagement_score(context):
+    # computed from the row being inserted; also covers Core/bulk inserts
+    params = context.get_current_parameters()
+    return engagement_score(params.get("likes"), params.get("comments"), params.get("shares"))
+
 class Analytics(Base):
     __tablename__ = "analytics"
 
     id = Column(Integer, primary_key=True, index=True)
-    post_id = Column(Integer, nullable=False)
+    post_id = Column(Integer, ForeignKey("posts.id"), nullable=False, index=True)
     likes = Column(Integer, default=0)
     comments = Column(Integer, default=0)
     shares = Column(Integer, default=0)
     impressions = Column(Integer, default=0)
-    created_at = Column(DateTime, server_default=func.now())
+    engagement_score = Column(Float, default=_default_engagement_score)
+    created_at = Column(TimestampType, server_default=func.now())
+
+    __table_args__ = (
+        # top-K by score, with the time-window filter answered from the index
+        Index("ix_analytics_engagement_score_created_at", "engagement_score", "created_at"),
+    )
+
+@event.listens_for(Analytics, "before_update")
+def _refresh_engagement_score(mapper, connection, target):
+    target.engagement_score = engagement_score(target.likes, target.comments, target.shares)
+
+class CompletionCache(Base):
+    __tablename__ = "completion_cache"
+
+    key = Column(String(64), primary_key=True)  # sha256 of prompt/system/model/params
+    model = Column(String, nullable=True)
+    completion = Column(Text, nullable=False)
+    created_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    last_used_at = Column(DateTime, nullable=False, index=True)
+
+class AnalyticsRollup(Base):
+    __tablename__ = "analytics_rollup"
+
+    # single global row (id=1), updated incrementally whenever analytics are written
+    id = Column(Integer, primary_key=True)
+    post_count = Column(Integer, nullable=False, default=0)
+    total_likes = Column(Integer, nullable=False, default=0)
+    total_comments = Column(Integer, nullable=False, default=0)
+    total_shares = Column(Integer, nullable=False, default=0)
+    total_impressions = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, nullable=True)
+
+class MetricPoint(Base):
+    __tablename__ = "metric_points"
+
+    # raw cumulative engagement snapshots; clustered on (post_id, ts) so a
+    # post's range is one contiguous read
+    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
+    ts = Column(Integer, primary_key=True)  # unix seconds (UTC)
+    likes = Column(Integer, nullable=False, default=0)
+    comments = Column(Integer, nullable=False, default=0)
+    shares = Column(Integer, nullable=False, default=0)
+    impressions = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_metric_points_ts", "ts"),  # retention sweeps
+        {"sqlite_with_rowid": False},
+    )
+
+class MetricBucket(Base):
+    __tablename__ = "metric_buckets"
+
+    # downsampled series: last value seen in each hourly / daily bucket
+    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
+    resolution = Column(Integer, primary_key=True)  # bucket width in seconds
+    bucket_start = Column(Integer, primary_key=True)  # unix seconds
+    last_ts = Column(Integer, nullable=False)
+    samples = Column(Integer, nullable=False, default=1)
+    likes = Column(Integer, nullable=False, default=0)
+    comments = Column(Integer, nullable=False, default=0)
+    shares = Column(Integer, nullable=False, default=0)
+    impressions = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("ix_metric_buckets_resolution_start", "resolution", "bucket_start"),
+        {"sqlite_with_rowid": False},
+    )
+
+class LeaderLease(Base):
+    __tablename__ = "leader_leases"
+
+    # one row per elected role (e.g. "scheduler"); whoever holds an unexpired lease leads
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False)  # host:pid:nonce of the current leader
+    term = Column(Integer, nullable=False, default=1)  # bumped on every change of leader (fencing token)
+    acquired_at = Column(DateTime, nullable=False)
+    renewed_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+class TrendItem(Base):
+    __tablename__ = "trend_items"
+
+    id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), nullable=False, unique=True)  # sha256 of normalized title + summary
+    source = Column(String, nullable=True)  # feed path or URL it came from
+    title = Column(String, nullable=False)
+    url = Column(String, nullable=True)
+    summary = Column(Text, nullable=True)
+    keywords = Column(String, nullable=True)  # space-separated, most relevant first
+    published_at = Column(DateTime, nullable=False, index=True)
+    ingested_at = Column(DateTime, nullable=False)
+
+class TrendFeed(Base):
+    __tablename__ = "trend_feeds"
+
+    # per-feed fetch state, so unchanged feeds are skipped on the next run
+    url = Column(String, primary_key=True)
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)  # HTTP Last-Modified, or file mtime_ns
+    fetched_at = Column(DateTime, nullable=True)
+    items_seen = Column(Integer, nullable=False, default=0)
+    items_added = Column(Integer, nullable=False, default=0)
+
+class PostFingerprint(Base):
+    __tablename__ = "post_fingerprints"
+
+    # MinHash signature of the post content (see app/services/dedup.py)
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    signature = Column(LargeBinary, nullable=False)
+
+class PostLshBucket(Base):
+    __tablename__ = "post_lsh_buckets"
+
+    # LSH bands of each signature: posts sharing any (band, bucket) are near-duplicate candidates
+    band = Column(Integer, primary_key=True)
+    bucket = Column(BigInteger, primary_key=True)
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_post_lsh_buckets_post_id", "post_id"),  # re-indexing / deletes
+        {"sqlite_with_rowid": False},
+    )
+
+class Hashtag(Base):
+    __tablename__ = "hashtags"
+
+    id = Column(Integer, primary_key=True)
+    tag = Column(String, nullable=False, unique=True)  # case-folded, without '#'
+    display = Column(String, nullable=False)  # spelling as first seen, e.g. "PersonalBranding"
+
+class PostHashtag(Base):
+    __tablename__ = "post_hashtags"
+
+    # (hashtag_id, post_id) first: per-tag aggregates and "posts tagged X" read one key range
+    hashtag_id = Column(Integer, ForeignKey("hashtags.id", ondelete="CASCADE"), primary_key=True)
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+
+    __table_args__ = (
+        Index("ix_post_hashtags_post_id", "post_id"),
+        {"sqlite_with_rowid": False},
+    )
+
+class PostExternalId(Base):
+    __tablename__ = "post_external_ids"
+
+    # id the post has in the system it was imported from; makes re-imports idempotent
+    external_id = Column(String, primary_key=True)
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False, unique=True)
+    imported_at = Column(TimestampType, server_default=func.now())
+
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+
+    id = Column(String(32), primary_key=True)  # uuid4 hex, returned to the client
+    prompt = Column(Text, nullable=False)
+    no_cache = Column(Boolean, nullable=False, default=False)
+    status = Column(String, nullable=False, default="queued")  # queued, running, succeeded, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    callback_url = Column(String, nullable=True)
+    callback_status = Column(String, nullable=True)  # delivered, failed, refused
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="SET NULL"), nullable=True)
+    result = Column(Text, nullable=True)  # JSON body /content/generate would have returned
+    error = Column(Text, nullable=True)
+    # sub-second precision (not TimestampType): queue wait times are measured from these
+    created_at = Column(DateTime, nullable=False)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        # FIFO claims and queue-depth counts
+        Index("ix_generation_jobs_status_created_at", "status", "created_at"),
+    )
@@ -1,57 +1,53 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.database import get_db
+from datetime import datetime, timedelta
+from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db, get_async_read_db
 from app.models.models import Analytics, Post
-from app.services.mock_publisher import get_mock_analytics
+from app.services.analytics_rollup import get_rollup, rebuild_rollup
+from app.services.timeseries import record_metrics, query_series, to_epoch
+from app.services.hashtags import hashtag_performance, suggest_hashtags, SORTS
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
 @router.get("/")
-def get_analytics_summary(db: Session = Depends(get_db)):
+async def get_analytics_summary(refresh: bool = False, db: AsyncSession = Depends(get_async_db)):
     """
     Get analytics summary for all posts.
+    Served from the incrementally maintained rollup row, so this is O(1)
+    regardless of table size. Pass ?refresh=true to rebuild it with SQL aggregates.
     """
-    analytics_data = get_mock_analytics()
-    
-    if not analytics_data:
-        return {"message": "No analytics data available", "total_posts": 0}
-    
-    # If it's a list, calculate totals
-    if isinstance(analytics_data, list):
-        total_likes = sum(a.likes for a in analytics_data)
-        total_comments = sum(a.comments for a in analytics_data)
-        total_shares = sum(a.shares for a in analytics_data)
-        total_impressions = sum(a.impressions for a in analytics_data)
-        
-        return {
-            "total_posts": len(analytics_data),
-            "total_likes": total_likes,
-            "total_comments": total_comments,
-            "total_shares": total_shares,
-            "total_impressions": total_impressions,
-            "average_engagement": {
-                "likes": total_likes / len(analytics_data) if analytics_data else 0,
-                "comments": total_comments / len(analytics_data) if analytics_data else 0,
-                "shares": total_shares / len(analytics_data) if analytics_data else 0
-            }
-        }
+    if refresh:
+        rollup = await db.run_sync(rebuild_rollup)
+        await db.commit()
     else:
-        # Single analytics record
-        return {
-            "post_id": analytics_data.post_id,
-            "likes": analytics_data.likes,
-            "comments": analytics_data.comments,
-            "shares": analytics_data.shares,
-            "impressions": analytics_data.impressions
+        rollup = await db.run_sync(get_rollup)
+
+    count = rollup.post_count
+    if not count:
+        return {"message": "No analytics data available", "total_posts": 0}
+
+    return {
+        "total_posts": count,
+        "total_likes": rollup.total_likes,
+        "total_comments": rollup.total_comments,
+        "total_shares": rollup.total_shares,
+        "total_impressions": rollup.total_impressions,
+        "average_engagement": {
+            "likes": rollup.total_likes / count,
+            "comments": rollup.total_comments / count,
+            "shares": rollup.total_shares / count
         }
+    }
 
 @router.get("/post/{post_id}")
-def get_post_analytics(post_id: int, db: Session = Depends(get_db)):
+async def get_post_analytics(post_id: int, db: AsyncSession = Depends(get_async_read_db)):
     """
     Get analytics for a specific post.
     """
-    analytics = db.query(Analytics).filter(Analytics.post_id == post_id).first()
-    post = db.query(Post).filter(Post.id == post_id).first()
+    analytics = (await db.execute(select(Analytics).where(Analytics.post_id == post_id).limit(1))).scalar_one_or_none()
+    post = await db.get(Post, post_id)
     
     if not analytics:
         return {"message": "No analytics found for this post", "post_id": post_id}
@@ -67,29 +63,115 @@ def get_post_analytics(post_id: int, db: Session = Depends(get_db)):
         }
     }
 
+class MetricsIn(BaseModel):
+    likes: int = 0
+    comments: int = 0
+    shares: int = 0
+    impressions: int = 0
+    ts: datetime = None  # observation time, defaults to now (UTC)
+
+
+@router.post("/post/{post_id}/metrics")
+async def ingest_post_metrics(post_id: int, metrics: MetricsIn, db: AsyncSession = Depends(get_async_db)):
+    """
+    Append a cumulative engagement observation to the post's time series.
+    Hourly/daily buckets are updated at write time; the newest observation
+    also becomes the post's analytics snapshot.
+    """
+    if await db.scalar(select(Post.id).where(Post.id == post_id)) is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    ts = to_epoch(metrics.ts) if metrics.ts else None
+    values = metrics.model_dump(exclude={"ts"})
+    return await db.run_sync(record_metrics, post_id, values, ts)
+
+
+@router.get("/post/{post_id}/series")
+async def get_post_metric_series(
+    post_id: int,
+    start: datetime = None,
+    end: datetime = None,
+    resolution: str = "auto",
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Engagement curve for a post between `start` and `end` (default: last 30 days).
+    resolution: auto | raw | hour | day. `auto` picks the coarsest series that
+    still fits the span and hasn't been compacted by retention.
+    """
+    if resolution not in ("auto", "raw", "hour", "day"):
+        raise HTTPException(status_code=400, detail="resolution must be auto, raw, hour or day")
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(days=30)
+    return await db.run_sync(query_series, post_id, to_epoch(start), to_epoch(end), resolution)
+
+
 @router.get("/top-performing")
-def get_top_performing_posts(limit: int = 5, db: Session = Depends(get_db)):
+async def get_top_performing_posts(limit: int = 5, days: int = None, db: AsyncSession = Depends(get_async_read_db)):
     """
-    Get top performing posts based on engagement.
+    Get top performing posts based on the stored engagement score
+    (weights come from ENGAGEMENT_WEIGHTS, default likes + comments*2 + shares*3).
+    Optional `days` restricts to analytics recorded in the last N days.
     """
-    # Simple engagement score: likes + comments * 2 + shares * 3
-    top_posts = db.query(Analytics, Post).join(Post).order_by(
-        (Analytics.likes + Analytics.comments * 2 + Analytics.shares * 3).desc()
-    ).limit(limit).all()
-    
+    limit = max(1, min(limit, 100))
+    query = select(
+        Post.id,
+        func.substr(Post.content, 1, 100).label("preview"),
+        (func.length(Post.content) > 100).label("truncated"),
+        Analytics.likes,
+        Analytics.comments,
+        Analytics.shares,
+        Analytics.impressions,
+        Analytics.engagement_score
+    ).select_from(Analytics).join(Post, Post.id == Analytics.post_id)
+    if days is not None:
+        query = query.where(Analytics.created_at >= datetime.utcnow() - timedelta(days=days))
+    top_posts = (await db.execute(query.order_by(Analytics.engagement_score.desc()).limit(limit))).all()
+
     result = []
-    for analytics, post in top_posts:
-        engagement_score = analytics.likes + analytics.comments * 2 + analytics.shares * 3
+    for row in top_posts:
         result.append({
-            "post_id": post.id,
-            "post_preview": post.content[:100] + "..." if len(post.content or "") > 100 else (post.content or ""),
+            "post_id": row.id,
+            "post_preview": (row.preview or "") + ("..." if row.truncated else ""),
             "analytics": {
-                "likes": analytics.likes,
-                "comments": analytics.comments,
-                "shares": analytics.shares,
-                "impressions": analytics.impressions
+                "likes": row.likes,
+                "comments": row.comments,
+                "shares": row.shares,
+                "impressions": row.impressions
             },
-            "engagement_score": engagement_score
+            "engagement_score": row.engagement_score
         })
-    
-    return {"top_posts": result}
\ No newline at end of file
+
+    return {"top_posts": result}
+
+
+@router.get("/hashtags")
+async def get_hashtag_performance(
+    limit: int = 20,
+    days: int = None,
+    min_posts: int = 1,
+    sort: str = "avg_engagement",
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Engagement per hashtag, aggregated in SQL from the normalized
+    post_hashtags index (tags are case-folded, so #AI and #ai are one row).
+    sort: avg_engagement | total_engagement | posts. Optional `days` restricts
+    to analytics recorded in the last N days; `min_posts` hides rare tags.
+    """
+    if sort not in SORTS:
+        raise HTTPException(status_code=400, detail="sort must be avg_engagement, total_engagement or posts")
+    limit = max(1, min(limit, 100))
+    hashtags = await db.run_sync(hashtag_performance, limit, days, min_posts, sort)
+    return {"hashtags": hashtags}
+
+
+@router.get("/hashtags/suggestions")
+async def get_hashtag_suggestions(prompt: str = None, limit: int = 3, days: int = None,
+                                  db: AsyncSession = Depends(get_async_read_db)):
+    """
+    Hashtags to use for a new post: the best performers by average
+    engagement, with tags mentioned in `prompt` ranked first.
+    """
+    limit = max(1, min(limit, 20))
+    suggestions = await db.run_sync(suggest_hashtags, prompt, limit, days)
+    return {"suggestions": [row["hashtag"] for row in suggestions], "hashtags": suggestions}
@@ -1,9 +1,6 @@
 from fastapi import APIRouter, Request
 import requests
 import os
-from dotenv import load_dotenv
-
-load_dotenv()
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
 LINKEDIN_CLIENT_ID = os.getenv("LINKEDIN_CLIENT_ID")
@@ -1,54 +1,51 @@
 # app/routes/content.py
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app.database import get_db, SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel
+from typing import List, Optional
+from sqlalchemy import insert, select, update, func, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db, get_async_read_db, AsyncSessionLocal, AsyncReadSessionLocal
 from app.models.models import Post, Analytics
-import os, requests, random, datetime
-from apscheduler.schedulers.background import BackgroundScheduler
-from dotenv import load_dotenv
+from app.services.scheduler import SCHEDULABLE_STATUSES, scheduler_service
+from app.services import llm_client, llm_gateway
+from app.services.completion_cache import completion_cache, make_cache_key
+from app.services.metrics import GENERATIONS
+from app.services.search import search_posts
+from app.services.dedup import (
+    minhash, find_near_duplicate, screen_drafts, index_signatures, signature_for_post,
+    record_near_duplicate, blocks, PUBLISHED_STATUSES,
+)
+from app.services.hashtags import index_hashtags, suggested_hashtags_text
+from app.services.export import FORMATS, export_chunks, gzip_chunks
+from app.services import importer
+from app.services.generation_jobs import (
+    JobFailed, LONG_POLL_MAX_SECONDS, check_callback_url, generation_queue, job_view,
+)
+from starlette.concurrency import run_in_threadpool
+import os, io, json, zlib, base64, asyncio, datetime, tempfile
 
-load_dotenv()
-GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-GROQ_URL = "https://api.groq.com/openai/v1/chat/completions"  # keep if using Groq
+GROQ_MODEL = "llama3-8b-8192"
+SYSTEM_PROMPT = "You are a professional LinkedIn copywriter. Produce a concise LinkedIn post and suggest 3 hashtags."
+GENERATION_PARAMS = {"temperature": 0.7, "max_tokens": 500}
+BATCH_MAX_PROMPTS = int(os.getenv("BATCH_MAX_PROMPTS", "100"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
 
 router = APIRouter(prefix="/content", tags=["Content"])
 
-# Start background scheduler
-scheduler = BackgroundScheduler()
-scheduler.start()
-
 
 # ---------------------------
 # Helper: call Groq (or fallback)
 # ---------------------------
-def call_groq_chat(prompt: str) -> str:
-    if not GROQ_API_KEY:
-        return None
-    headers = {
-        "Authorization": f"Bearer {GROQ_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    payload = {
-        "model": "llama3-8b-8192",
-        "messages": [
-            {"role": "system", "content": "You are a professional LinkedIn copywriter. Produce a concise LinkedIn post and suggest 3 hashtags."},
-            {"role": "user", "content": prompt}
-        ],
-        "temperature": 0.7,
-        "max_tokens": 500
-    }
-    try:
-        r = requests.post(GROQ_URL, json=payload, headers=headers, timeout=30)
-        if r.status_code == 200:
-            data = r.json()
-            # Groq / OpenAI-like response shape:
-            return data["choices"][0]["message"]["content"]
-        else:
-            print("Groq API error:", r.status_code, r.text)
-            return None
-    except Exception as e:
-        print("Groq request failed:", e)
-        return None
+async def call_groq_chat(prompt: str) -> str:
+    # Through the gateway (single-flight, hedging, circuit breaker / failover);
+    # returns None when no key is set or no model answered
+    return await llm_gateway.generate_text(
+        prompt,
+        system=SYSTEM_PROMPT,
+        model=GROQ_MODEL,
+        **GENERATION_PARAMS
+    )
 
 def simple_local_generate(prompt: str) -> str:
     # Minimal safe fallback for offline/demo use.
@@ -56,128 +53,440 @@ def simple_local_generate(prompt: str) -> str:
     out = f"{prompt}\n\nThis is a generated LinkedIn-style post (demo).{hashtags}"
     return out
 
-# ---------------------------
-# Helper: publish (mock)
-# ---------------------------
-def publish_post_and_create_analytics(post_id: int):
-    db = SessionLocal()
-    try:
-        post = db.query(Post).filter(Post.id == post_id).first()
-        if not post:
-            print("publish_post: post not found", post_id)
-            return False
-        # Mock publishing: mark posted_at, status
-        post.posted_at = datetime.datetime.utcnow()
-        post.status = "posted"
-        # tag as posted
-        post.hashtags = (post.hashtags or "") + " #AutoPosted"
-        db.add(post)
-        db.commit()
-
-        # Create mock analytics
-        likes = random.randint(20, 300)
-        comments = random.randint(0, 50)
-        shares = random.randint(0, 30)
-        impressions = likes * random.randint(10, 30)
-
-        analytics = Analytics(
-            post_id=post.id,
-            likes=likes,
-            comments=comments,
-            shares=shares,
-            impressions=impressions
-        )
-        db.add(analytics)
-        db.commit()
-        print(f"[AUTO-POST] Published post {post_id} -> likes {likes}, comments {comments}")
-        return True
-    except Exception as e:
-        db.rollback()
-        print("publish_post error:", e)
-        return False
-    finally:
-        db.close()
+async def simple_local_stream(prompt: str):
+    # Streaming variant of the fallback so the SSE path works offline.
+    words = simple_local_generate(prompt).split(" ")
+    for i, word in enumerate(words):
+        yield word if i == 0 else " " + word
+        await asyncio.sleep(0)
 
+async def generate_post_text(prompt: str, use_cache: bool = True):
+    """
+    Returns (text, source) where source is "cache", "llm" or "fallback".
+    Only real provider completions are cached; fallbacks are not.
+    """
+    key = make_cache_key(prompt, SYSTEM_PROMPT, GROQ_MODEL, **GENERATION_PARAMS)
+    if use_cache:
+        cached = await completion_cache.aget(key)
+        if cached is not None:
+            GENERATIONS.labels("cache").inc()
+            return cached, "cache"
 
-# ---------------------------
-# Background poller job
-# ---------------------------
-def check_and_publish_due_posts():
-    db = SessionLocal()
-    try:
-        now = datetime.datetime.utcnow()
-        due_posts = db.query(Post).filter(
-            Post.status == "scheduled",
-            Post.scheduled_time != None,
-            Post.scheduled_time <= now
-        ).all()
-        for p in due_posts:
-            print("Publishing due post:", p.id)
-            # publish (mock) and create analytics
-            publish_post_and_create_analytics(p.id)
-    except Exception as e:
-        print("check_and_publish_due_posts error:", e)
-    finally:
-        db.close()
-
-# schedule the poller every minute (safe for demo)
-scheduler.add_job(check_and_publish_due_posts, "interval", minutes=1)
+    ai_text = await call_groq_chat(prompt)
+    if ai_text:
+        await completion_cache.aset(key, ai_text, model=GROQ_MODEL)
+        GENERATIONS.labels("llm").inc()
+        return ai_text, "llm"
+    GENERATIONS.labels("fallback").inc()
+    return simple_local_generate(prompt), "fallback"
 
+def extract_hashtags(ai_text: str, fallback: str = "#AI #LinkedIn") -> str:
+    # naive: last line hashtags if starts with '#'; otherwise the fallback
+    # (callers pass the best-performing tags from /analytics/hashtags)
+    last_lines = ai_text.strip().splitlines()
+    if last_lines and last_lines[-1].strip().startswith("#"):
+        return last_lines[-1].strip()
+    return fallback
 
 # ---------------------------
 # Endpoints
 # ---------------------------
 
-@router.post("/generate")
-def generate_content(prompt: str, db: Session = Depends(get_db)):
+class GenerateRequest(BaseModel):
+    prompt: str
+    callback_url: Optional[str] = None
+
+
+BLOCKED_MESSAGE = "Generated draft is a near-duplicate of an existing post"
+
+
+class NearDuplicateBlocked(JobFailed):
+    def __init__(self, match: dict):
+        super().__init__(BLOCKED_MESSAGE, {"near_duplicate": match})
+        self.match = match
+
+
+async def generate_draft(db: AsyncSession, prompt: str, use_cache: bool = True) -> dict:
     """
-    Generate content using Groq (or fallback), save to DB as draft and return it.
-    Request body: {"prompt": "Your prompt here"}
+    Generate a post for `prompt` and save it as a draft. Shared by the
+    request path and the generation job workers; raises
+    NearDuplicateBlocked when the draft repeats a stored post.
     """
     # build enriched prompt if you want (pull profile/trends here if desired)
     # For demo we just use the prompt
-    ai_text = call_groq_chat(prompt)
-    if not ai_text:
-        ai_text = simple_local_generate(prompt)
+    ai_text, source = await generate_post_text(prompt, use_cache=use_cache)
 
     # attempt to extract hashtags if present (simple heuristic)
-    hashtags = None
-    # naive: last line hashtags if starts with '#'
-    last_lines = ai_text.strip().splitlines()
-    if last_lines and last_lines[-1].strip().startswith("#"):
-        hashtags = last_lines[-1].strip()
-    else:
-        hashtags = "#AI #LinkedIn"
+    hashtags = extract_hashtags(ai_text, await db.run_sync(suggested_hashtags_text, prompt))
+
+    # near-duplicate check against every stored post (LSH lookup, not a scan)
+    signature = await run_in_threadpool(minhash, ai_text)
+    match = await db.run_sync(find_near_duplicate, signature)
+    record_near_duplicate("generate", match, blocks(match))
+    if blocks(match):
+        raise NearDuplicateBlocked(match)
 
     post = Post(prompt=prompt, content=ai_text, hashtags=hashtags, status="draft")
     db.add(post)
-    db.commit()
-    db.refresh(post)
+    await db.flush()
+    await db.run_sync(index_signatures, [(post.id, signature)])
+    await db.run_sync(index_hashtags, [(post.id, post.hashtags)])
+    await db.commit()
 
-    return {"message": "Generated and saved (draft)", "post": {"id": post.id, "content": post.content, "hashtags": post.hashtags}}
+    return {
+        "message": "Generated and saved (draft)",
+        "source": source,
+        "post": {"id": post.id, "content": post.content, "hashtags": post.hashtags},
+        "near_duplicate": match
+    }
+
+
+async def run_generation_job(db: AsyncSession, prompt: str, no_cache: bool) -> dict:
+    # handler for generation_queue workers
+    return await generate_draft(db, prompt, use_cache=not no_cache)
+
+
+@router.post("/generate")
+async def generate_content(request: Request, prompt: str = None, body: GenerateRequest = None, no_cache: bool = False,
+                           run_async: bool = Query(False, alias="async"), callback_url: str = None,
+                           db: AsyncSession = Depends(get_async_db)):
+    """
+    Generate content using Groq (or fallback), save to DB as draft and return it.
+    Request body: {"prompt": "Your prompt here"} (or ?prompt=... as a query param)
+    Pass ?no_cache=true to skip the completion cache and force a fresh provider call.
+    Pass ?async=true (or a `Prefer: respond-async` header) to queue a generation
+    job instead: the response is 202 with the job id, and the result is read
+    from GET /content/jobs/{job_id} or POSTed to `callback_url` when done.
+    """
+    if body is not None:
+        prompt = body.prompt
+        callback_url = body.callback_url or callback_url
+    if not prompt:
+        raise HTTPException(status_code=422, detail="prompt is required")
+
+    if run_async or "respond-async" in request.headers.get("prefer", "").lower():
+        if callback_url is not None:
+            try:
+                await run_in_threadpool(check_callback_url, callback_url)
+            except ValueError as e:
+                raise HTTPException(status_code=422, detail=str(e))
+        job = await generation_queue.enqueue(db, prompt, no_cache=no_cache, callback_url=callback_url)
+        status_url = f"{router.prefix}/jobs/{job.id}"
+        return JSONResponse(
+            status_code=202,
+            content={"message": "Generation queued", "job_id": job.id, "status": job.status, "status_url": status_url},
+            headers={"Location": status_url},
+        )
+
+    try:
+        return await generate_draft(db, prompt, use_cache=not no_cache)
+    except NearDuplicateBlocked as e:
+        raise HTTPException(status_code=409, detail={"message": BLOCKED_MESSAGE, "near_duplicate": e.match})
+
+
+@router.get("/jobs/stats")
+async def generation_job_stats(db: AsyncSession = Depends(get_async_read_db)):
+    """Generation queue depth, jobs running and how long the oldest queued job has waited."""
+    return await generation_queue.stats(db)
+
+
+@router.get("/jobs/{job_id}")
+async def get_generation_job(job_id: str, wait: float = Query(0, ge=0, le=LONG_POLL_MAX_SECONDS)):
+    """
+    Status of a generation job. With ?wait=N the request is held (long-poll)
+    until the job finishes or N seconds pass, whichever comes first.
+    """
+    job = await generation_queue.wait(job_id, wait) if wait else await generation_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_view(job)
+
+
+def sse_event(data: dict, event: str = None) -> str:
+    out = f"event: {event}\n" if event else ""
+    return out + f"data: {json.dumps(data)}\n\n"
+
+
+@router.get("/generate/stream")
+async def generate_content_stream(prompt: str, no_cache: bool = False):
+    """
+    Stream a generated post as Server-Sent Events.
+    Emits `data: {"token": ...}` for each chunk, then an `event: done` with
+    the id of the saved draft. Falls back to the local generator (also
+    streamed) if the provider fails before the first token.
+    """
+    if not prompt.strip():
+        raise HTTPException(status_code=422, detail="prompt is required")
+
+    async def event_stream():
+        key = make_cache_key(prompt, SYSTEM_PROMPT, GROQ_MODEL, **GENERATION_PARAMS)
+        cached = None if no_cache else await completion_cache.aget(key)
+        parts = []
+        source = "cache"
+
+        if cached is not None:
+            parts.append(cached)
+            yield sse_event({"token": cached})
+        else:
+            source = "llm"
+            try:
+                async for delta in llm_gateway.stream_text(prompt, system=SYSTEM_PROMPT, model=GROQ_MODEL, **GENERATION_PARAMS):
+                    parts.append(delta)
+                    yield sse_event({"token": delta})
+            except llm_client.LLMError as e:
+                if parts:
+                    # provider died mid-stream: don't save a truncated draft
+                    print("Groq stream failed mid-response:", e)
+                    yield sse_event({"error": "generation interrupted"}, event="error")
+                    return
+                print("Groq stream unavailable, using local fallback:", e)
+
+            if not parts:
+                source = "fallback"
+                async for delta in simple_local_stream(prompt):
+                    parts.append(delta)
+                    yield sse_event({"token": delta})
+
+        ai_text = "".join(parts)
+        GENERATIONS.labels(source).inc()
+        if source == "llm":
+            await completion_cache.aset(key, ai_text, model=GROQ_MODEL)
+
+        # the request-scoped session is already closed once streaming starts
+        async with AsyncSessionLocal() as db:
+            try:
+                signature = await run_in_threadpool(minhash, ai_text)
+                match = await db.run_sync(find_near_duplicate, signature)
+                record_near_duplicate("generate", match, blocks(match))
+                if blocks(match):
+                    yield sse_event({"error": "near-duplicate of an existing post", "near_duplicate": match}, event="error")
+                    return
+                hashtags = extract_hashtags(ai_text, await db.run_sync(suggested_hashtags_text, prompt))
+                post = Post(prompt=prompt, content=ai_text, hashtags=hashtags, status="draft")
+                db.add(post)
+                await db.flush()
+                await db.run_sync(index_signatures, [(post.id, signature)])
+                await db.run_sync(index_hashtags, [(post.id, post.hashtags)])
+                await db.commit()
+                yield sse_event({
+                    "post_id": post.id, "hashtags": post.hashtags, "source": source, "near_duplicate": match
+                }, event="done")
+            except Exception as e:
+                await db.rollback()
+                print("generate stream save error:", e)
+                yield sse_event({"error": "could not save draft"}, event="error")
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+class BatchGenerateRequest(BaseModel):
+    prompts: List[str]
+    concurrency: Optional[int] = None
+    no_cache: bool = False
+
+
+@router.post("/generate/batch")
+async def generate_content_batch(body: BatchGenerateRequest, db: AsyncSession = Depends(get_async_db)):
+    """
+    Generate drafts for many prompts at once.
+    LLM calls run concurrently (up to `concurrency`, capped by BATCH_CONCURRENCY)
+    and all posts are written in a single bulk insert.
+    Request body: {"prompts": ["...", "..."], "concurrency": 4, "no_cache": false}
+    """
+    prompts = [p for p in body.prompts if p and p.strip()]
+    if not prompts:
+        raise HTTPException(status_code=422, detail="prompts must contain at least one non-empty prompt")
+    if len(prompts) > BATCH_MAX_PROMPTS:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_MAX_PROMPTS} prompts per batch")
+
+    limit = max(1, min(body.concurrency or BATCH_CONCURRENCY, BATCH_CONCURRENCY))
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _generate_one(prompt: str):
+        async with semaphore:
+            return await generate_post_text(prompt, use_cache=not body.no_cache)
+
+    generated = await asyncio.gather(*(_generate_one(p) for p in prompts))
+
+    # near-duplicates of stored posts or of an earlier draft in this batch
+    signatures = await run_in_threadpool(lambda: [minhash(ai_text) for ai_text, _source in generated])
+    matches = await db.run_sync(screen_drafts, signatures)
+    for match in matches:
+        record_near_duplicate("generate", match, blocks(match))
+    kept = [i for i, match in enumerate(matches) if not blocks(match)]
+
+    # fallback tags: the suggestion ranking is cached, so this is one query per batch at most
+    fallbacks = [await db.run_sync(suggested_hashtags_text, prompt) for prompt in prompts]
+    rows = [
+        {"prompt": prompt, "content": ai_text, "hashtags": extract_hashtags(ai_text, fallback), "status": "draft"}
+        for prompt, (ai_text, _source), fallback in zip(prompts, generated, fallbacks)
+    ]
+    post_ids = [None] * len(rows)
+    if kept:
+        # one multi-row INSERT ... RETURNING in one transaction. Not sort_by_parameter_order,
+        # which SQLite can only honour one row per statement; ids are handed out in row
+        # order (as in importer.insert_batch), so sorting them restores the mapping.
+        posts = Post.__table__
+        inserted = sorted((await db.execute(
+            insert(posts).returning(posts.c.id), [rows[i] for i in kept]
+        )).scalars().all())
+        for i, post_id in zip(kept, inserted):
+            post_ids[i] = post_id
+        await db.run_sync(index_signatures, [(post_ids[i], signatures[i]) for i in kept])
+        await db.run_sync(index_hashtags, [(post_ids[i], rows[i]["hashtags"]) for i in kept])
+        await db.commit()
+
+    results = [
+        {
+            "index": i,
+            "prompt": row["prompt"],
+            "post_id": post_id,
+            "source": source,
+            "hashtags": row["hashtags"],
+            "near_duplicate": match,
+            "blocked": blocks(match)
+        }
+        for i, (row, post_id, (_text, source), match) in enumerate(zip(rows, post_ids, generated, matches))
+    ]
+    return {
+        "message": f"Generated and saved {len(kept)} drafts",
+        "generated": sum(1 for r in results if r["source"] == "llm"),
+        "cached": sum(1 for r in results if r["source"] == "cache"),
+        "fallback": sum(1 for r in results if r["source"] == "fallback"),
+        "results": results
+    }
+
+
+@router.get("/cache/stats")
+def completion_cache_stats():
+    """Hit/miss counters and sizing for the prompt -> completion cache."""
+    return completion_cache.stats()
+
+
+LIST_PREVIEW_CHARS = 800
+LIST_DEFAULT_LIMIT = 50
+LIST_MAX_LIMIT = 200
+
+
+def encode_cursor(created_at: datetime.datetime, post_id: int) -> str:
+    raw = json.dumps([created_at.isoformat() if created_at else None, post_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, post_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.datetime.fromisoformat(created_at), int(post_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def to_utc_naive(value: datetime.datetime) -> datetime.datetime:
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return value
 
 
 @router.get("/list")
-def list_posts(db: Session = Depends(get_db)):
-    posts = db.query(Post).order_by(Post.created_at.desc()).all()
+async def list_posts(
+    limit: int = LIST_DEFAULT_LIMIT,
+    cursor: str = None,
+    status: str = None,
+    created_after: datetime.datetime = None,
+    created_before: datetime.datetime = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    List posts newest first, one page at a time.
+    Pass the returned `next_cursor` as `cursor` to fetch the next page.
+    Optional filters: status, created_after, created_before (ISO datetimes).
+    """
+    limit = max(1, min(limit, LIST_MAX_LIMIT))
+    content_length = func.length(Post.content)
+    query = select(
+        Post.id,
+        Post.prompt,
+        func.substr(Post.content, 1, LIST_PREVIEW_CHARS).label("content_preview"),
+        (content_length > LIST_PREVIEW_CHARS).label("truncated"),
+        Post.hashtags,
+        Post.status,
+        Post.scheduled_time,
+        Post.posted_at,
+        Post.created_at
+    )
+    if status:
+        query = query.where(Post.status == status)
+    if created_after:
+        query = query.where(Post.created_at >= to_utc_naive(created_after))
+    if created_before:
+        query = query.where(Post.created_at < to_utc_naive(created_before))
+    if cursor:
+        cursor_created_at, cursor_id = decode_cursor(cursor)
+        query = query.where(tuple_(Post.created_at, Post.id) < (cursor_created_at, cursor_id))
+
+    # fetch one extra row to know whether another page exists
+    rows = (await db.execute(query.order_by(Post.created_at.desc(), Post.id.desc()).limit(limit + 1))).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id) if has_more else None
+
     return {
-        "total": len(posts),
+        "total": len(rows),
+        "has_more": has_more,
+        "next_cursor": next_cursor,
         "posts": [
             {
                 "id": p.id,
                 "prompt": p.prompt,
-                "content": (p.content[:800] + "...") if len(p.content or "") > 800 else p.content,
+                "content": (p.content_preview + "...") if p.truncated else p.content_preview,
                 "hashtags": p.hashtags,
                 "status": p.status,
                 "scheduled_time": p.scheduled_time,
-                "posted_at": p.posted_at
-            } for p in posts
+                "posted_at": p.posted_at,
+                "created_at": p.created_at
+            } for p in rows
         ]
     }
 
 
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+
+@router.get("/search")
+async def search_content(
+    q: str,
+    limit: int = SEARCH_DEFAULT_LIMIT,
+    offset: int = 0,
+    status: str = None,
+    created_after: datetime.datetime = None,
+    created_before: datetime.datetime = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """
+    Full-text search over post prompts, content and hashtags, best match first.
+    All words must match; use "quotes" for phrases and a trailing * for prefixes.
+    Snippets mark matches with <mark>...</mark>. Same filters as /content/list.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=400, detail="q must not be empty")
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    results = await search_posts(
+        db, q,
+        status=status,
+        created_after=to_utc_naive(created_after),
+        created_before=to_utc_naive(created_before),
+        limit=limit,
+        offset=max(0, offset),
+    )
+    return {"query": q, "total": len(results), "offset": max(0, offset), "results": results}
+
+
 @router.post("/schedule")
-def schedule_post(post_id: int, scheduled_time: datetime.datetime = None, delay_minutes: int = None, db: Session = Depends(get_db)):
+async def schedule_post(post_id: int, scheduled_time: datetime.datetime = None, delay_minutes: int = None, db: AsyncSession = Depends(get_async_db)):
     """
     Schedule a post either by absolute datetime (ISO) or by delay_minutes.
     Example (JSON form fields):
@@ -185,7 +494,7 @@ def schedule_post(post_id: int, scheduled_time: datetime.datetime = None, delay_
     - scheduled_time: "2025-08-09T15:30:00"  (optional)
     - delay_minutes: 10  (optional)
     """
-    post = db.query(Post).filter(Post.id == post_id).first()
+    post = await db.get(Post, post_id)
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
 
@@ -200,26 +509,43 @@ def schedule_post(post_id: int, scheduled_time: datetime.datetime = None, delay_
     else:
         raise HTTPException(status_code=400, detail="Provide scheduled_time or delay_minutes")
 
-    # save schedule in DB
-    post.scheduled_time = run_at
-    post.status = "scheduled"
-    db.add(post)
-    db.commit()
-    db.refresh(post)
+    # don't queue something we've (nearly) already published or queued
+    signature = await db.run_sync(signature_for_post, post)
+    match = await db.run_sync(
+        find_near_duplicate, signature, statuses=PUBLISHED_STATUSES, exclude_post_id=post.id
+    )
+    record_near_duplicate("schedule", match, blocks(match))
+    if blocks(match):
+        raise HTTPException(status_code=409, detail={
+            "message": "Post is a near-duplicate of a published or scheduled post", "near_duplicate": match
+        })
+
+    # save schedule in DB; conditional, so a post a worker has claimed (or already
+    # posted) is never put back in the queue and published twice
+    updated = await db.execute(
+        update(Post)
+        .where(Post.id == post.id, Post.status.in_(SCHEDULABLE_STATUSES))
+        .values(status="scheduled", scheduled_time=run_at, claimed_at=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if updated.rowcount == 0:
+        raise HTTPException(status_code=409, detail=f"Post is {post.status} and can't be rescheduled")
 
-    # (optional) also add a scheduled job to run exactly at run_at to publish
-    scheduler.add_job(publish_post_and_create_analytics, "date", run_date=run_at, args=[post.id])
+    # wake the dispatcher so it re-plans around the new due time
+    scheduler_service.notify()
 
-    return {"message": "Post scheduled", "post_id": post.id, "run_at": run_at.isoformat()}
+    return {"message": "Post scheduled", "post_id": post.id, "run_at": run_at.isoformat(), "near_duplicate": match}
 
 
 @router.get("/analytics")
-def content_analytics(db: Session = Depends(get_db)):
+async def content_analytics(db: AsyncSession = Depends(get_async_read_db)):
     """
     Returns analytics summary for all posts and per-post metrics.
+    Builds the whole document in memory; use /content/export for large archives.
     """
-    posts = db.query(Post).order_by(Post.created_at.desc()).all()
-    analytics_rows = db.query(Analytics).all()
+    posts = (await db.scalars(select(Post).order_by(Post.created_at.desc()))).all()
+    analytics_rows = (await db.scalars(select(Analytics))).all()
     analytics_by_post = {}
     for a in analytics_rows:
         analytics_by_post[a.post_id] = {
@@ -239,3 +565,72 @@ def content_analytics(db: Session = Depends(get_db)):
         })
 
     return {"total_posts": len(posts), "rows": rows}
+
+
+@router.get("/export")
+async def export_posts(request: Request, format: str = "ndjson", since: datetime.datetime = None):
+    """
+    Stream every post with its analytics as NDJSON or CSV (?format=ndjson|csv).
+    Rows come from a server-side cursor, so memory stays constant; the body is
+    gzip-compressed on the fly when the client sends Accept-Encoding: gzip.
+    Incremental export: pass the previous response's X-Export-Watermark as
+    `since` to get only posts created, published or measured after it.
+    """
+    if format not in FORMATS:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+    watermark = datetime.datetime.utcnow().replace(microsecond=0)
+    # the request-scoped session is closed once streaming starts, so the generator opens its own
+    body = export_chunks(AsyncReadSessionLocal, format, to_utc_naive(since))
+    headers = {
+        "Content-Disposition": f'attachment; filename="posts-{watermark:%Y%m%dT%H%M%SZ}.{format}"',
+        "X-Export-Watermark": watermark.isoformat(),
+        "Vary": "Accept-Encoding",
+    }
+    if "gzip" in request.headers.get("accept-encoding", "").lower():
+        body = gzip_chunks(body)
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body, media_type=FORMATS[format], headers=headers)
+
+
+# uploads are spooled to disk past this size, so an import never holds the whole file in memory
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024
+
+
+@router.post("/import")
+async def import_posts(request: Request, format: str = None, dry_run: bool = False):
+    """
+    Bulk-import posts from the raw request body, NDJSON (default) or CSV
+    (?format=csv or Content-Type: text/csv); gzip bodies are accepted with
+    Content-Encoding: gzip.
+    Each row needs `external_id` and `content`; optional: prompt, hashtags,
+    status, scheduled_time, posted_at, created_at and historical
+    likes/comments/shares/impressions. Rows already imported (same
+    external_id) are skipped, so a failed import can simply be re-run.
+    Pass ?dry_run=true to only validate.
+    """
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    if fmt not in importer.FORMATS:
+        raise HTTPException(status_code=400, detail="format must be ndjson or csv")
+
+    decompressor = zlib.decompressobj(31) if request.headers.get("content-encoding") == "gzip" else None
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as spool:
+        try:
+            async for chunk in request.stream():
+                spool.write(decompressor.decompress(chunk) if decompressor else chunk)
+            if decompressor:
+                spool.write(decompressor.flush())
+        except zlib.error:
+            raise HTTPException(status_code=400, detail="Invalid gzip body")
+        spool.seek(0)
+        text = io.TextIOWrapper(spool, encoding="utf-8-sig", newline="")
+        try:
+            summary = await run_in_threadpool(importer.import_file, text, fmt, dry_run)
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="Body must be UTF-8")
+        finally:
+            text.detach()
+
+    if summary["scheduled"] and not dry_run:
+        # one wake-up for the whole import; the dispatcher claims due rows in batches
+        scheduler_service.notify()
+    return summary
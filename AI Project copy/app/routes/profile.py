@@ -1,21 +1,30 @@
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.models.models import Profile
 
 router = APIRouter(prefix="/profile", tags=["Profile"])
 
+def profile_dict(profile: Profile) -> dict:
+    return {
+        "id": profile.id,
+        "name": profile.name,
+        "headline": profile.headline,
+        "about": profile.about
+    }
+
 @router.post("/")
-def create_profile(name: str, headline: str = None, about: str = None, db: Session = Depends(get_db)):
+async def create_profile(name: str, headline: str = None, about: str = None, db: AsyncSession = Depends(get_async_db)):
     profile = Profile(name=name, headline=headline, about=about)
     db.add(profile)
-    db.commit()
-    db.refresh(profile)
-    return {"message": "Profile created successfully", "profile": profile.__dict__}
+    await db.commit()
+    await db.refresh(profile)
+    return {"message": "Profile created successfully", "profile": profile_dict(profile)}
 
 @router.get("/")
-def get_profile(db: Session = Depends(get_db)):
-    profile = db.query(Profile).first()
+async def get_profile(db: AsyncSession = Depends(get_async_db)):
+    profile = (await db.execute(select(Profile).limit(1))).scalar_one_or_none()
     if not profile:
         return {"message": "No profile found"}
-    return profile.__dict__
+    return profile_dict(profile)
@@ -1,23 +1,35 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
 from app.services.linkedin_service import get_mock_trends
+from app.services.trends import trend_index, ingest_feeds
 
 router = APIRouter(prefix="/trends", tags=["Trends"])
 
 @router.get("/")
-def get_trends(industry: str = None):
+def get_trends(industry: str = None, limit: int = Query(10, ge=1, le=50)):
     """
-    Get mock industry trends.
-    In a real implementation, this would connect to news APIs or RSS feeds.
+    Get industry trends from the ingested RSS/Atom/JSON feeds, ranked by
+    keyword match and recency. Falls back to mock trends until a feed has
+    been ingested.
     """
-    keywords = [industry] if industry else None
-    trends = get_mock_trends(keywords)
-    return {"trends": trends, "count": len(trends)}
+    items = trend_index.search(industry, limit)
+    if not items:
+        trends = get_mock_trends([industry] if industry else None)
+        return {"trends": trends, "count": len(trends), "items": [], "source": "mock"}
+    return {"trends": [item["title"] for item in items], "count": len(items), "items": items, "source": "feeds"}
 
 @router.get("/suggestions")
-def get_content_suggestions():
+def get_content_suggestions(industry: str = None):
     """
     Get content suggestions based on trends.
     """
-    trends = get_mock_trends()
+    trends = [item["title"] for item in trend_index.search(industry, 3)] or get_mock_trends()
     suggestions = [f"Write about: {trend}" for trend in trends[:3]]
-    return {"suggestions": suggestions}
\ No newline at end of file
+    return {"suggestions": suggestions}
+
+@router.post("/ingest")
+def ingest_trends():
+    """
+    Pull the configured feeds now (normally done by the background scheduler).
+    Unchanged feeds and already-stored items are skipped.
+    """
+    return ingest_feeds()
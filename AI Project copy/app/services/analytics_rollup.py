@@ -0,0 +1,68 @@
+# app/services/analytics_rollup.py
+from datetime import datetime
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+from app.database import dialect_insert
+from app.models.models import Analytics, AnalyticsRollup
+
+GLOBAL_ROLLUP_ID = 1
+
+
+def rebuild_rollup(db: Session) -> AnalyticsRollup:
+    """
+    Recompute the rollup from the analytics table with SQL aggregates.
+    Only needed once (or after out-of-band edits); normal writes go
+    through apply_analytics_delta.
+    """
+    count, likes, comments, shares, impressions = db.query(
+        func.count(Analytics.id),
+        func.coalesce(func.sum(Analytics.likes), 0),
+        func.coalesce(func.sum(Analytics.comments), 0),
+        func.coalesce(func.sum(Analytics.shares), 0),
+        func.coalesce(func.sum(Analytics.impressions), 0),
+    ).one()
+    values = {
+        "post_count": count,
+        "total_likes": likes,
+        "total_comments": comments,
+        "total_shares": shares,
+        "total_impressions": impressions,
+        "updated_at": datetime.utcnow(),
+    }
+    # upsert, not merge (SELECT then INSERT): two requests that both found the
+    # row missing would otherwise race and the loser fail on the primary key
+    stmt = dialect_insert(db, AnalyticsRollup).values(id=GLOBAL_ROLLUP_ID, **values)
+    db.execute(stmt.on_conflict_do_update(index_elements=["id"], set_=values))
+    return db.get(AnalyticsRollup, GLOBAL_ROLLUP_ID, populate_existing=True)
+
+
+def apply_analytics_delta(db: Session, posts: int = 0, likes: int = 0, comments: int = 0,
+                          shares: int = 0, impressions: int = 0):
+    """
+    Add a delta to the rollup inside the caller's transaction.
+    Call it after the analytics row change has been added/flushed so that,
+    if the rollup row doesn't exist yet, the rebuild already includes it.
+    """
+    result = db.execute(
+        update(AnalyticsRollup)
+        .where(AnalyticsRollup.id == GLOBAL_ROLLUP_ID)
+        .values(
+            post_count=AnalyticsRollup.post_count + posts,
+            total_likes=AnalyticsRollup.total_likes + likes,
+            total_comments=AnalyticsRollup.total_comments + comments,
+            total_shares=AnalyticsRollup.total_shares + shares,
+            total_impressions=AnalyticsRollup.total_impressions + impressions,
+            updated_at=datetime.utcnow(),
+        )
+    )
+    if result.rowcount == 0:
+        db.flush()
+        rebuild_rollup(db)
+
+
+def get_rollup(db: Session) -> AnalyticsRollup:
+    rollup = db.get(AnalyticsRollup, GLOBAL_ROLLUP_ID)
+    if rollup is None:
+        rollup = rebuild_rollup(db)
+        db.commit()
+    return rollup
@@ -0,0 +1,134 @@
+# app/services/background.py
+import os
+import atexit
+import hashlib
+import tempfile
+from datetime import datetime
+from app.database import SQLALCHEMY_DATABASE_URL
+from app.services.leader import LeaderElector
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, assume a single process
+    fcntl = None
+
+# all    - serve HTTP and run background services while this process holds the leader lease (default)
+# web    - serve HTTP only; background services run elsewhere (e.g. `python -m app.worker`)
+# worker - background services only
+APP_ROLE = os.getenv("APP_ROLE", "all").lower()
+
+
+def _default_lock_path() -> str:
+    # one migrating process per database on this host
+    digest = hashlib.sha1(SQLALCHEMY_DATABASE_URL.encode()).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f"linkedin_ai_background_{digest}.lock")
+
+
+class FileLock:
+    """Non-reentrant advisory lock on a file; released when the process exits."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = None
+
+    def acquire(self, blocking: bool = False) -> bool:
+        if fcntl is None:
+            return True
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self):
+        self.acquire(blocking=True)
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class BackgroundServices:
+    """
+    Scheduler, publish workers and maintenance jobs, run by exactly one
+    process across every node sharing the database. Each process that
+    calls start() becomes a candidate in a DB lease election (see
+    app/services/leader.py); the leader runs the services, the rest
+    stand by and take over if it stops renewing. APP_ROLE=web opts a
+    process out entirely.
+    """
+
+    def __init__(self, role: str = APP_ROLE, **elector_options):
+        self.role = role
+        self.elector = LeaderElector(
+            "scheduler", on_elected=self._on_elected, on_demoted=self._on_demoted, **elector_options
+        )
+
+    @property
+    def designated(self) -> bool:
+        return self.elector.is_leader
+
+    def start(self) -> bool:
+        """Join the election; returns True if this process leads right away."""
+        if self.role == "web":
+            print("[BACKGROUND] APP_ROLE=web: background services disabled in this process")
+            return False
+        atexit.register(self.stop)
+        leader = self.elector.start()
+        if not leader:
+            print("[BACKGROUND] standing by; another process holds the scheduler lease")
+        return leader
+
+    def stop(self):
+        # demotes (stopping the scheduler) and releases the lease for a fast failover
+        self.elector.stop()
+
+    def _on_elected(self):
+        from app.services.engagement import sync_engagement_scores_job
+        from app.services.scheduler import scheduler_service
+        from app.services.timeseries import compact_metrics_job
+        from app.services.trends import ingest_trends_job, TREND_INGEST_MINUTES
+        from app.services.dedup import backfill_fingerprints_job
+
+        # Backfill / re-weight stored engagement scores. Runs once, right away, on the
+        # periodic scheduler: this callback is on the lease thread, which must keep renewing.
+        scheduler_service.periodic.add_job(sync_engagement_scores_job, id="sync_engagement_scores",
+                                           replace_existing=True)
+        # due-post dispatcher + periodic maintenance
+        scheduler_service.add_periodic_job(compact_metrics_job, "compact_metrics", hours=1)
+        # a previous leader may have died mid-publish
+        scheduler_service.add_periodic_job(scheduler_service.requeue_stale_claims, "requeue_stale_claims", minutes=5)
+        # near-duplicate index for posts inserted without a fingerprint (imports, pre-existing rows)
+        scheduler_service.add_periodic_job(backfill_fingerprints_job, "backfill_fingerprints", minutes=10,
+                                           next_run_time=datetime.now())
+        # first run right away, so a fresh deployment has trends to serve
+        scheduler_service.add_periodic_job(ingest_trends_job, "ingest_trends", minutes=TREND_INGEST_MINUTES,
+                                           next_run_time=datetime.now())
+        scheduler_service.start()
+        print(f"[BACKGROUND] pid={os.getpid()} leads (term {self.elector.term}) and started the scheduler")
+
+    def _on_demoted(self):
+        from app.services.scheduler import scheduler_service
+
+        scheduler_service.stop()
+        print(f"[BACKGROUND] pid={os.getpid()} lost the scheduler lease and stopped the scheduler")
+
+
+background_services = BackgroundServices()
+
+
+def run_migrations():
+    """Apply migrations once per host at a time; other workers wait, then see head and skip."""
+    from app.database import migrate_db
+
+    with FileLock(_default_lock_path() + ".migrate"):
+        migrate_db()
@@ -0,0 +1,236 @@
+# app/services/completion_cache.py
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from sqlalchemy import bindparam, update
+from starlette.concurrency import run_in_threadpool
+from app.database import SessionLocal
+from app.models.models import CompletionCache as CompletionCacheRow
+
+
+def normalize_prompt(prompt: str) -> str:
+    # collapse whitespace so retries / re-indented templates share an entry
+    return " ".join((prompt or "").split())
+
+
+def make_cache_key(prompt: str, system: str, model: str, **params) -> str:
+    raw = json.dumps(
+        {
+            "prompt": normalize_prompt(prompt),
+            "system": normalize_prompt(system),
+            "model": model,
+            "params": params,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class CompletionCache:
+    """
+    Two-tier prompt -> completion cache.
+    Tier 1 is an in-process LRU; tier 2 is the `completion_cache` table so
+    entries survive restarts and are shared between workers.
+    Async callers use aget/aset: memory hits never leave the event loop and
+    the table is only touched from the threadpool. Hits record last_used_at
+    in memory; the timestamps are written in one batch before eviction or
+    once TOUCH_BATCH keys are pending.
+    """
+
+    TOUCH_BATCH = 256
+
+    def __init__(self, max_memory_entries: int = 512, max_db_entries: int = 10000,
+                 ttl_seconds: int = 86400, session_factory=SessionLocal):
+        self.max_memory_entries = max_memory_entries
+        self.max_db_entries = max_db_entries
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.session_factory = session_factory
+        self._memory = OrderedDict()  # key -> (completion, expires_at)
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        self._touched = {}  # key -> last hit time, not yet written to the table
+        self.hits = 0
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, completion: str, expires_at: datetime):
+        with self._lock:
+            self._memory[key] = (completion, expires_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def get_memory(self, key: str):
+        """Tier-1 lookup only; None on a miss (counted once the table has been checked)."""
+        now = datetime.utcnow()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                completion, expires_at = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._touched[key] = now
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return completion
+                del self._memory[key]
+        return None
+
+    def _load(self, key: str):
+        # tier 2 (blocking): the row's completion if present and unexpired
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            row = db.get(CompletionCacheRow, key)
+            if row is not None and row.expires_at > now:
+                completion, expires_at = row.completion, row.expires_at
+            else:
+                completion = None
+        except Exception as e:
+            print("completion cache read error:", e)
+            completion = None
+        finally:
+            db.close()
+
+        if completion is None:
+            with self._lock:
+                self.misses += 1
+            return None
+
+        self._remember(key, completion, expires_at)
+        with self._lock:
+            self._touched[key] = now
+            self.hits += 1
+            self.db_hits += 1
+        return completion
+
+    def get(self, key: str):
+        completion = self.get_memory(key)
+        if completion is None:
+            completion = self._load(key)
+        return completion
+
+    async def aget(self, key: str):
+        completion = self.get_memory(key)
+        if completion is None:
+            completion = await run_in_threadpool(self._load, key)
+        if len(self._touched) >= self.TOUCH_BATCH:
+            await run_in_threadpool(self.flush_touches)
+        return completion
+
+    def _take_touches(self) -> dict:
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        return touched
+
+    def _write_touches(self, db, touched: dict):
+        if touched:
+            db.execute(
+                update(CompletionCacheRow.__table__)
+                .where(CompletionCacheRow.key == bindparam("k"))
+                .values(last_used_at=bindparam("ts")),
+                [{"k": key, "ts": ts} for key, ts in touched.items()],
+            )
+
+    def flush_touches(self):
+        """Write pending last_used_at timestamps in one statement (blocking)."""
+        touched = self._take_touches()
+        if not touched:
+            return
+        db = self.session_factory()
+        try:
+            self._write_touches(db, touched)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print("completion cache touch error:", e)
+        finally:
+            db.close()
+
+    def _store(self, key: str, completion: str, model: str, now: datetime, expires_at: datetime):
+        # tier 2 (blocking)
+        db = self.session_factory()
+        try:
+            db.merge(CompletionCacheRow(
+                key=key,
+                model=model,
+                completion=completion,
+                created_at=now,
+                expires_at=expires_at,
+                last_used_at=now,
+            ))
+            db.commit()
+            self._writes_since_evict += 1
+            # amortize eviction: sweep roughly every 5% of capacity writes
+            if self._writes_since_evict >= max(1, self.max_db_entries // 20):
+                self._writes_since_evict = 0
+                # LRU order needs the pending hit times first
+                self._write_touches(db, self._take_touches())
+                self._evict(db, now)
+        except Exception as e:
+            db.rollback()
+            print("completion cache write error:", e)
+        finally:
+            db.close()
+
+    def set(self, key: str, completion: str, model: str = None):
+        now = datetime.utcnow()
+        expires_at = now + self.ttl
+        self._remember(key, completion, expires_at)
+        self._store(key, completion, model, now, expires_at)
+
+    async def aset(self, key: str, completion: str, model: str = None):
+        now = datetime.utcnow()
+        expires_at = now + self.ttl
+        self._remember(key, completion, expires_at)
+        await run_in_threadpool(self._store, key, completion, model, now, expires_at)
+
+    def _evict(self, db, now: datetime):
+        # TTL first, then trim the least recently used rows past the size cap
+        db.query(CompletionCacheRow).filter(CompletionCacheRow.expires_at <= now).delete(synchronize_session=False)
+        overflow = db.query(CompletionCacheRow).count() - self.max_db_entries
+        if overflow > 0:
+            stale_keys = [
+                k for (k,) in db.query(CompletionCacheRow.key)
+                .order_by(CompletionCacheRow.last_used_at.asc())
+                .limit(overflow)
+            ]
+            db.query(CompletionCacheRow).filter(CompletionCacheRow.key.in_(stale_keys)).delete(synchronize_session=False)
+        db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+        db = self.session_factory()
+        try:
+            db.query(CompletionCacheRow).delete()
+            db.commit()
+        finally:
+            db.close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "max_memory_entries": self.max_memory_entries,
+                "max_db_entries": self.max_db_entries,
+                "ttl_seconds": int(self.ttl.total_seconds()),
+            }
+
+
+completion_cache = CompletionCache(
+    max_memory_entries=int(os.getenv("COMPLETION_CACHE_MEMORY_ENTRIES", "512")),
+    max_db_entries=int(os.getenv("COMPLETION_CACHE_DB_ENTRIES", "10000")),
+    ttl_seconds=int(os.getenv("COMPLETION_CACHE_TTL_SECONDS", "86400")),
+)
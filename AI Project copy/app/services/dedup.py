@@ -0,0 +1,207 @@
+# app/services/dedup.py
+import os
+import re
+import zlib
+import struct
+import random
+import hashlib
+from sqlalchemy import and_, delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.models import Post, PostFingerprint, PostLshBucket
+from app.services.metrics import NEAR_DUPLICATES
+
+# estimated Jaccard similarity of word 3-shingles at which a draft counts as a near-duplicate
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+# flag: save/publish anyway and report the match; block: refuse (409 / publish fails)
+NEAR_DUPLICATE_ACTION = os.getenv("NEAR_DUPLICATE_ACTION", "flag").lower()
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_WORDS = 3
+# candidates checked per lookup; bounds the cost even when many posts are identical
+MAX_CANDIDATES = 100
+# statuses that count as "already out there" for the publish-time check
+PUBLISHED_STATUSES = ("posted", "publishing", "scheduled")
+
+_PRIME = (1 << 61) - 1
+_MASK = 0xFFFFFFFF
+_rng = random.Random(20240613)  # fixed seed: signatures must be comparable across processes and restarts
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+_WORD = re.compile(r"\w+")
+_SIGNATURE = struct.Struct(f"<{NUM_PERM}I")
+
+
+def minhash(text: str):
+    """64-value MinHash signature of the text's word 3-shingles, or None for empty text."""
+    words = _WORD.findall((text or "").lower())
+    if not words:
+        return None
+    span = min(SHINGLE_WORDS, len(words))
+    shingles = {zlib.crc32(" ".join(words[i:i + span]).encode()) for i in range(len(words) - span + 1)}
+    return tuple(min(((a * h + b) % _PRIME) & _MASK for h in shingles) for a, b in _PERMUTATIONS)
+
+
+def similarity(a, b) -> float:
+    """Estimated Jaccard similarity: share of equal signature positions."""
+    return sum(1 for x, y in zip(a, b) if x == y) / NUM_PERM
+
+
+def band_keys(signature) -> list:
+    """(band, bucket) per LSH band; bucket is a positive 63-bit hash of the band's rows."""
+    keys = []
+    for band in range(BANDS):
+        rows = struct.pack(f"<{ROWS}I", *signature[band * ROWS:(band + 1) * ROWS])
+        keys.append((band, int.from_bytes(hashlib.blake2b(rows, digest_size=8).digest(), "little") >> 1))
+    return keys
+
+
+def pack(signature) -> bytes:
+    return _SIGNATURE.pack(*signature)
+
+
+def unpack(blob: bytes):
+    return _SIGNATURE.unpack(blob)
+
+
+# ---------------------------
+# index maintenance (sync sessions; async callers use db.run_sync)
+# ---------------------------
+def index_signatures(db: Session, entries):
+    """Store (post_id, signature) pairs in the LSH index. The caller commits."""
+    entries = [(post_id, sig) for post_id, sig in entries if sig is not None]
+    if not entries:
+        return
+    ids = [post_id for post_id, _ in entries]
+    db.execute(delete(PostLshBucket).where(PostLshBucket.post_id.in_(ids)))
+    db.execute(delete(PostFingerprint).where(PostFingerprint.post_id.in_(ids)))
+    db.execute(insert(PostFingerprint), [{"post_id": post_id, "signature": pack(sig)} for post_id, sig in entries])
+    db.execute(insert(PostLshBucket), [
+        {"band": band, "bucket": bucket, "post_id": post_id}
+        for post_id, sig in entries for band, bucket in band_keys(sig)
+    ])
+
+
+def index_post(db: Session, post_id: int, content: str):
+    index_signatures(db, [(post_id, minhash(content))])
+
+
+def find_near_duplicates(db: Session, signature, threshold: float = None, statuses=None,
+                         exclude_post_id: int = None, limit: int = 5) -> list:
+    """
+    Stored posts whose similarity to `signature` is at least `threshold`,
+    best first, as [{"post_id", "similarity"}]. Only posts sharing an LSH
+    bucket are compared, so the cost depends on the number of close
+    matches, not on the archive size.
+    """
+    if signature is None:
+        return []
+    threshold = NEAR_DUPLICATE_THRESHOLD if threshold is None else threshold
+    # status/exclusion filters apply before the cap, and the cap keeps the posts
+    # sharing the most bands (the likeliest matches), so a crowded bucket of
+    # drafts can't push a posted duplicate out of the candidate set
+    hits = func.count().label("hits")
+    candidates = (
+        select(PostLshBucket.post_id, hits)
+        # joined to posts so rows of deleted posts (no FK enforcement on SQLite) never match
+        .join(Post, Post.id == PostLshBucket.post_id)
+        # OR of equalities rather than a row-value IN, so SQLite probes the (band, bucket) key per band
+        .where(or_(*(
+            and_(PostLshBucket.band == band, PostLshBucket.bucket == bucket) for band, bucket in band_keys(signature)
+        )))
+        .group_by(PostLshBucket.post_id)
+        .order_by(hits.desc(), PostLshBucket.post_id.desc())
+        .limit(MAX_CANDIDATES)
+    )
+    if exclude_post_id is not None:
+        candidates = candidates.where(PostLshBucket.post_id != exclude_post_id)
+    if statuses:
+        candidates = candidates.where(Post.status.in_(statuses))
+    candidates = candidates.subquery()
+    query = (
+        select(PostFingerprint.post_id, PostFingerprint.signature)
+        .join(candidates, candidates.c.post_id == PostFingerprint.post_id)
+    )
+
+    matches = []
+    for post_id, blob in db.execute(query):
+        score = similarity(signature, unpack(blob))
+        if score >= threshold:
+            matches.append({"post_id": post_id, "similarity": round(score, 3)})
+    matches.sort(key=lambda m: -m["similarity"])
+    return matches[:limit]
+
+
+def find_near_duplicate(db: Session, signature, **kwargs):
+    """Best match above the threshold, or None."""
+    matches = find_near_duplicates(db, signature, limit=1, **kwargs)
+    return matches[0] if matches else None
+
+
+def screen_drafts(db: Session, signatures: list) -> list:
+    """
+    Best near-duplicate match per draft, against stored posts and against
+    earlier drafts in the same list (reported as {"index": i}).
+    """
+    results = []
+    for i, signature in enumerate(signatures):
+        match = find_near_duplicate(db, signature)
+        if match is None and signature is not None:
+            earlier = [
+                (similarity(signature, other), j) for j, other in enumerate(signatures[:i]) if other is not None
+            ]
+            score, j = max(earlier, default=(0.0, None))
+            if j is not None and score >= NEAR_DUPLICATE_THRESHOLD:
+                match = {"index": j, "similarity": round(score, 3)}
+        results.append(match)
+    return results
+
+
+def record_near_duplicate(stage: str, match, blocked: bool):
+    if match is not None:
+        NEAR_DUPLICATES.labels(stage, "blocked" if blocked else "flagged").inc()
+
+
+def blocks(match) -> bool:
+    return match is not None and NEAR_DUPLICATE_ACTION == "block"
+
+
+def signature_for_post(db: Session, post: Post):
+    blob = db.execute(select(PostFingerprint.signature).where(PostFingerprint.post_id == post.id)).scalar()
+    return unpack(blob) if blob else minhash(post.content)
+
+
+def backfill_fingerprints(db: Session, batch_size: int = 500) -> int:
+    """Fingerprint posts that were inserted without one (imports, older rows). Returns posts indexed."""
+    total = 0
+    while True:
+        rows = db.execute(
+            select(Post.id, Post.content)
+            .outerjoin(PostFingerprint, PostFingerprint.post_id == Post.id)
+            .where(PostFingerprint.post_id.is_(None))
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return total
+        signatures = [(post_id, minhash(content)) for post_id, content in rows]
+        index_signatures(db, signatures)
+        # empty posts get no signature; store an empty one so they aren't re-scanned
+        empty = [post_id for post_id, signature in signatures if signature is None]
+        if empty:
+            db.execute(insert(PostFingerprint), [{"post_id": post_id, "signature": b""} for post_id in empty])
+        db.commit()
+        total += len(rows)
+
+
+def backfill_fingerprints_job():
+    db = SessionLocal()
+    try:
+        count = backfill_fingerprints(db)
+        if count:
+            print(f"[DEDUP] fingerprinted {count} posts")
+    except Exception as e:
+        db.rollback()
+        print("backfill_fingerprints_job error:", e)
+    finally:
+        db.close()
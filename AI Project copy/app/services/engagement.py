@@ -0,0 +1,68 @@
+# app/services/engagement.py
+import os
+
+DEFAULT_WEIGHTS = {"likes": 1.0, "comments": 2.0, "shares": 3.0}
+
+
+def load_weights(raw: str = None) -> dict:
+    """
+    Parse ENGAGEMENT_WEIGHTS, e.g. "likes=1,comments=2,shares=3".
+    Missing keys keep their default weight.
+    """
+    raw = raw if raw is not None else os.getenv("ENGAGEMENT_WEIGHTS", "")
+    weights = dict(DEFAULT_WEIGHTS)
+    for part in raw.split(","):
+        if "=" not in part:
+            continue
+        name, value = part.split("=", 1)
+        name = name.strip()
+        if name in weights:
+            weights[name] = float(value)
+    return weights
+
+
+WEIGHTS = load_weights()
+
+
+def engagement_score(likes, comments, shares, weights: dict = None) -> float:
+    w = weights or WEIGHTS
+    return (likes or 0) * w["likes"] + (comments or 0) * w["comments"] + (shares or 0) * w["shares"]
+
+
+def engagement_score_expr(entity, weights: dict = None):
+    """Same formula as a SQL expression over an entity with likes/comments/shares columns."""
+    w = weights or WEIGHTS
+    return entity.likes * w["likes"] + entity.comments * w["comments"] + entity.shares * w["shares"]
+
+
+def sync_engagement_scores(db) -> int:
+    """
+    Recompute stored scores that are missing or were computed with other
+    weights (e.g. after ENGAGEMENT_WEIGHTS changed). Returns rows updated.
+    """
+    from sqlalchemy import or_, update
+    from app.models.models import Analytics
+
+    expr = engagement_score_expr(Analytics)
+    result = db.execute(
+        update(Analytics)
+        .where(or_(Analytics.engagement_score.is_(None), Analytics.engagement_score != expr))
+        .values(engagement_score=expr)
+        .execution_options(synchronize_session=False)
+    )
+    db.commit()
+    return result.rowcount
+
+
+def sync_engagement_scores_job():
+    # full-table UPDATE: runs on the periodic scheduler's threads, never on the leader election thread
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print("engagement scores synced:", sync_engagement_scores(db))
+    except Exception as e:
+        db.rollback()
+        print("sync_engagement_scores_job error:", e)
+    finally:
+        db.close()
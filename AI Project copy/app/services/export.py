@@ -0,0 +1,84 @@
+# app/services/export.py
+import os
+import io
+import csv
+import json
+import zlib
+import datetime
+from sqlalchemy import or_, select
+from starlette.concurrency import run_in_threadpool
+from app.models.models import Analytics, MetricPoint, Post
+from app.services.timeseries import to_epoch
+
+# rows fetched per round trip from the server-side cursor (and per output chunk)
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+# level 1 compresses post text ~4x at a fraction of level 6's CPU cost
+EXPORT_GZIP_LEVEL = int(os.getenv("EXPORT_GZIP_LEVEL", "1"))
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+COLUMNS = (
+    "post_id", "status", "prompt", "content", "hashtags", "scheduled_time", "posted_at", "created_at",
+    "likes", "comments", "shares", "impressions", "engagement_score",
+)
+
+
+def export_query(since: datetime.datetime = None):
+    """
+    Posts joined to their analytics snapshot, in id order. With `since`,
+    only posts created, published or with an engagement observation at or
+    after that time (UTC).
+    """
+    query = (
+        select(
+            Post.id.label("post_id"), Post.status, Post.prompt, Post.content, Post.hashtags,
+            Post.scheduled_time, Post.posted_at, Post.created_at,
+            Analytics.likes, Analytics.comments, Analytics.shares, Analytics.impressions, Analytics.engagement_score,
+        )
+        .outerjoin(Analytics, Analytics.post_id == Post.id)
+        .order_by(Post.id)
+    )
+    if since is not None:
+        observed = select(MetricPoint.post_id).where(MetricPoint.ts >= to_epoch(since))
+        query = query.where(or_(Post.created_at >= since, Post.posted_at >= since, Post.id.in_(observed)))
+    return query
+
+
+def _plain(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def format_rows(rows, fmt: str, header: bool = False) -> str:
+    if fmt == "csv":
+        out = io.StringIO()
+        writer = csv.writer(out)
+        if header:
+            writer.writerow(COLUMNS)
+        writer.writerows([[_plain(value) for value in row] for row in rows])
+        return out.getvalue()
+    return "".join(json.dumps({name: _plain(value) for name, value in zip(COLUMNS, row)}) + "\n" for row in rows)
+
+
+async def export_chunks(session_factory, fmt: str, since: datetime.datetime = None):
+    """
+    Yield the export as text chunks, one per EXPORT_BATCH_SIZE rows.
+    Rows are streamed from a server-side cursor, so memory stays flat
+    however many posts there are; formatting runs off the event loop.
+    """
+    async with session_factory() as db:
+        result = await db.stream(export_query(since).execution_options(yield_per=EXPORT_BATCH_SIZE))
+        if fmt == "csv":
+            yield format_rows([], fmt, header=True)
+        async for rows in result.partitions():
+            yield await run_in_threadpool(format_rows, rows, fmt)
+
+
+async def gzip_chunks(chunks, level: int = EXPORT_GZIP_LEVEL):
+    """Compress a stream of text chunks into one gzip member as it goes."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip header + trailer
+    async for chunk in chunks:
+        data = await run_in_threadpool(compressor.compress, chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
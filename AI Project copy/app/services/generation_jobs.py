@@ -0,0 +1,380 @@
+# app/services/generation_jobs.py
+import os
+import json
+import time
+import uuid
+import socket
+import asyncio
+import ipaddress
+from urllib.parse import urlparse
+from datetime import datetime, timedelta
+import httpx
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.database import AsyncSessionLocal, SessionLocal
+from app.models.models import GenerationJob
+from app.services.metrics import GENERATION_JOBS, GENERATION_JOB_WAIT_SECONDS, GENERATION_QUEUE_DEPTH
+
+# concurrent jobs per web process (0: this process only enqueues)
+GENERATION_WORKERS = int(os.getenv("GENERATION_WORKERS", "4"))
+# idle workers re-check the table this often, for jobs queued by other processes
+JOB_POLL_SECONDS = float(os.getenv("GENERATION_JOB_POLL_SECONDS", "2"))
+# a "running" job older than this belonged to a process that died; it is queued again
+JOB_STALE_SECONDS = int(os.getenv("GENERATION_JOB_STALE_SECONDS", "300"))
+# one stale sweep per process per interval (not per worker)
+REQUEUE_INTERVAL_SECONDS = max(JOB_POLL_SECONDS, JOB_STALE_SECONDS / 10)
+# pause after a database error before a worker tries again
+WORKER_ERROR_BACKOFF_SECONDS = 1.0
+FINISH_ATTEMPTS = 3
+JOB_MAX_ATTEMPTS = 3
+CALLBACK_ATTEMPTS = 3
+CALLBACK_TIMEOUT_SECONDS = 10.0
+# callback hosts allowed to resolve to private/loopback addresses (e.g. an internal
+# service); when set, callbacks may only target these hosts
+CALLBACK_ALLOWED_HOSTS = {h.strip().lower() for h in os.getenv("GENERATION_CALLBACK_ALLOWED_HOSTS", "").split(",") if h.strip()}
+LONG_POLL_MAX_SECONDS = 60
+
+FINISHED = ("succeeded", "failed")
+
+
+class JobFailed(Exception):
+    """Raised by a job handler for a permanent failure; `detail` is stored with the job."""
+
+    def __init__(self, message: str, detail: dict = None):
+        super().__init__(message)
+        self.detail = detail
+
+
+def check_callback_url(url: str):
+    """
+    Raise ValueError unless `url` is http(s) and safe to POST to: without
+    CALLBACK_ALLOWED_HOSTS, every address the host resolves to must be
+    public (no loopback, private, link-local or reserved ranges), so
+    callers can't make the server reach internal services. Blocking (DNS).
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError("callback_url must be an http(s) URL")
+    host = parsed.hostname.lower()
+    if CALLBACK_ALLOWED_HOSTS:
+        if host not in CALLBACK_ALLOWED_HOSTS:
+            raise ValueError("callback_url host is not in GENERATION_CALLBACK_ALLOWED_HOSTS")
+        return
+    try:
+        infos = socket.getaddrinfo(host, parsed.port or (443 if parsed.scheme == "https" else 80),
+                                   type=socket.SOCK_STREAM)
+    except (socket.gaierror, UnicodeError, ValueError):
+        raise ValueError("callback_url host does not resolve")
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            raise ValueError("callback_url must not point to a private, loopback or link-local address")
+
+
+def job_view(job: GenerationJob) -> dict:
+    wait = (job.started_at - job.created_at).total_seconds() if job.started_at else None
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "attempts": job.attempts,
+        "prompt": job.prompt,
+        "post_id": job.post_id,
+        "result": json.loads(job.result) if job.result else None,
+        "error": job.error,
+        "callback_url": job.callback_url,
+        "callback_status": job.callback_status,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "wait_seconds": round(wait, 3) if wait is not None else None,
+    }
+
+
+class GenerationQueue:
+    """
+    Generation jobs persisted in generation_jobs and run by a bounded pool
+    of asyncio workers in each web process. Workers claim the oldest queued
+    job with a conditional UPDATE (queued -> running), so several processes
+    can share the table; a job left "running" by a crashed process is
+    queued again after JOB_STALE_SECONDS. Finished jobs wake long-polls in
+    this process and are POSTed to their callback URL, if any.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, workers: int = GENERATION_WORKERS):
+        self.session_factory = session_factory
+        self.workers = workers
+        self.handler = None
+        self._tasks = []
+        self._wake = None
+        self._waiters = {}  # job id -> events of long-polls waiting on it
+        self._running = set()  # ids of jobs this process is working on
+        self._deliveries = set()
+
+    # ---------------------------
+    # lifecycle
+    # ---------------------------
+    async def start(self, handler):
+        """handler(db, prompt, no_cache) -> result dict; raises JobFailed to fail the job."""
+        self.handler = handler
+        self._wake = asyncio.Event()
+        if not self.workers:
+            return
+        try:
+            await self.requeue_stale()
+        except Exception as e:
+            print("generation queue requeue error:", e)
+        self._tasks = [asyncio.create_task(self._worker(), name=f"generation-worker-{i}") for i in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._requeue_loop(), name="generation-requeue"))
+
+    async def stop(self):
+        for task in self._tasks + list(self._deliveries):
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._deliveries, return_exceptions=True)
+        self._tasks = []
+        if self._running:
+            # interrupted jobs go back to the queue instead of waiting to go stale
+            async with self.session_factory() as db:
+                await db.execute(
+                    update(GenerationJob)
+                    .where(GenerationJob.id.in_(list(self._running)), GenerationJob.status == "running")
+                    .values(status="queued", started_at=None)
+                )
+                await db.commit()
+            self._running.clear()
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    def notify(self):
+        if self._wake is not None:
+            self._wake.set()
+
+    # ---------------------------
+    # queue operations
+    # ---------------------------
+    async def enqueue(self, db: AsyncSession, prompt: str, no_cache: bool = False,
+                      callback_url: str = None) -> GenerationJob:
+        job = GenerationJob(
+            id=uuid.uuid4().hex, prompt=prompt, no_cache=no_cache, callback_url=callback_url,
+            status="queued", attempts=0, created_at=datetime.utcnow(),
+        )
+        db.add(job)
+        await db.commit()
+        self.notify()
+        return job
+
+    async def claim(self):
+        """Atomically move the oldest queued job to running; returns it or None."""
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            # idle polls stay read-only; the write transaction only starts when there is work
+            if await db.scalar(select(GenerationJob.id).where(GenerationJob.status == "queued").limit(1)) is None:
+                return None
+            oldest = (
+                select(GenerationJob.id).where(GenerationJob.status == "queued")
+                .order_by(GenerationJob.created_at).limit(1).scalar_subquery()
+            )
+            job = (await db.scalars(
+                update(GenerationJob)
+                .where(GenerationJob.id == oldest, GenerationJob.status == "queued")
+                .values(status="running", started_at=now, attempts=GenerationJob.attempts + 1)
+                .returning(GenerationJob)
+                .execution_options(synchronize_session=False)
+            )).first()
+            await db.commit()
+            return job
+
+    async def requeue_stale(self) -> int:
+        cutoff = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(GenerationJob)
+                .where(GenerationJob.status == "running", GenerationJob.started_at < cutoff)
+                .values(status="queued", started_at=None)
+            )
+            await db.commit()
+        if result.rowcount:
+            print(f"[JOBS] re-queued {result.rowcount} stale generation jobs")
+        return result.rowcount
+
+    async def get(self, job_id: str):
+        async with self.session_factory() as db:
+            return await db.get(GenerationJob, job_id)
+
+    async def wait(self, job_id: str, timeout: float):
+        """The job once it has finished or `timeout` seconds have passed (long-poll)."""
+        deadline = time.monotonic() + min(max(timeout, 0), LONG_POLL_MAX_SECONDS)
+        event = asyncio.Event()
+        self._waiters.setdefault(job_id, set()).add(event)
+        try:
+            while True:
+                job = await self.get(job_id)
+                remaining = deadline - time.monotonic()
+                if job is None or job.status in FINISHED or remaining <= 0:
+                    return job
+                # woken by a worker in this process; re-read anyway for jobs run elsewhere
+                try:
+                    await asyncio.wait_for(event.wait(), timeout=min(remaining, JOB_POLL_SECONDS))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            waiters = self._waiters.get(job_id)
+            if waiters is not None:
+                waiters.discard(event)
+                if not waiters:
+                    del self._waiters[job_id]
+
+    async def stats(self, db: AsyncSession) -> dict:
+        counts = dict((await db.execute(
+            select(GenerationJob.status, func.count()).where(GenerationJob.status.in_(("queued", "running")))
+            .group_by(GenerationJob.status)
+        )).all())
+        oldest = await db.scalar(select(func.min(GenerationJob.created_at)).where(GenerationJob.status == "queued"))
+        return {
+            "queued": counts.get("queued", 0),
+            "running": counts.get("running", 0),
+            "oldest_queued_seconds": round((datetime.utcnow() - oldest).total_seconds(), 3) if oldest else 0.0,
+            "workers": self.workers if self._tasks else 0,
+        }
+
+    # ---------------------------
+    # workers
+    # ---------------------------
+    async def _worker(self):
+        while True:
+            try:
+                job = await self.claim()
+                if job is None:
+                    self._wake.clear()
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), timeout=JOB_POLL_SECONDS)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                # another waiting job may be claimable by an idle worker
+                self.notify()
+                await self._process(job)
+            except Exception as e:
+                # e.g. "database is locked": keep the worker alive and try again
+                print("generation worker error:", e)
+                await asyncio.sleep(WORKER_ERROR_BACKOFF_SECONDS)
+
+    async def _requeue_loop(self):
+        while True:
+            await asyncio.sleep(REQUEUE_INTERVAL_SECONDS)
+            try:
+                await self.requeue_stale()
+            except Exception as e:
+                print("generation queue requeue error:", e)
+
+    async def _process(self, job: GenerationJob):
+        GENERATION_JOB_WAIT_SECONDS.observe((job.started_at - job.created_at).total_seconds())
+        self._running.add(job.id)
+        values = {"finished_at": None}
+        try:
+            async with self.session_factory() as db:
+                result = await self.handler(db, job.prompt, job.no_cache)
+            values.update(status="succeeded", result=json.dumps(result, default=str),
+                          post_id=(result.get("post") or {}).get("id"), error=None)
+        except JobFailed as e:
+            values.update(status="failed", error=str(e), result=json.dumps(e.detail, default=str) if e.detail else None)
+        except Exception as e:
+            print(f"generation job {job.id} error:", e)
+            retry = job.attempts < JOB_MAX_ATTEMPTS
+            values.update(status="queued" if retry else "failed", error=str(e), started_at=None)
+
+        if values["status"] != "queued":
+            values["finished_at"] = datetime.utcnow()
+        finished = await self._finish(job, values)
+        # still "running" in the table if every attempt failed: stop() or the stale sweep re-queues it
+        if finished is None:
+            return
+        self._running.discard(job.id)
+        if finished is False:
+            # re-queued as stale and claimed again meanwhile: that run owns the outcome
+            print(f"generation job {job.id} is no longer ours, result dropped")
+            return
+        if finished.status not in FINISHED:
+            return
+        GENERATION_JOBS.labels(finished.status).inc()
+        for event in self._waiters.get(job.id, ()):
+            event.set()
+        if finished.callback_url:
+            task = asyncio.create_task(self._deliver(job_view(finished)))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+
+    async def _finish(self, job: GenerationJob, values: dict):
+        """Store a job's outcome, retrying transient database errors.
+
+        Only writes while the job is still this run's claim. Returns the updated job,
+        False if the job was re-queued or claimed again meanwhile, or None if it couldn't be saved.
+        """
+        for attempt in range(FINISH_ATTEMPTS):
+            try:
+                async with self.session_factory() as db:
+                    result = await db.execute(
+                        update(GenerationJob)
+                        .where(GenerationJob.id == job.id, GenerationJob.status == "running",
+                               GenerationJob.started_at == job.started_at)
+                        .values(**values)
+                    )
+                    await db.commit()
+                    if result.rowcount == 0:
+                        return False
+                    return await db.get(GenerationJob, job.id)
+            except Exception as e:
+                print(f"generation job {job.id} could not be saved:", e)
+                await asyncio.sleep(WORKER_ERROR_BACKOFF_SECONDS * (attempt + 1))
+        return None
+
+    async def _deliver(self, view: dict):
+        """POST the finished job to its callback URL, retrying with backoff; records the outcome."""
+        status = "failed"
+        body = json.loads(json.dumps(view, default=str))
+        try:
+            # checked again here: the name may resolve differently than when the job was queued
+            await run_in_threadpool(check_callback_url, view["callback_url"])
+        except ValueError as e:
+            print(f"generation job {view['job_id']} callback refused:", e)
+            await self._save_callback_status(view["job_id"], "refused")
+            return
+        # no redirects: a public URL mustn't bounce the POST to an internal one
+        async with httpx.AsyncClient(timeout=CALLBACK_TIMEOUT_SECONDS, follow_redirects=False) as http:
+            for attempt in range(CALLBACK_ATTEMPTS):
+                try:
+                    r = await http.post(view["callback_url"], json=body)
+                    if r.status_code < 300:
+                        status = "delivered"
+                        break
+                    print(f"generation job {view['job_id']} callback returned {r.status_code}")
+                except httpx.HTTPError as e:
+                    print(f"generation job {view['job_id']} callback failed:", e)
+                if attempt + 1 < CALLBACK_ATTEMPTS:
+                    await asyncio.sleep(2 ** attempt)
+        await self._save_callback_status(view["job_id"], status)
+
+    async def _save_callback_status(self, job_id: str, status: str):
+        try:
+            async with self.session_factory() as db:
+                await db.execute(update(GenerationJob).where(GenerationJob.id == job_id).values(callback_status=status))
+                await db.commit()
+        except Exception as e:
+            print(f"generation job {job_id} callback status not saved:", e)
+
+
+def queue_depth() -> int:
+    """Jobs waiting for a worker (sync, for the Prometheus gauge)."""
+    db = SessionLocal()
+    try:
+        return db.scalar(select(func.count()).select_from(GenerationJob).where(GenerationJob.status == "queued"))
+    finally:
+        db.close()
+
+
+generation_queue = GenerationQueue()
+
+# evaluated at scrape time, like publish_queue_due
+GENERATION_QUEUE_DEPTH.set_function(queue_depth)
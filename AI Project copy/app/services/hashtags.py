@@ -0,0 +1,199 @@
+# app/services/hashtags.py
+import os
+import re
+import time
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from app.database import dialect_insert
+from app.models.models import Analytics, Hashtag, Post, PostHashtag
+
+# tags a publish run adds to mark a post; they say nothing about the topic
+SYSTEM_TAGS = {"autoposted", "published"}
+AUTO_POSTED_TAG = "#AutoPosted"
+DEFAULT_HASHTAGS = "#AI #LinkedIn"
+
+# a tag needs this many posts with analytics before it is suggested
+SUGGEST_MIN_POSTS = int(os.getenv("HASHTAG_SUGGEST_MIN_POSTS", "2"))
+# suggestions rank recent performance; 0 = all time
+SUGGEST_DAYS = int(os.getenv("HASHTAG_SUGGEST_DAYS", "90"))
+SUGGEST_POOL = 50
+SUGGEST_CACHE_TTL_SECONDS = float(os.getenv("HASHTAG_SUGGEST_CACHE_TTL_SECONDS", "300"))
+
+SORTS = ("avg_engagement", "total_engagement", "posts")
+
+_HASHTAG = re.compile(r"#(\w+)")
+_WORD = re.compile(r"\w+")
+
+
+def parse_hashtags(text: str) -> list:
+    """
+    [(tag, display)] for each distinct hashtag in order of first mention.
+    `tag` is case-folded ("#AI" and "#ai" are one tag); publish markers and
+    pure numbers ("#1") are skipped.
+    """
+    found = {}
+    for display in _HASHTAG.findall(text or ""):
+        tag = display.casefold()
+        if tag in found or tag in SYSTEM_TAGS or display.isdigit():
+            continue
+        found[tag] = display
+    return list(found.items())
+
+
+def add_marker(hashtags: str, marker: str = AUTO_POSTED_TAG) -> str:
+    """Append a publish marker once; republishing doesn't grow the string."""
+    hashtags = (hashtags or "").strip()
+    present = {display.casefold() for display in _HASHTAG.findall(hashtags)}
+    if marker.lstrip("#").casefold() in present:
+        return hashtags
+    return f"{hashtags} {marker}".strip()
+
+
+# ---------------------------
+# index maintenance (sync sessions; async callers use db.run_sync)
+# ---------------------------
+def _hashtag_ids(db: Session, parsed: dict) -> dict:
+    """tag -> hashtags.id, creating missing tags (first spelling seen becomes the display)."""
+    if not parsed:
+        return {}
+    db.execute(
+        dialect_insert(db, Hashtag).on_conflict_do_nothing(index_elements=["tag"]),
+        [{"tag": tag, "display": display} for tag, display in parsed.items()],
+    )
+    return dict(db.execute(select(Hashtag.tag, Hashtag.id).where(Hashtag.tag.in_(list(parsed)))).all())
+
+
+def index_hashtags(db: Session, entries):
+    """Replace the tag links of each (post_id, hashtags string). The caller commits."""
+    entries = [(post_id, parse_hashtags(text)) for post_id, text in entries]
+    if not entries:
+        return
+    parsed = {}
+    for _post_id, tags in entries:
+        for tag, display in tags:
+            parsed.setdefault(tag, display)
+    ids = _hashtag_ids(db, parsed)
+    db.execute(delete(PostHashtag).where(PostHashtag.post_id.in_([post_id for post_id, _ in entries])))
+    links = [{"post_id": post_id, "hashtag_id": ids[tag]} for post_id, tags in entries for tag, _display in tags]
+    if links:
+        db.execute(insert(PostHashtag), links)
+
+
+def index_post_hashtags(db: Session, post_id: int, hashtags: str):
+    index_hashtags(db, [(post_id, hashtags)])
+
+
+def rebuild_hashtags(db: Session, batch_size: int = 1000) -> int:
+    """Re-index every post's hashtags (bulk loads that bypass the API). Returns posts scanned."""
+    total = 0
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(Post.id, Post.hashtags).where(Post.id > last_id).order_by(Post.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return total
+        index_hashtags(db, rows)
+        db.commit()
+        total += len(rows)
+        last_id = rows[-1][0]
+
+
+# ---------------------------
+# analytics
+# ---------------------------
+def hashtag_performance(db: Session, limit: int = 20, days: int = None, min_posts: int = 1,
+                        sort: str = "avg_engagement") -> list:
+    """
+    Engagement per hashtag, aggregated in SQL over post_hashtags x analytics.
+    Only posts with analytics count; `days` limits to analytics recorded in
+    the last N days.
+    """
+    per_tag = (
+        select(
+            PostHashtag.hashtag_id,
+            func.count(Analytics.id).label("posts"),
+            func.sum(Analytics.likes).label("likes"),
+            func.sum(Analytics.comments).label("comments"),
+            func.sum(Analytics.shares).label("shares"),
+            func.sum(Analytics.impressions).label("impressions"),
+            func.sum(Analytics.engagement_score).label("total_engagement"),
+            func.avg(Analytics.engagement_score).label("avg_engagement"),
+        )
+        # "+ 0" keeps SQLite from probing analytics per link: it scans analytics
+        # (where the days filter applies) and looks links up by post_id instead
+        .join(Analytics, Analytics.post_id + 0 == PostHashtag.post_id)
+        .group_by(PostHashtag.hashtag_id)
+        .having(func.count(Analytics.id) >= max(1, min_posts))
+    )
+    if days is not None:
+        per_tag = per_tag.where(Analytics.created_at >= datetime.utcnow() - timedelta(days=days))
+    per_tag = per_tag.subquery()
+    order = per_tag.c[sort if sort in SORTS else "avg_engagement"]
+
+    rows = db.execute(
+        select(Hashtag.tag, Hashtag.display, per_tag)
+        .join(per_tag, per_tag.c.hashtag_id == Hashtag.id)
+        .order_by(order.desc(), per_tag.c.posts.desc(), Hashtag.tag)
+        .limit(limit)
+    ).all()
+    return [
+        {
+            "hashtag": f"#{row.display}",
+            "tag": row.tag,
+            "posts": row.posts,
+            "likes": row.likes or 0,
+            "comments": row.comments or 0,
+            "shares": row.shares or 0,
+            "impressions": row.impressions or 0,
+            "total_engagement": round(row.total_engagement or 0, 2),
+            "avg_engagement": round(row.avg_engagement or 0, 2),
+        }
+        for row in rows
+    ]
+
+
+_suggest_cache = {}  # days -> (expires, ranking)
+_suggest_lock = threading.Lock()
+
+
+def _suggestion_pool(db: Session, days: int = None) -> list:
+    now = time.monotonic()
+    with _suggest_lock:
+        cached = _suggest_cache.get(days)
+        if cached and cached[0] > now:
+            return cached[1]
+    ranking = hashtag_performance(db, limit=SUGGEST_POOL, days=days, min_posts=SUGGEST_MIN_POSTS)
+    with _suggest_lock:
+        _suggest_cache[days] = (now + SUGGEST_CACHE_TTL_SECONDS, ranking)
+    return ranking
+
+
+def invalidate_suggestions():
+    with _suggest_lock:
+        _suggest_cache.clear()
+
+
+def suggest_hashtags(db: Session, text: str = None, limit: int = 3, days: int = None) -> list:
+    """
+    Best-performing hashtags by average engagement over the last `days`
+    (default HASHTAG_SUGGEST_DAYS). Tags whose word appears in `text` (e.g.
+    the prompt) come first. The ranking is cached for
+    HASHTAG_SUGGEST_CACHE_TTL_SECONDS.
+    """
+    if days is None:
+        days = SUGGEST_DAYS or None
+    ranking = _suggestion_pool(db, days)
+    words = {word.casefold() for word in _WORD.findall(text or "")}
+    relevant = [row for row in ranking if row["tag"] in words]
+    others = [row for row in ranking if row["tag"] not in words]
+    return (relevant + others)[:limit]
+
+
+def suggested_hashtags_text(db: Session, text: str = None, limit: int = 3) -> str:
+    """Suggestions as a hashtags string, or DEFAULT_HASHTAGS before there is data."""
+    suggestions = suggest_hashtags(db, text, limit)
+    return " ".join(row["hashtag"] for row in suggestions) or DEFAULT_HASHTAGS
+
@@ -0,0 +1,235 @@
+# app/services/importer.py
+import os
+import csv
+import json
+import datetime
+from typing import Optional
+from pydantic import BaseModel, Field, ValidationError, field_validator, model_validator
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.database import SessionLocal
+from app.models.models import Analytics, Post, PostExternalId
+from app.services.analytics_rollup import apply_analytics_delta
+from app.services.engagement import engagement_score
+from app.services.hashtags import index_hashtags
+
+# rows per INSERT batch / transaction
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "2000"))
+MAX_REPORTED_ERRORS = 100
+# re-runs of a batch that lost an external_id race to a concurrent import
+IMPORT_CONFLICT_RETRIES = 3
+
+FORMATS = ("ndjson", "csv")
+STATUSES = ("draft", "scheduled", "posted", "failed")
+METRIC_FIELDS = ("likes", "comments", "shares", "impressions")
+
+
+class ImportRow(BaseModel):
+    """
+    One imported post. Without a status, rows with a scheduled_time are
+    scheduled and rows with a posted_at or metrics are posted.
+    """
+    external_id: str = Field(min_length=1, max_length=255)
+    content: str = Field(min_length=1)
+    prompt: Optional[str] = None
+    hashtags: Optional[str] = None
+    status: Optional[str] = None
+    scheduled_time: Optional[datetime.datetime] = None
+    posted_at: Optional[datetime.datetime] = None
+    created_at: Optional[datetime.datetime] = None
+    likes: Optional[int] = Field(default=None, ge=0)
+    comments: Optional[int] = Field(default=None, ge=0)
+    shares: Optional[int] = Field(default=None, ge=0)
+    impressions: Optional[int] = Field(default=None, ge=0)
+
+    @field_validator("external_id", "content", mode="before")
+    @classmethod
+    def _strip(cls, value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return str(value)  # numeric ids from NDJSON
+        return value.strip() if isinstance(value, str) else value
+
+    @field_validator("scheduled_time", "posted_at", "created_at")
+    @classmethod
+    def _utc_naive(cls, value):
+        if value is not None and value.tzinfo is not None:
+            return value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return value
+
+    @model_validator(mode="after")
+    def _check_status(self):
+        if self.status is None:
+            if self.scheduled_time is not None:
+                self.status = "scheduled"
+            elif self.posted_at is not None or self.has_metrics:
+                self.status = "posted"
+            else:
+                self.status = "draft"
+        if self.status not in STATUSES:
+            raise ValueError(f"status must be one of {', '.join(STATUSES)}")
+        if self.status == "scheduled" and self.scheduled_time is None:
+            raise ValueError("scheduled rows need a scheduled_time")
+        return self
+
+    @property
+    def has_metrics(self) -> bool:
+        return any(getattr(self, field) is not None for field in METRIC_FIELDS)
+
+
+def read_records(lines, fmt: str = "ndjson"):
+    """
+    Yield (line number, record dict, error) for each row of an NDJSON or CSV
+    stream. Empty CSV cells count as missing; for NDJSON, metrics may also
+    be nested under "analytics".
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for record in reader:
+            # reader.line_num is the last physical line of the record (quoted cells may span lines)
+            yield reader.line_num, {k: v for k, v in record.items() if k is not None and v not in ("", None)}, None
+        return
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"invalid JSON: {e}"
+            continue
+        if not isinstance(record, dict):
+            yield number, None, "expected a JSON object"
+            continue
+        nested = record.pop("analytics", None)
+        if isinstance(nested, dict):
+            for field in METRIC_FIELDS:
+                record.setdefault(field, nested.get(field))
+        yield number, record, None
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc']) or 'row'}: {e['msg']}" for e in error.errors()
+    )
+
+
+def insert_batch(db: Session, rows: list, dry_run: bool = False) -> dict:
+    """
+    Insert validated rows in one transaction: posts, external ids, analytics
+    snapshots and hashtag links, each as a single multi-row statement.
+    Rows whose external_id was already imported (or repeats within the
+    batch) are skipped.
+    """
+    for attempt in range(IMPORT_CONFLICT_RETRIES):
+        try:
+            return _insert_batch(db, rows, dry_run)
+        except IntegrityError:
+            # a concurrent import committed some of these external ids after our
+            # check: roll the batch back and re-run it, those rows are now skips
+            db.rollback()
+            if attempt + 1 == IMPORT_CONFLICT_RETRIES:
+                raise
+            print(f"[IMPORT] external_id conflict with a concurrent import, retrying batch of {len(rows)}")
+
+
+def _insert_batch(db: Session, rows: list, dry_run: bool) -> dict:
+    unique = {}
+    for row in rows:
+        unique.setdefault(row.external_id, row)
+    existing = set(db.scalars(
+        select(PostExternalId.external_id).where(PostExternalId.external_id.in_(list(unique)))
+    ))
+    new = [row for external_id, row in unique.items() if external_id not in existing]
+    counts = {"imported": len(new), "skipped": len(rows) - len(new), "scheduled": sum(r.status == "scheduled" for r in new)}
+    if dry_run or not new:
+        return counts
+
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    # Core insert on the table: the ORM bulk path splits rows into a statement per
+    # run of identical non-NULL column sets. RETURNING without sort_by_parameter_order,
+    # which SQLite can only honour one row per statement; ids are handed out in row
+    # order (rowid max+1 / sequence), so sorting them restores the mapping.
+    posts = Post.__table__
+    post_ids = sorted(db.execute(insert(posts).returning(posts.c.id), [
+        {
+            "prompt": row.prompt,
+            "content": row.content,
+            "hashtags": row.hashtags,
+            "status": row.status,
+            "scheduled_time": row.scheduled_time,
+            "posted_at": row.posted_at,
+            "created_at": row.created_at or now,
+        }
+        for row in new
+    ]).scalars().all())
+    db.execute(insert(PostExternalId), [
+        {"external_id": row.external_id, "post_id": post_id} for row, post_id in zip(new, post_ids)
+    ])
+
+    analytics = []
+    for row, post_id in zip(new, post_ids):
+        if row.has_metrics:
+            metrics = {field: getattr(row, field) or 0 for field in METRIC_FIELDS}
+            analytics.append({
+                "post_id": post_id,
+                "engagement_score": engagement_score(metrics["likes"], metrics["comments"], metrics["shares"]),
+                "created_at": row.posted_at or row.created_at or now,
+                **metrics,
+            })
+    if analytics:
+        db.execute(insert(Analytics), analytics)
+        apply_analytics_delta(db, posts=len(analytics), **{
+            field: sum(a[field] for a in analytics) for field in METRIC_FIELDS
+        })
+    index_hashtags(db, [(post_id, row.hashtags) for row, post_id in zip(new, post_ids) if row.hashtags])
+    db.commit()
+    return counts
+
+
+def import_posts(db: Session, lines, fmt: str = "ndjson", dry_run: bool = False,
+                 batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """
+    Validate rows in one streaming pass and insert the valid ones in
+    batches of `batch_size`. Invalid rows are reported (first
+    MAX_REPORTED_ERRORS) and skipped; re-running an import is a no-op for
+    rows already imported. Near-duplicate fingerprints are left to the
+    background backfill.
+    """
+    summary = {"rows": 0, "imported": 0, "skipped": 0, "invalid": 0, "scheduled": 0, "errors": []}
+    batch = []
+
+    def flush():
+        for key, value in insert_batch(db, batch, dry_run).items():
+            summary[key] += value
+        batch.clear()
+
+    for line, record, error in read_records(lines, fmt):
+        summary["rows"] += 1
+        if error is None:
+            try:
+                batch.append(ImportRow.model_validate(record))
+            except ValidationError as e:
+                error = _describe(e)
+        if error is not None:
+            summary["invalid"] += 1
+            if len(summary["errors"]) < MAX_REPORTED_ERRORS:
+                summary["errors"].append({"line": line, "external_id": (record or {}).get("external_id"), "error": error})
+            continue
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return summary
+
+
+def import_file(f, fmt: str = "ndjson", dry_run: bool = False, batch_size: int = IMPORT_BATCH_SIZE) -> dict:
+    """import_posts() over a text file object, in its own session."""
+    db = SessionLocal()
+    try:
+        return import_posts(db, f, fmt, dry_run, batch_size)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
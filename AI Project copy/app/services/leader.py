@@ -0,0 +1,170 @@
+# app/services/leader.py
+import os
+import time
+import uuid
+import socket
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import case, or_, update
+from sqlalchemy.exc import IntegrityError
+from app.database import SessionLocal
+from app.models.models import LeaderLease
+from app.services.metrics import LEADER
+
+LEASE_TTL_SECONDS = float(os.getenv("LEADER_LEASE_TTL_SECONDS", "15"))
+# how often the leader renews and followers retry; a third of the TTL by default
+RENEW_SECONDS = float(os.getenv("LEADER_RENEW_SECONDS", str(LEASE_TTL_SECONDS / 3)))
+
+
+def default_holder_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderElector:
+    """
+    Leader election through a lease row in the shared database.
+
+    Every candidate runs a thread that, every RENEW_SECONDS, tries one
+    conditional UPDATE: take the lease if it is ours or has expired. The
+    leader keeps renewing; followers take over once it stops (crash:
+    within TTL + one retry; clean shutdown: release() expires it, so
+    within one retry). A leader that can't renew before its lease runs
+    out demotes itself, so two leaders never overlap for longer than a
+    clock-skew margin. `term` goes up on every change of leader.
+    """
+
+    def __init__(self, name: str = "scheduler", ttl: float = LEASE_TTL_SECONDS, renew_every: float = None,
+                 session_factory=SessionLocal, on_elected=None, on_demoted=None, holder: str = None):
+        self.name = name
+        self.ttl = ttl
+        self.renew_every = renew_every if renew_every is not None else min(RENEW_SECONDS, ttl / 3)
+        self.session_factory = session_factory
+        self.on_elected = on_elected
+        self.on_demoted = on_demoted
+        self.holder = holder or default_holder_id()
+        self.term = None
+        self._leader = False
+        self._valid_until = 0.0  # monotonic deadline of our current lease
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader and time.monotonic() < self._valid_until
+
+    # ---------------------------
+    # lease operations
+    # ---------------------------
+    def try_acquire(self) -> bool:
+        """One election round: renew our lease or take an expired one. Returns True if we lead."""
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=self.ttl)
+        ours = LeaderLease.holder == self.holder
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                update(LeaderLease)
+                .where(LeaderLease.name == self.name, or_(ours, LeaderLease.expires_at < now))
+                .values(
+                    # evaluated against the old row: a new holder starts a new term
+                    term=case((ours, LeaderLease.term), else_=LeaderLease.term + 1),
+                    acquired_at=case((ours, LeaderLease.acquired_at), else_=now),
+                    holder=self.holder,
+                    renewed_at=now,
+                    expires_at=expires_at,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 0:
+                if db.get(LeaderLease, self.name) is not None:
+                    db.rollback()
+                    return False
+                db.add(LeaderLease(name=self.name, holder=self.holder, term=1,
+                                   acquired_at=now, renewed_at=now, expires_at=expires_at))
+            db.commit()
+            self.term = db.get(LeaderLease, self.name).term
+            return True
+        except IntegrityError:
+            # another candidate inserted the first lease row at the same time
+            db.rollback()
+            return False
+        finally:
+            db.close()
+
+    def release(self):
+        """Expire our lease now so a follower can take over on its next retry."""
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(LeaderLease)
+                .where(LeaderLease.name == self.name, LeaderLease.holder == self.holder)
+                .values(expires_at=datetime.utcnow() - timedelta(seconds=1))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print("[LEADER] release failed:", e)
+        finally:
+            db.close()
+
+    # ---------------------------
+    # election loop
+    # ---------------------------
+    def step(self) -> bool:
+        """Run one round and fire on_elected / on_demoted on transitions."""
+        started = time.monotonic()
+        try:
+            acquired = self.try_acquire()
+            lost = not acquired
+        except Exception as e:
+            # database unavailable: keep leading until our lease would have run out
+            print("[LEADER] lease renewal failed:", e)
+            acquired, lost = False, False
+
+        if acquired:
+            # measured from before the round, so we never outlive the lease in the DB
+            self._valid_until = started + self.ttl
+            if not self._leader:
+                self._leader = True
+                LEADER.labels(self.name).set(1)
+                print(f"[LEADER] {self.holder} is now leader for {self.name} (term {self.term})")
+                if self.on_elected:
+                    self.on_elected()
+        elif self._leader and (lost or time.monotonic() >= self._valid_until):
+            self._demote()
+        return self._leader
+
+    def _demote(self):
+        self._leader = False
+        self._valid_until = 0.0
+        LEADER.labels(self.name).set(0)
+        print(f"[LEADER] {self.holder} stepped down for {self.name}")
+        if self.on_demoted:
+            self.on_demoted()
+
+    def start(self) -> bool:
+        """Run the first round synchronously, then keep electing in a thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return self._leader
+        self._stop.clear()
+        self.step()
+        self._thread = threading.Thread(target=self._run, name=f"leader-{self.name}", daemon=True)
+        self._thread.start()
+        return self._leader
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._leader:
+            self._demote()
+            self.release()
+
+    def _run(self):
+        while not self._stop.wait(self.renew_every):
+            try:
+                self.step()
+            except Exception as e:  # a failing callback must not end the election loop
+                print("[LEADER] election round failed:", e)
@@ -0,0 +1,65 @@
+# app/services/linkedin_publisher.py
+import os
+import requests
+from app.services.publisher import Publisher, PublishResult, PublishError
+
+UGC_POSTS_URL = "https://api.linkedin.com/v2/ugcPosts"
+
+
+class LinkedInPublisher(Publisher):
+    """
+    Publishes through the LinkedIn UGC Posts API.
+    Needs LINKEDIN_ACCESS_TOKEN (w_member_social) and LINKEDIN_AUTHOR_URN
+    (e.g. urn:li:person:abc123). The default rate is conservative; set
+    PUBLISH_RATE_PER_SECOND / PUBLISH_BURST (read by get_publish_pool,
+    they override these defaults) to the quota of your app.
+    """
+    name = "linkedin"
+    rate_per_second = 1.0
+    burst = 5
+
+    def __init__(self, access_token: str = None, author_urn: str = None, timeout: float = 15.0):
+        self.access_token = access_token or os.getenv("LINKEDIN_ACCESS_TOKEN")
+        self.author_urn = author_urn or os.getenv("LINKEDIN_AUTHOR_URN")
+        self.timeout = timeout
+        # one pooled session shared by all publish workers
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {self.access_token}",
+            "X-Restli-Protocol-Version": "2.0.0",
+            "Content-Type": "application/json",
+        })
+
+    def publish(self, post) -> PublishResult:
+        if not self.access_token or not self.author_urn:
+            raise PublishError("LINKEDIN_ACCESS_TOKEN / LINKEDIN_AUTHOR_URN not configured", retryable=False)
+
+        text = post.content
+        if post.hashtags and post.hashtags not in text:
+            text = f"{text}\n\n{post.hashtags}"
+        payload = {
+            "author": self.author_urn,
+            "lifecycleState": "PUBLISHED",
+            "specificContent": {
+                "com.linkedin.ugc.ShareContent": {
+                    "shareCommentary": {"text": text},
+                    "shareMediaCategory": "NONE",
+                }
+            },
+            "visibility": {"com.linkedin.ugc.MemberNetworkVisibility": "PUBLIC"},
+        }
+        try:
+            r = self.session.post(UGC_POSTS_URL, json=payload, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise PublishError(f"LinkedIn request failed: {e}", retryable=True)
+
+        if r.status_code in (200, 201):
+            return PublishResult(urn=r.headers.get("X-RestLi-Id") or r.json().get("id"))
+        if r.status_code == 429 or r.status_code >= 500:
+            retry_after = r.headers.get("Retry-After")
+            raise PublishError(
+                f"LinkedIn returned {r.status_code}",
+                retryable=True,
+                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None,
+            )
+        raise PublishError(f"LinkedIn returned {r.status_code}: {r.text[:200]}", retryable=False)
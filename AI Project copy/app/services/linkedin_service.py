@@ -1,81 +1,61 @@
 import random
-from app.database import SessionLocal
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.models import Profile
+from app.services.taxonomy import get_taxonomy
 
-def analyze_linkedin_profile(profile_id: int = None):
+async def analyze_linkedin_profile(db: AsyncSession, profile_id: int = None):
     """
     Mock LinkedIn profile analysis.
     In a real implementation, this would connect to LinkedIn API.
+    The caller owns the session (e.g. Depends(get_async_db)).
     """
-    db = SessionLocal()
-    try:
-        # Get profile from database if ID provided, otherwise get first profile
-        if profile_id:
-            profile = db.query(Profile).filter(Profile.id == profile_id).first()
-        else:
-            profile = db.query(Profile).first()
-            
-        if not profile:
-            # Return a default profile for demo purposes
-            return {
-                "name": "Demo User",
-                "headline": "AI Enthusiast & Developer",
-                "about": "Passionate about AI and technology. Sharing insights on LinkedIn.",
-                "skills": ["AI", "Machine Learning", "Python", "Data Science"],
-                "interests": ["Technology", "Innovation", "Startups"],
-                "experience": "5+ years in tech industry"
-            }
-        
-        # Extract mock skills and interests based on profile content
-        skills = extract_mock_skills(profile)
-        interests = extract_mock_interests(profile)
-        
+    # Get profile from database if ID provided, otherwise get first profile
+    if profile_id:
+        profile = await db.get(Profile, profile_id)
+    else:
+        profile = (await db.execute(select(Profile).limit(1))).scalar_one_or_none()
+
+    if not profile:
+        # Return a default profile for demo purposes
         return {
-            "name": profile.name,
-            "headline": profile.headline or "Professional",
-            "about": profile.about or "LinkedIn user",
-            "skills": skills,
-            "interests": interests,
-            "experience": "Experience level unknown"
+            "name": "Demo User",
+            "headline": "AI Enthusiast & Developer",
+            "about": "Passionate about AI and technology. Sharing insights on LinkedIn.",
+            "skills": ["AI", "Machine Learning", "Python", "Data Science"],
+            "interests": ["Technology", "Innovation", "Startups"],
+            "experience": "5+ years in tech industry"
         }
-    finally:
-        db.close()
-
-def extract_mock_skills(profile):
-    """Extract mock skills from profile content."""
-    # In a real implementation, this would use NLP to extract skills
-    base_skills = ["Communication", "Leadership", "Problem Solving", "Teamwork"]
     
-    # Add skills based on profile content
-    if profile.about:
-        if "ai" in profile.about.lower() or "artificial intelligence" in profile.about.lower():
-            base_skills.extend(["AI", "Machine Learning"])
-        if "data" in profile.about.lower():
-            base_skills.extend(["Data Analysis", "Statistics"])
-        if "python" in profile.about.lower():
-            base_skills.append("Python")
-        if "marketing" in profile.about.lower():
-            base_skills.extend(["Digital Marketing", "Content Strategy"])
+    # Match the profile text against the skills/interests taxonomy (one pass, cached)
+    skills, interests = extract_skills_and_interests(profile)
     
-    return base_skills[:5]  # Limit to 5 skills
+    return {
+        "name": profile.name,
+        "headline": profile.headline or "Professional",
+        "about": profile.about or "LinkedIn user",
+        "skills": skills,
+        "interests": interests,
+        "experience": "Experience level unknown"
+    }
 
-def extract_mock_interests(profile):
-    """Extract mock interests from profile content."""
-    # In a real implementation, this would use NLP to extract interests
-    base_interests = ["Technology", "Innovation", "Professional Development"]
-    
-    # Add interests based on profile content
-    if profile.about:
-        if "ai" in profile.about.lower() or "artificial intelligence" in profile.about.lower():
-            base_interests.extend(["AI Research", "Machine Learning"])
-        if "data" in profile.about.lower():
-            base_interests.append("Data Science")
-        if "startup" in profile.about.lower():
-            base_interests.append("Entrepreneurship")
-        if "marketing" in profile.about.lower():
-            base_interests.extend(["Digital Marketing", "Personal Branding"])
-    
-    return base_interests[:4]  # Limit to 4 interests
+DEFAULT_SKILLS = ["Communication", "Leadership", "Problem Solving", "Teamwork"]
+DEFAULT_INTERESTS = ["Technology", "Innovation", "Professional Development"]
+
+def _top_terms(found: list, defaults: list, limit: int) -> list:
+    # taxonomy matches first (in order of mention), padded with generic defaults
+    terms = list(found)
+    terms.extend(term for term in defaults if term not in found)
+    return terms[:limit]
+
+def extract_skills_and_interests(profile, skills_limit: int = 5, interests_limit: int = 4):
+    """Skills and interests mentioned in the profile headline and about text."""
+    text = " ".join(part for part in (profile.headline, profile.about) if part)
+    found = get_taxonomy().extract(text)
+    return (
+        _top_terms(found.get("skills", []), DEFAULT_SKILLS, skills_limit),
+        _top_terms(found.get("interests", []), DEFAULT_INTERESTS, interests_limit),
+    )
 
 def get_mock_trends(industry_keywords: list = None):
     """
@@ -0,0 +1,228 @@
+# app/services/llm_client.py
+import os
+import json
+import time
+import asyncio
+import httpx
+from app.services.metrics import LLM_REQUEST_SECONDS, LLM_TOKENS
+
+try:
+    import h2  # noqa: F401  (enables HTTP/2 when installed)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+GROQ_BASE_URL = "https://api.groq.com/openai/v1"
+DEFAULT_MODEL = "llama3-8b-8192"
+
+
+class LLMError(Exception):
+    """Raised when the provider returns an error or the call misses its deadline."""
+
+
+class LLMClient:
+    """
+    Shared async client for OpenAI-compatible chat completion APIs (Groq).
+    Keeps one pooled (HTTP/2 when available) connection per event loop and
+    caps the number of in-flight provider calls.
+    """
+
+    def __init__(self, base_url: str, api_key: str = None, max_concurrency: int = 8,
+                 timeout: float = 20.0, max_connections: int = 20):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._http = None
+        self._semaphore = None
+        self._loop = None
+
+    def _ensure_http(self):
+        # httpx pools and asyncio semaphores are bound to the loop that created them
+        loop = asyncio.get_running_loop()
+        if self._http is None or self._loop is not loop:
+            headers = {"Content-Type": "application/json"}
+            if self.api_key:
+                headers["Authorization"] = f"Bearer {self.api_key}"
+            self._http = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=headers,
+                http2=HTTP2_AVAILABLE,
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._http
+
+    async def chat(self, messages: list, model: str = DEFAULT_MODEL, temperature: float = 0.7,
+                   max_tokens: int = 500, timeout: float = None) -> dict:
+        """
+        POST /chat/completions and return the decoded JSON response.
+        `timeout` is a deadline for the whole call, including time spent
+        waiting for a free concurrency slot. A reply that isn't JSON or has
+        no choices[0].message.content raises LLMError like a failed call.
+        """
+        http = self._ensure_http()
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        deadline = timeout if timeout is not None else self.timeout
+
+        async def _call():
+            async with self._semaphore:
+                r = await http.post("/chat/completions", json=payload)
+            if r.status_code != 200:
+                raise LLMError(f"provider returned {r.status_code}: {r.text[:200]}")
+            try:
+                data = r.json()
+                content = data["choices"][0]["message"]["content"]
+            except ValueError:
+                raise LLMError(f"provider returned invalid JSON: {r.text[:200]}")
+            except (KeyError, IndexError, TypeError) as e:
+                raise LLMError(f"unexpected response shape: {e!r}")
+            if not isinstance(content, str):
+                raise LLMError("unexpected response shape: content is not text")
+            return data
+
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            data = await asyncio.wait_for(_call(), timeout=deadline)
+            outcome = "ok"
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise LLMError(f"deadline of {deadline}s exceeded")
+        except httpx.HTTPError as e:
+            raise LLMError(f"request failed: {e}")
+        finally:
+            LLM_REQUEST_SECONDS.labels(model, outcome).observe(time.perf_counter() - start)
+        usage = data.get("usage") or {}
+        for kind in ("prompt_tokens", "completion_tokens"):
+            if usage.get(kind):
+                LLM_TOKENS.labels(model, kind.split("_")[0]).inc(usage[kind])
+        return data
+
+    async def stream_chat(self, messages: list, model: str = DEFAULT_MODEL, temperature: float = 0.7,
+                          max_tokens: int = 500, timeout: float = None):
+        """
+        Stream a chat completion; yields content deltas as they arrive.
+        `timeout` bounds the wait for each chunk (including the first token).
+        """
+        http = self._ensure_http()
+        payload = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
+        }
+        chunk_timeout = timeout if timeout is not None else self.timeout
+        start = time.perf_counter()
+        outcome = "error"
+        try:
+            async with self._semaphore:
+                async with http.stream("POST", "/chat/completions", json=payload,
+                                       timeout=httpx.Timeout(chunk_timeout, connect=5.0)) as r:
+                    if r.status_code != 200:
+                        body = await r.aread()
+                        raise LLMError(f"provider returned {r.status_code}: {body[:200]!r}")
+                    async for line in r.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        try:
+                            delta = json.loads(data)["choices"][0].get("delta", {})
+                        except (ValueError, KeyError, IndexError):
+                            continue
+                        if delta.get("content"):
+                            yield delta["content"]
+            outcome = "ok"
+        except httpx.HTTPError as e:
+            raise LLMError(f"stream failed: {e}")
+        finally:
+            LLM_REQUEST_SECONDS.labels(model, "stream_" + outcome).observe(time.perf_counter() - start)
+
+    async def aclose(self):
+        if self._http is not None:
+            try:
+                await self._http.aclose()
+            except RuntimeError:
+                # the loop that owned the pool is already gone
+                pass
+        self._http = None
+        self._semaphore = None
+        self._loop = None
+
+
+_client = None
+
+
+def get_llm_client() -> LLMClient:
+    """Return the process-wide client, building it from the environment on first use."""
+    global _client
+    if _client is None:
+        _client = LLMClient(
+            base_url=os.getenv("GROQ_BASE_URL", GROQ_BASE_URL),
+            api_key=os.getenv("GROQ_API_KEY"),
+            max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+            timeout=float(os.getenv("LLM_TIMEOUT_SECONDS", "20")),
+        )
+    return _client
+
+
+def set_llm_client(client: LLMClient):
+    """Swap the shared client (used by tests to point at a local stub server)."""
+    global _client
+    _client = client
+
+
+async def generate_text(prompt: str, system: str, model: str = DEFAULT_MODEL,
+                        temperature: float = 0.7, max_tokens: int = 500,
+                        timeout: float = None) -> str:
+    """
+    Single-turn helper: returns the completion text, or None if no API key
+    is configured or the call failed.
+    """
+    client = get_llm_client()
+    if not client.api_key:
+        return None
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt},
+    ]
+    try:
+        data = await client.chat(messages, model=model, temperature=temperature,
+                                 max_tokens=max_tokens, timeout=timeout)
+        # Groq / OpenAI-like response shape:
+        return data["choices"][0]["message"]["content"]
+    except (LLMError, KeyError, IndexError, ValueError) as e:
+        print("LLM request failed:", e)
+        return None
+
+
+async def stream_text(prompt: str, system: str, model: str = DEFAULT_MODEL,
+                      temperature: float = 0.7, max_tokens: int = 500, timeout: float = None):
+    """
+    Streaming counterpart of generate_text. Yields text deltas; raises
+    LLMError if no key is configured or the provider fails.
+    """
+    client = get_llm_client()
+    if not client.api_key:
+        raise LLMError("GROQ_API_KEY is not configured")
+    messages = [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt},
+    ]
+    async for delta in client.stream_chat(messages, model=model, temperature=temperature,
+                                          max_tokens=max_tokens, timeout=timeout):
+        yield delta
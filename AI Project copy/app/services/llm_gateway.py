@@ -0,0 +1,289 @@
+# app/services/llm_gateway.py
+import os
+import json
+import time
+import asyncio
+import hashlib
+import threading
+from collections import deque
+from app.services.llm_client import DEFAULT_MODEL, LLMError, get_llm_client
+from app.services.metrics import LLM_CIRCUIT_STATE, LLM_GATEWAY_EVENTS
+
+# models tried, in order, after the requested one fails or its circuit is open
+FALLBACK_MODELS = [m.strip() for m in os.getenv("LLM_FALLBACK_MODELS", "").split(",") if m.strip()]
+# consecutive failures that open a model's circuit, and how long it stays open
+BREAKER_FAILURES = int(os.getenv("LLM_BREAKER_FAILURES", "5"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", "30"))
+# a second request is sent when the first is slower than the model's recent p95
+HEDGE_ENABLED = os.getenv("LLM_HEDGE", "true").lower() == "true"
+HEDGE_MIN_SECONDS = float(os.getenv("LLM_HEDGE_MIN_SECONDS", "0.5"))
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+_STATE_VALUES = {CLOSED: 0, OPEN: 1, HALF_OPEN: 2}
+
+
+class CircuitBreaker:
+    """
+    Per-model breaker: after `failures` consecutive errors the circuit opens
+    and calls are refused without touching the provider. After `cooldown`
+    seconds one trial call is let through (half-open); it closes the
+    circuit on success and re-opens it on failure.
+    """
+
+    def __init__(self, name: str, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN_SECONDS,
+                 clock=time.monotonic):
+        self.name = name
+        self.failures = failures
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+        LLM_CIRCUIT_STATE.labels(name).set(0)
+
+    def _set(self, state: str):
+        self.state = state
+        LLM_CIRCUIT_STATE.labels(self.name).set(_STATE_VALUES[state])
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == OPEN and self.clock() - self.opened_at >= self.cooldown:
+                self._set(HALF_OPEN)
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def release(self):
+        """The admitted call ended without a verdict (cancelled): let the next trial through."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self._trial_running = False
+            self._set(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            self._trial_running = False
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failures:
+                self.opened_at = self.clock()
+                self._set(OPEN)
+
+
+class LatencyTracker:
+    """Recent successful call durations; p95 once there are enough of them."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def p95(self):
+        if len(self.samples) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+
+class LLMGateway:
+    """
+    Front door for chat completions:
+    - single-flight: identical concurrent requests share one provider call
+    - hedging: a second request goes out when the first passes the
+      model's p95 latency; the first answer wins, the other is cancelled
+    - circuit breaker per model, failing over to FALLBACK_MODELS and then
+      to the caller's local fallback without waiting on a sick provider
+    All attempts for one request share its deadline.
+    """
+
+    def __init__(self, fallback_models=None, hedge: bool = HEDGE_ENABLED, client_factory=get_llm_client):
+        self.fallback_models = FALLBACK_MODELS if fallback_models is None else list(fallback_models)
+        self.hedge = hedge
+        self.client_factory = client_factory
+        self.breakers = {}
+        self.latencies = {}
+        self._inflight = {}
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        if model not in self.breakers:
+            self.breakers[model] = CircuitBreaker(model)
+        return self.breakers[model]
+
+    def latency(self, model: str) -> LatencyTracker:
+        if model not in self.latencies:
+            self.latencies[model] = LatencyTracker()
+        return self.latencies[model]
+
+    def models_for(self, model: str) -> list:
+        return [model] + [m for m in self.fallback_models if m != model]
+
+    async def complete(self, messages: list, model: str = DEFAULT_MODEL, temperature: float = 0.7,
+                       max_tokens: int = 500, timeout: float = None) -> str:
+        """Completion text; raises LLMError when every model failed or was short-circuited."""
+        key = hashlib.sha256(json.dumps(
+            [model, messages, temperature, max_tokens], sort_keys=True, ensure_ascii=False
+        ).encode("utf-8")).hexdigest()
+        # in-flight calls are tasks of one event loop
+        key = (asyncio.get_running_loop(), key)
+        task = self._inflight.get(key)
+        if task is not None:
+            LLM_GATEWAY_EVENTS.labels("coalesced", model).inc()
+        else:
+            task = asyncio.ensure_future(self._complete(messages, model, temperature, max_tokens, timeout))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(key, None))
+        # shield: one caller disconnecting mustn't cancel the call the others wait on
+        return await asyncio.shield(task)
+
+    async def _complete(self, messages, model, temperature, max_tokens, timeout):
+        client = self.client_factory()
+        deadline = time.monotonic() + (timeout if timeout is not None else client.timeout)
+        errors = []
+        for i, candidate in enumerate(self.models_for(model)):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                errors.append(f"{candidate}: no time left")
+                break
+            breaker = self.breaker(candidate)
+            if not breaker.allow():
+                LLM_GATEWAY_EVENTS.labels("short_circuited", candidate).inc()
+                errors.append(f"{candidate}: circuit open")
+                continue
+            if i:
+                LLM_GATEWAY_EVENTS.labels("failover", candidate).inc()
+            try:
+                text = await self._hedged(client, candidate, messages, temperature, max_tokens, remaining)
+            except LLMError as e:
+                breaker.record_failure()
+                errors.append(f"{candidate}: {e}")
+                continue
+            except BaseException:
+                breaker.release()
+                raise
+            breaker.record_success()
+            return text
+        raise LLMError("; ".join(errors) or "no model available")
+
+    async def _attempt(self, client, model, messages, temperature, max_tokens, timeout):
+        start = time.monotonic()
+        data = await client.chat(messages, model=model, temperature=temperature,
+                                 max_tokens=max_tokens, timeout=timeout)
+        try:
+            text = data["choices"][0]["message"]["content"]
+        except (KeyError, IndexError, TypeError) as e:
+            raise LLMError(f"unexpected response shape: {e}")
+        self.latency(model).record(time.monotonic() - start)
+        return text
+
+    async def _hedged(self, client, model, messages, temperature, max_tokens, timeout):
+        start = time.monotonic()
+        first = asyncio.ensure_future(self._attempt(client, model, messages, temperature, max_tokens, timeout))
+        p95 = self.latency(model).p95()
+        if not self.hedge or p95 is None:
+            return await first
+        delay = max(p95, HEDGE_MIN_SECONDS)
+        tasks = {first}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=min(delay, timeout))
+            if not done and timeout - (time.monotonic() - start) > 0:
+                LLM_GATEWAY_EVENTS.labels("hedged", model).inc()
+                second = asyncio.ensure_future(self._attempt(
+                    client, model, messages, temperature, max_tokens, timeout - (time.monotonic() - start)
+                ))
+                tasks.add(second)
+            error = None
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not first:
+                            LLM_GATEWAY_EVENTS.labels("hedge_won", model).inc()
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def stream(self, messages: list, model: str = DEFAULT_MODEL, temperature: float = 0.7,
+                     max_tokens: int = 500, timeout: float = None):
+        """
+        Stream deltas from the first model whose circuit admits the call.
+        Failover only happens before the first delta; streams are neither
+        hedged nor coalesced.
+        """
+        client = self.client_factory()
+        errors = []
+        for candidate in self.models_for(model):
+            breaker = self.breaker(candidate)
+            if not breaker.allow():
+                LLM_GATEWAY_EVENTS.labels("short_circuited", candidate).inc()
+                errors.append(f"{candidate}: circuit open")
+                continue
+            started = False
+            try:
+                async for delta in client.stream_chat(messages, model=candidate, temperature=temperature,
+                                                      max_tokens=max_tokens, timeout=timeout):
+                    started = True
+                    yield delta
+            except LLMError as e:
+                breaker.record_failure()
+                if started:
+                    raise
+                errors.append(f"{candidate}: {e}")
+                continue
+            except BaseException:
+                # the consumer went away (GeneratorExit / cancellation)
+                breaker.release()
+                raise
+            breaker.record_success()
+            return
+        raise LLMError("; ".join(errors) or "no model available")
+
+
+gateway = LLMGateway()
+
+
+def _messages(prompt: str, system: str) -> list:
+    return [
+        {"role": "system", "content": system},
+        {"role": "user", "content": prompt},
+    ]
+
+
+async def generate_text(prompt: str, system: str, model: str = DEFAULT_MODEL,
+                        temperature: float = 0.7, max_tokens: int = 500,
+                        timeout: float = None) -> str:
+    """
+    Single-turn completion through the gateway; None if no API key is
+    configured or every model failed (callers use their local fallback).
+    """
+    if not get_llm_client().api_key:
+        return None
+    try:
+        return await gateway.complete(_messages(prompt, system), model=model, temperature=temperature,
+                                      max_tokens=max_tokens, timeout=timeout)
+    except LLMError as e:
+        print("LLM request failed:", e)
+        return None
+
+
+async def stream_text(prompt: str, system: str, model: str = DEFAULT_MODEL,
+                      temperature: float = 0.7, max_tokens: int = 500, timeout: float = None):
+    """Streaming counterpart of generate_text; raises LLMError when no model is available."""
+    if not get_llm_client().api_key:
+        raise LLMError("GROQ_API_KEY is not configured")
+    async for delta in gateway.stream(_messages(prompt, system), model=model, temperature=temperature,
+                                      max_tokens=max_tokens, timeout=timeout):
+        yield delta
@@ -0,0 +1,143 @@
+# app/services/metrics.py
+import time
+from contextvars import ContextVar
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from sqlalchemy import event
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Match
+
+# route template of the request being served ("background" for scheduler/worker threads)
+current_route: ContextVar[str] = ContextVar("current_route", default="background")
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+DB_QUERIES = Counter(
+    "db_queries_total", "SQL statements executed, by route and statement type",
+    ["route", "operation"],
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "SQL statement latency, by route and statement type",
+    ["route", "operation"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5),
+)
+DB_LOCK_ERRORS = Counter("db_lock_errors_total", "'database is locked' errors (SQLite writer contention)", ["route"])
+LLM_REQUEST_SECONDS = Histogram(
+    "llm_request_duration_seconds", "Provider chat completion latency",
+    ["model", "outcome"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+LLM_GATEWAY_EVENTS = Counter(
+    "llm_gateway_events_total",
+    "Gateway decisions: coalesced, hedged, hedge_won, short_circuited (circuit open), failover",
+    ["event", "model"],
+)
+LLM_CIRCUIT_STATE = Gauge("llm_circuit_state", "Provider circuit per model: 0 closed, 1 open, 2 half-open", ["model"])
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens reported by the provider", ["model", "kind"])
+GENERATIONS = Counter(
+    "content_generations_total", "Generated posts by where the text came from (llm, cache, fallback)",
+    ["source"],
+)
+SCHEDULER_LAG_SECONDS = Histogram(
+    "scheduler_publish_lag_seconds", "Delay between a post's scheduled_time and its publication",
+    buckets=(0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 900, 3600),
+)
+PUBLISH_RESULTS = Counter("publish_results_total", "Finished publish jobs", ["publisher", "outcome"])
+PUBLISH_IN_FLIGHT = Gauge("publish_queue_in_flight", "Posts handed to the publish worker pool and not finished")
+PUBLISH_DUE = Gauge("publish_queue_due", "Scheduled posts that are due but not yet claimed")
+NEAR_DUPLICATES = Counter(
+    "near_duplicates_total", "Drafts matching an existing post above NEAR_DUPLICATE_THRESHOLD",
+    ["stage", "action"],
+)
+GENERATION_QUEUE_DEPTH = Gauge("generation_queue_depth", "Generation jobs queued and not yet claimed by a worker")
+GENERATION_JOB_WAIT_SECONDS = Histogram(
+    "generation_job_wait_seconds", "Time a generation job waited in the queue before a worker started it",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120, 300),
+)
+GENERATION_JOBS = Counter("generation_jobs_total", "Finished generation jobs", ["outcome"])
+LEADER = Gauge("leader", "1 while this process holds the named leader lease", ["name"])
+
+_OPERATIONS = {"select", "insert", "update", "delete"}
+
+
+def statement_operation(statement: str) -> str:
+    head = statement.lstrip()[:6].lower()
+    return head if head in _OPERATIONS else "other"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return  # listener attached mid-statement
+    elapsed = time.perf_counter() - starts.pop()
+    route, operation = current_route.get(), statement_operation(statement)
+    DB_QUERIES.labels(route, operation).inc()
+    DB_QUERY_SECONDS.labels(route, operation).observe(elapsed)
+
+
+def _handle_error(context):
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+    if "database is locked" in str(context.original_exception):
+        DB_LOCK_ERRORS.labels(current_route.get()).inc()
+
+
+def instrument_engine(sync_engine):
+    """Count and time every statement on `sync_engine`, labelled with the current route."""
+    if not event.contains(sync_engine, "after_cursor_execute", _after_cursor_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(sync_engine, "handle_error", _handle_error)
+    return sync_engine
+
+
+def route_template(scope) -> str:
+    """"/analytics/post/{post_id}" rather than the raw path, to keep label cardinality bounded."""
+    partial = None
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or "unmatched"
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware: times each request and exposes its route to the SQL hooks."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = route_template(scope)
+        token = current_route.set(route)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            HTTP_REQUEST_SECONDS.labels(scope["method"], route, str(status)).observe(time.perf_counter() - start)
+            current_route.reset(token)
+
+
+def metrics_endpoint(request: Request) -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
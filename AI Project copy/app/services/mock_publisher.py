@@ -1,85 +1,33 @@
 import random
-from datetime import datetime
-from app.database import SessionLocal
-from app.models.models import Post, Analytics
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import Analytics
+from app.services.publisher import Publisher, PublishResult
 
-def mock_publish_post(post_id: int):
+class MockPublisher(Publisher):
     """
     Mock publishing a post to LinkedIn.
-    In a real implementation, this would connect to LinkedIn API.
+    Returns a fake URN and realistic initial engagement numbers.
     """
-    db = SessionLocal()
-    try:
-        post = db.query(Post).filter(Post.id == post_id).first()
-        if not post:
-            print(f"Post {post_id} not found")
-            return False
-            
-        # Update post status to "posted"
-        post.status = "posted"
-        post.posted_at = datetime.utcnow()
-        
-        # Add a mock hashtag to indicate it was published
-        if post.hashtags:
-            post.hashtags += " #Published"
-        else:
-            post.hashtags = "#Published"
-            
-        db.add(post)
-        db.commit()
-        
-        # Create mock analytics
-        create_mock_analytics(post_id)
-        
-        print(f"Mock published post {post_id}")
-        return True
-    except Exception as e:
-        print(f"Error publishing post {post_id}: {e}")
-        db.rollback()
-        return False
-    finally:
-        db.close()
+    name = "mock"
+    rate_per_second = 50.0
+    burst = 10
 
-def create_mock_analytics(post_id: int):
-    """
-    Create mock analytics for a published post.
-    """
-    db = SessionLocal()
-    try:
+    def publish(self, post) -> PublishResult:
         # Generate realistic mock analytics
-        likes = random.randint(10, 500)
-        comments = random.randint(0, 50)
-        shares = random.randint(0, 30)
-        impressions = likes * random.randint(5, 20)
-        
-        analytics = Analytics(
-            post_id=post_id,
-            likes=likes,
-            comments=comments,
-            shares=shares,
-            impressions=impressions
-        )
-        
-        db.add(analytics)
-        db.commit()
-        print(f"Created mock analytics for post {post_id}")
-    except Exception as e:
-        print(f"Error creating analytics for post {post_id}: {e}")
-        db.rollback()
-    finally:
-        db.close()
+        likes = random.randint(20, 300)
+        metrics = {
+            "likes": likes,
+            "comments": random.randint(0, 50),
+            "shares": random.randint(0, 30),
+            "impressions": likes * random.randint(10, 30)
+        }
+        return PublishResult(urn=f"urn:li:share:mock-{post.id}", metrics=metrics)
 
-def get_mock_analytics(post_id: int = None):
+async def get_mock_analytics(db: AsyncSession, post_id: int = None):
     """
-    Get mock analytics for a post or all posts.
+    Get mock analytics for a post or all posts, using the caller's session.
     """
-    db = SessionLocal()
-    try:
-        if post_id:
-            analytics = db.query(Analytics).filter(Analytics.post_id == post_id).first()
-        else:
-            analytics = db.query(Analytics).all()
-            
-        return analytics
-    finally:
-        db.close()
\ No newline at end of file
+    if post_id:
+        return (await db.execute(select(Analytics).where(Analytics.post_id == post_id).limit(1))).scalar_one_or_none()
+    return (await db.scalars(select(Analytics))).all()
@@ -1,8 +1,18 @@
-from app.routes.content import publish_post_and_create_analytics
+# app/services/post_publisher.py
+from app.services.publisher import get_publish_pool
+
+
+def publish_post_and_create_analytics(post_id: int):
+    """
+    Publish a post right away (any unpublished status) on the calling
+    thread, through the shared publisher, rate limiter and retry policy.
+    """
+    return get_publish_pool().process(post_id, require_claim=False)
+
 
 def publish_post_by_id(post_id: int):
     """
-    Publish a post by its ID using the existing mock publishing function.
+    Publish a post the dispatcher has claimed ("publishing").
     This function is called by the scheduler.
     """
-    return publish_post_and_create_analytics(post_id)
\ No newline at end of file
+    return get_publish_pool().process(post_id, require_claim=True)
@@ -0,0 +1,303 @@
+# app/services/publisher.py
+import os
+import time
+import random
+import threading
+from abc import ABC, abstractmethod
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from app.database import SessionLocal
+from app.models.models import Post, Analytics
+from app.services.analytics_rollup import apply_analytics_delta
+from app.services.timeseries import append_point
+from app.services.dedup import find_near_duplicate, signature_for_post, record_near_duplicate, blocks
+from app.services.hashtags import add_marker
+from app.services.metrics import PUBLISH_IN_FLIGHT, PUBLISH_RESULTS, SCHEDULER_LAG_SECONDS
+
+
+class PublishError(Exception):
+    """A publish attempt failed. `retryable` marks transient failures (429/5xx/network)."""
+
+    def __init__(self, message: str, retryable: bool = True, retry_after: float = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class PublishResult:
+    def __init__(self, urn: str = None, metrics: dict = None):
+        self.urn = urn
+        self.metrics = metrics  # initial engagement, when the publisher knows it
+
+
+class Publisher(ABC):
+    """
+    Interface for anything that can put a post on LinkedIn (or pretend to).
+    `rate_per_second` / `burst` describe the quota the worker pool must respect.
+    """
+    name = "base"
+    rate_per_second = 1.0
+    burst = 1
+
+    @abstractmethod
+    def publish(self, post: Post) -> PublishResult:
+        """Publish `post`; raise PublishError on failure."""
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens per second, up to `capacity` banked."""
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = float(rate)
+        self.capacity = max(1, int(capacity))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> float:
+        """Take a token if available; otherwise return seconds until one is."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, stop_event: threading.Event = None) -> bool:
+        while True:
+            wait = self.try_acquire()
+            if wait == 0.0:
+                return True
+            if stop_event is not None:
+                if stop_event.wait(wait):
+                    return False
+            else:
+                time.sleep(wait)
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    # exponential backoff with full jitter
+    return random.uniform(0, min(cap, base * (2 ** (attempt - 1))))
+
+
+class PublishWorkerPool:
+    """
+    Publishes posts on a bounded thread pool. Every provider call goes
+    through one shared token bucket, failed attempts are retried with
+    exponential backoff, and each post is finalized in a single commit.
+    """
+
+    def __init__(self, publisher: Publisher, concurrency: int = 4, rate_per_second: float = None,
+                 burst: int = None, max_attempts: int = 5, backoff_base: float = 1.0,
+                 backoff_max: float = 30.0, session_factory=SessionLocal, on_done=None):
+        self.publisher = publisher
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.session_factory = session_factory
+        self.on_done = on_done
+        self.limiter = TokenBucket(
+            rate_per_second if rate_per_second is not None else publisher.rate_per_second,
+            burst if burst is not None else publisher.burst,
+        )
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="publish-worker")
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        with self._lock:
+            return self._in_flight
+
+    def capacity(self) -> int:
+        """How many more posts can be handed over without queueing behind busy workers."""
+        return max(0, self.concurrency - self.in_flight)
+
+    def submit(self, post_id: int, require_claim: bool = True):
+        with self._lock:
+            self._in_flight += 1
+        PUBLISH_IN_FLIGHT.inc()
+        future = self._executor.submit(self.process, post_id, require_claim)
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+        PUBLISH_IN_FLIGHT.dec()
+        if self.on_done is not None:
+            self.on_done()
+
+    @property
+    def closed(self) -> bool:
+        return self._stop.is_set()
+
+    def shutdown(self, wait: bool = False):
+        self._stop.set()
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+    def process(self, post_id: int, require_claim: bool = True) -> bool:
+        """
+        Publish one post. With require_claim the post must be in "publishing"
+        (claimed by the dispatcher); otherwise a draft/scheduled/failed post is
+        claimed here first. Every later write is guarded on the claim's
+        claimed_at, so a worker whose claim was requeued and taken by another
+        worker can't finalize (or count analytics for) the post a second time.
+        """
+        db = self.session_factory()
+        try:
+            post = db.get(Post, post_id)
+            if post is None:
+                print("publish_post: post not found", post_id)
+                return False
+            if require_claim:
+                if post.status != "publishing":
+                    print(f"publish_post: skipping post {post_id} in status {post.status}")
+                    return False
+                claimed_at = post.claimed_at
+            else:
+                # publish-now takes a claim like the dispatcher does
+                claimed_at = datetime.utcnow()
+                taken = db.query(Post).filter(
+                    Post.id == post_id, Post.status.notin_(("publishing", "posted"))
+                ).update({"status": "publishing", "claimed_at": claimed_at}, synchronize_session=False)
+                db.commit()
+                if taken != 1:
+                    print(f"publish_post: skipping post {post_id} in status {post.status}")
+                    return False
+            ours = (Post.id == post_id, Post.status == "publishing", Post.claimed_at == claimed_at)
+            # last gate against publishing (nearly) the same post twice
+            match = find_near_duplicate(
+                db, signature_for_post(db, post), statuses=("posted",), exclude_post_id=post_id
+            )
+            record_near_duplicate("publish", match, blocks(match))
+            if blocks(match):
+                db.query(Post).filter(*ours).update({
+                    "status": "failed",
+                    "last_publish_error": f"near-duplicate of post {match['post_id']} (similarity {match['similarity']})",
+                }, synchronize_session=False)
+                db.commit()
+                PUBLISH_RESULTS.labels(self.publisher.name, "duplicate").inc()
+                print(f"publish_post: post {post_id} blocked as near-duplicate of post {match['post_id']}")
+                return False
+            if match is not None:
+                print(f"publish_post: post {post_id} looks like post {match['post_id']} (similarity {match['similarity']})")
+            # detach and end the read transaction before the slow provider calls
+            db.expunge(post)
+            db.rollback()
+
+            attempts = 0
+            result, error = None, None
+            while attempts < self.max_attempts and not self._stop.is_set():
+                attempts += 1
+                if not self.limiter.acquire(self._stop):
+                    break
+                try:
+                    result = self.publisher.publish(post)
+                    error = None
+                    break
+                except PublishError as e:
+                    error = e
+                except Exception as e:
+                    error = PublishError(str(e), retryable=True)
+                if not error.retryable or attempts >= self.max_attempts:
+                    break
+                delay = error.retry_after if error.retry_after is not None else \
+                    backoff_delay(attempts, self.backoff_base, self.backoff_max)
+                print(f"publish_post: attempt {attempts} for post {post_id} failed ({error}); retrying in {delay:.1f}s")
+                if self._stop.wait(delay):
+                    break
+
+            if result is None and error is None:
+                # shutting down before any answer: keep the claim, it is requeued later
+                return False
+
+            attempts_total = (post.publish_attempts or 0) + attempts
+            # guarded on this worker's claim: the final write happens once per claim, and
+            # a claim that was requeued and re-taken meanwhile belongs to the new worker
+            still_ours = db.query(Post).filter(*ours)
+            if result is None:
+                still_ours.update({
+                    "status": "failed",
+                    "publish_attempts": attempts_total,
+                    "last_publish_error": str(error),
+                }, synchronize_session=False)
+                db.commit()
+                PUBLISH_RESULTS.labels(self.publisher.name, "failed").inc()
+                print(f"publish_post: giving up on post {post_id} after {attempts} attempts")
+                return False
+
+            # one transaction for the status change and the initial analytics
+            posted_at = datetime.utcnow()
+            updated = still_ours.update({
+                "status": "posted",
+                "posted_at": posted_at,
+                "published_urn": result.urn,
+                "publish_attempts": attempts_total,
+                "last_publish_error": None,
+                # tag as posted (once: a republish doesn't append it again)
+                "hashtags": add_marker(post.hashtags),
+            }, synchronize_session=False)
+            if updated != 1:
+                db.rollback()
+                print(f"publish_post: post {post_id} changed while publishing; not finalizing")
+                return False
+            if result.metrics:
+                metrics = {f: int(result.metrics.get(f, 0)) for f in ("likes", "comments", "shares", "impressions")}
+                db.add(Analytics(post_id=post_id, **metrics))
+                db.flush()
+                apply_analytics_delta(db, posts=1, **metrics)
+                append_point(db, post_id, metrics)
+            db.commit()
+            PUBLISH_RESULTS.labels(self.publisher.name, "posted").inc()
+            if post.scheduled_time is not None:
+                SCHEDULER_LAG_SECONDS.observe(max(0.0, (posted_at - post.scheduled_time).total_seconds()))
+            print(f"[AUTO-POST] Published post {post_id} via {self.publisher.name} after {attempts} attempt(s)")
+            return True
+        except Exception as e:
+            db.rollback()
+            print("publish_post error:", e)
+            return False
+        finally:
+            db.close()
+
+
+def get_publisher(name: str = None) -> Publisher:
+    """Build the publisher selected by PUBLISHER (mock | linkedin)."""
+    name = (name or os.getenv("PUBLISHER", "mock")).lower()
+    if name == "linkedin":
+        from app.services.linkedin_publisher import LinkedInPublisher
+        return LinkedInPublisher()
+    from app.services.mock_publisher import MockPublisher
+    return MockPublisher()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_publish_pool() -> PublishWorkerPool:
+    global _pool
+    with _pool_lock:
+        # rebuilt after a shutdown, e.g. when this process regains scheduler leadership
+        if _pool is None or _pool.closed:
+            publisher = get_publisher()
+            rate = os.getenv("PUBLISH_RATE_PER_SECOND")
+            burst = os.getenv("PUBLISH_BURST")
+            _pool = PublishWorkerPool(
+                publisher,
+                concurrency=int(os.getenv("PUBLISH_CONCURRENCY", "4")),
+                rate_per_second=float(rate) if rate else None,
+                burst=int(burst) if burst else None,
+                max_attempts=int(os.getenv("PUBLISH_MAX_ATTEMPTS", "5")),
+                backoff_base=float(os.getenv("PUBLISH_BACKOFF_BASE_SECONDS", "1")),
+                backoff_max=float(os.getenv("PUBLISH_BACKOFF_MAX_SECONDS", "30")),
+            )
+        return _pool
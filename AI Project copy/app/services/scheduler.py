@@ -1,34 +1,237 @@
 # app/services/scheduler.py
+import os
+import time
+import threading
+from datetime import datetime, timedelta
 from apscheduler.schedulers.background import BackgroundScheduler
-from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from sqlalchemy import func, select, update
 from app.database import SessionLocal
-import atexit
-from datetime import datetime
-from app.services.post_publisher import publish_post_by_id
+from app.models.models import Post
+from app.services.publisher import get_publish_pool
+from app.services.metrics import PUBLISH_DUE
 
-scheduler = BackgroundScheduler()
-# optional: persist jobs to DB via SQLAlchemyJobStore (requires DB URL)
-jobstore = {"default": SQLAlchemyJobStore(url="sqlite:///./jobs.sqlite")}
-# If you prefer Postgres, set `url` to your DATABASE_URL.
-scheduler.configure(jobstores=jobstore)
-scheduler.start()
+CLAIM_BATCH_SIZE = int(os.getenv("SCHEDULER_CLAIM_BATCH_SIZE", "50"))
+# upper bound on a sleep, so rows scheduled by other processes are still picked up
+MAX_IDLE_SECONDS = float(os.getenv("SCHEDULER_MAX_IDLE_SECONDS", "30"))
+# while sleeping, the dispatcher checks this often for posts made due by other
+# processes (web replicas, standby candidates) whose notify() can't reach it
+CROSS_PROCESS_POLL_SECONDS = float(os.getenv("SCHEDULER_POLL_SECONDS", "1"))
+# a "publishing" claim older than this is assumed to belong to a crashed process
+STALE_CLAIM_SECONDS = int(os.getenv("SCHEDULER_STALE_CLAIM_SECONDS", "600"))
+# posts that may be (re)scheduled; "publishing" belongs to a worker and "posted" is done
+SCHEDULABLE_STATUSES = ("draft", "scheduled", "failed")
+
+
+class SchedulerService:
+    """
+    The one scheduler for the app.
+
+    Scheduled posts live only in the posts table (status="scheduled").
+    A dispatcher thread claims due rows with a conditional UPDATE
+    (scheduled -> publishing), so each post is published once even with
+    several dispatchers, and hands them to the publish worker pool. It
+    only claims as many posts as the pool has free workers, then sleeps
+    until the next scheduled_time or until a worker finishes, instead of
+    polling. notify() wakes it early when something is (re)scheduled in
+    this process; posts scheduled by other processes are noticed by a
+    read-only next-due check every CROSS_PROCESS_POLL_SECONDS.
+    Periodic maintenance jobs run on an in-memory APScheduler.
+    """
+
+    def __init__(self, session_factory=SessionLocal, pool=None):
+        self.session_factory = session_factory
+        self._pool = pool
+        self._owns_pool = pool is None
+        self.periodic = BackgroundScheduler()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def pool(self):
+        if self._pool is None:
+            self._pool = get_publish_pool()
+        return self._pool
+
+    # ---------------------------
+    # lifecycle
+    # ---------------------------
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        # a finished publish frees a worker: re-check for due posts
+        self.pool.on_done = self.notify
+        self.requeue_stale_claims()
+        self._thread = threading.Thread(target=self._run, name="due-post-dispatcher", daemon=True)
+        self._thread.start()
+        if not self.periodic.running:
+            self.periodic.start()
+
+    def stop(self):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            if self._owns_pool:
+                self._pool = None  # start() again picks up a fresh shared pool
+        if self.periodic.running:
+            self.periodic.shutdown(wait=False)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def notify(self):
+        self._wake.set()
+
+    def add_periodic_job(self, func, job_id: str, **interval):
+        """Register an interval job, e.g. add_periodic_job(fn, "compact", hours=1)."""
+        self.periodic.add_job(func, "interval", id=job_id, replace_existing=True, **interval)
+
+    # ---------------------------
+    # claims
+    # ---------------------------
+    def claim_due_posts(self, now: datetime = None, limit: int = CLAIM_BATCH_SIZE) -> list:
+        """Atomically move due posts from scheduled -> publishing; returns the claimed ids."""
+        now = now or datetime.utcnow()
+        db = self.session_factory()
+        try:
+            due_ids = select(Post.id).where(
+                Post.status == "scheduled",
+                Post.scheduled_time <= now
+            ).order_by(Post.scheduled_time).limit(limit).scalar_subquery()
+            claimed = db.execute(
+                update(Post)
+                .where(Post.id.in_(due_ids), Post.status == "scheduled")
+                .values(status="publishing", claimed_at=now)
+                .returning(Post.id)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+            db.commit()
+            return claimed
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def next_due_time(self):
+        db = self.session_factory()
+        try:
+            return db.query(func.min(Post.scheduled_time)).filter(Post.status == "scheduled").scalar()
+        finally:
+            db.close()
+
+    def due_backlog(self) -> int:
+        """Scheduled posts already due but not claimed yet (work queued behind busy workers)."""
+        db = self.session_factory()
+        try:
+            return db.query(func.count(Post.id)).filter(
+                Post.status == "scheduled",
+                Post.scheduled_time <= datetime.utcnow()
+            ).scalar()
+        finally:
+            db.close()
+
+    def requeue_stale_claims(self):
+        """Return posts stuck in "publishing" (process died mid-publish) to the queue."""
+        cutoff = datetime.utcnow() - timedelta(seconds=STALE_CLAIM_SECONDS)
+        db = self.session_factory()
+        try:
+            count = db.query(Post).filter(
+                Post.status == "publishing",
+                Post.claimed_at < cutoff
+            ).update({"status": "scheduled", "claimed_at": None}, synchronize_session=False)
+            db.commit()
+            if count:
+                print(f"[SCHEDULER] requeued {count} stale publishing claims")
+        finally:
+            db.close()
+
+    # ---------------------------
+    # dispatcher loop
+    # ---------------------------
+    def run_once(self) -> int:
+        """Claim due posts for every free publish worker. Returns posts handed over."""
+        handled = 0
+        while not self._stop.is_set():
+            capacity = self.pool.capacity()
+            if capacity <= 0:
+                break
+            claimed = self.claim_due_posts(limit=min(capacity, CLAIM_BATCH_SIZE))
+            if not claimed:
+                break
+            for post_id in claimed:
+                self.pool.submit(post_id)
+            handled += len(claimed)
+        return handled
+
+    def seconds_until_next_due(self) -> float:
+        next_due = self.next_due_time()
+        if next_due is None:
+            return MAX_IDLE_SECONDS
+        return min(MAX_IDLE_SECONDS, max(0.0, (next_due - datetime.utcnow()).total_seconds()))
+
+    def _run(self):
+        while not self._stop.is_set():
+            # clear before working so a notify() that lands mid-pass isn't lost
+            self._wake.clear()
+            try:
+                self.run_once()
+                if self.pool.capacity() <= 0:
+                    timeout = MAX_IDLE_SECONDS  # a finishing worker will notify()
+                else:
+                    timeout = self.seconds_until_next_due()
+            except Exception as e:
+                print("[SCHEDULER] dispatcher error:", e)
+                timeout = 1.0
+            self._sleep(timeout)
+
+    def _sleep(self, timeout: float):
+        """Wait for `timeout`, a notify(), or a post that another process made due."""
+        deadline = time.monotonic() + timeout
+        while not self._stop.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._wake.wait(min(remaining, CROSS_PROCESS_POLL_SECONDS)):
+                return
+            if self.pool.capacity() <= 0:
+                continue  # nothing to hand out; a finishing worker will notify()
+            try:
+                next_due = self.next_due_time()
+            except Exception as e:
+                print("[SCHEDULER] next-due check failed:", e)
+                continue
+            if next_due is not None and next_due <= datetime.utcnow():
+                return
+
+
+scheduler_service = SchedulerService()
+
+# evaluated at scrape time, so it costs one indexed COUNT per scrape
+PUBLISH_DUE.set_function(lambda: scheduler_service.due_backlog())
 
-# ensure scheduler shuts down cleanly
-atexit.register(lambda: scheduler.shutdown(wait=False))
 
 def schedule_post(post_id: int, run_at: datetime):
     """
-    schedule a job to publish the post at run_at
+    schedule the post to be published at run_at. Returns False if the post
+    doesn't exist or is being published / already posted.
     """
-    job_id = f"publish_post_{post_id}"
-    # remove existing job if present
+    db = SessionLocal()
     try:
-        scheduler.remove_job(job_id)
-    except Exception:
-        pass
-    scheduler.add_job(lambda: publish_post_by_id(post_id), 'date', run_date=run_at, id=job_id)
-    return job_id
+        updated = db.query(Post).filter(Post.id == post_id, Post.status.in_(SCHEDULABLE_STATUSES)).update(
+            {"status": "scheduled", "scheduled_time": run_at, "claimed_at": None}, synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+    scheduler_service.notify()
+    return updated == 1
+
 
 def run_post_now(post_id: int):
-    # run immediately in background
-    scheduler.add_job(lambda: publish_post_by_id(post_id))
+    # due immediately; the dispatcher picks it up on wake
+    return schedule_post(post_id, datetime.utcnow())
@@ -0,0 +1,130 @@
+# app/services/search.py
+import os
+import re
+from datetime import datetime
+from sqlalchemy import column, func, literal_column, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.models import Post
+
+SNIPPET_TOKENS = 24
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_END = "</mark>"
+# bm25 column weights: prompt, content, hashtags (a hashtag hit counts double)
+BM25_WEIGHTS = (1.0, 1.0, 2.0)
+# bm25 is computed for every matching row, so a term found in most posts of a
+# large archive would be ranked in full. Cap ranking at the newest N matches.
+RANK_CANDIDATES = int(os.getenv("SEARCH_RANK_CANDIDATES", "10000"))
+
+# external-content FTS5 table from migration 0004; rowid = posts.id
+posts_fts = table("posts_fts", column("rowid"))
+
+_PHRASE_OR_TERM = re.compile(r'"([^"]*)"|(\S+)')
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+def fts5_query(q: str) -> str:
+    """
+    Turn user input into a safe FTS5 query: every word or "quoted phrase"
+    must match (AND); a trailing * on a word makes it a prefix search.
+    FTS5 operators and punctuation in the input are treated as text.
+    """
+    parts = []
+    for phrase, term in _PHRASE_OR_TERM.findall(q or ""):
+        words = _WORD.findall(phrase or term)
+        if not words:
+            continue
+        if phrase:
+            parts.append('"' + " ".join(words) + '"')
+        else:
+            parts.extend(f'"{word}"' for word in words)
+            if term.endswith("*"):
+                parts[-1] += "*"
+    return " ".join(parts)
+
+
+def postgres_document():
+    # must match the expression indexed by ix_posts_search (migration 0004)
+    return func.to_tsvector(
+        "english",
+        func.coalesce(Post.prompt, "") + " " + Post.content + " " + func.coalesce(Post.hashtags, ""),
+    )
+
+
+async def search_posts(db: AsyncSession, q: str, status: str = None, created_after: datetime = None,
+                       created_before: datetime = None, limit: int = 20, offset: int = 0) -> list:
+    """
+    Rank posts matching `q` (best first) with a highlighted snippet.
+    SQLite: FTS5 + bm25(); PostgreSQL: tsvector + ts_rank_cd().
+    """
+    dialect = db.get_bind().dialect.name
+    columns = (Post.id, Post.prompt, Post.hashtags, Post.status, Post.scheduled_time, Post.posted_at, Post.created_at)
+    filters = []
+    if status:
+        filters.append(Post.status == status)
+    if created_after:
+        filters.append(Post.created_at >= created_after)
+    if created_before:
+        filters.append(Post.created_at < created_before)
+
+    if dialect == "sqlite":
+        match = fts5_query(q)
+        if not match:
+            return []
+        fts = literal_column("posts_fts")
+        matches = fts.op("MATCH")(match)
+        rank = func.bm25(fts, *BM25_WEIGHTS)  # lower is better
+        # FTS5 walks its doclist in rowid order, so the Nth newest match is cheap to find.
+        # Counted after the filters, or a narrow filter could fall outside the newest N raw matches.
+        newest = select(posts_fts.c.rowid).where(matches)
+        if filters:
+            newest = newest.join(Post, Post.id == posts_fts.c.rowid).where(*filters)
+        oldest_candidate = (await db.execute(
+            newest.order_by(posts_fts.c.rowid.desc()).limit(1).offset(RANK_CANDIDATES - 1)
+        )).scalar()
+        query = (
+            select(
+                *columns,
+                rank.label("rank"),
+                func.snippet(fts, -1, HIGHLIGHT_START, HIGHLIGHT_END, "…", SNIPPET_TOKENS).label("snippet"),
+            )
+            .select_from(posts_fts)
+            .join(Post, Post.id == posts_fts.c.rowid)
+            .where(matches)
+            .order_by(rank)
+        )
+        if oldest_candidate is not None:
+            query = query.where(posts_fts.c.rowid >= oldest_candidate)
+        score = lambda row: round(-row.rank, 4)
+    else:
+        ts_query = func.websearch_to_tsquery("english", q)
+        rank = func.ts_rank_cd(postgres_document(), ts_query)
+        headline_options = f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, MaxWords={SNIPPET_TOKENS}, MinWords=8"
+        query = (
+            select(
+                *columns,
+                rank.label("rank"),
+                func.ts_headline("english", Post.content, ts_query, headline_options).label("snippet"),
+            )
+            .where(postgres_document().op("@@")(ts_query))
+            .order_by(rank.desc())
+        )
+        score = lambda row: round(row.rank, 4)
+
+    if filters:
+        query = query.where(*filters)
+
+    rows = (await db.execute(query.limit(limit).offset(offset))).all()
+    return [
+        {
+            "id": row.id,
+            "prompt": row.prompt,
+            "snippet": row.snippet,
+            "hashtags": row.hashtags,
+            "status": row.status,
+            "scheduled_time": row.scheduled_time,
+            "posted_at": row.posted_at,
+            "created_at": row.created_at,
+            "score": score(row),
+        }
+        for row in rows
+    ]
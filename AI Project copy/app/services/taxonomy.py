@@ -0,0 +1,167 @@
+# app/services/taxonomy.py
+import os
+import re
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+TAXONOMY_PATH = os.getenv(
+    "TAXONOMY_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "taxonomy.json"),
+)
+TAXONOMY_CACHE_SIZE = int(os.getenv("TAXONOMY_CACHE_SIZE", "4096"))
+
+# hyphens, slashes and underscores separate words like spaces do ("machine-learning")
+_SEPARATORS = re.compile(r"[\s\-_/]+")
+
+
+def normalize(text: str) -> str:
+    return _SEPARATORS.sub(" ", (text or "").lower()).strip()
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch in "+#"
+
+
+class AhoCorasick:
+    """
+    Multi-pattern matcher: every pattern is found in one pass over the
+    text, so matching costs O(len(text) + matches) however many patterns
+    were compiled. Matches must sit on word boundaries ("ai" doesn't
+    match inside "maintain").
+    """
+
+    def __init__(self, patterns):
+        self.patterns = []
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pattern in patterns:
+            self._add(pattern)
+        self._build()
+
+    def _add(self, pattern: str):
+        node = 0
+        for ch in pattern:
+            nxt = self._goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[node][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+            node = nxt
+        self._out[node].append(len(self.patterns))
+        self.patterns.append(pattern)
+
+    def _build(self):
+        # breadth-first, so a node's fail target is always finished first
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for ch, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[child] = target if target != child else 0
+                self._out[child] = self._out[child] + self._out[self._fail[child]]
+                queue.append(child)
+
+    def iter_matches(self, text: str):
+        """Yield (start, end, pattern_index) for every whole-word match."""
+        goto, fail, out, patterns = self._goto, self._fail, self._out, self.patterns
+        node = 0
+        length = len(text)
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if not out[node]:
+                continue
+            end = i + 1
+            if end < length and _is_word_char(text[end]):
+                continue
+            for index in out[node]:
+                start = end - len(patterns[index])
+                if start == 0 or not _is_word_char(text[start - 1]):
+                    yield start, end, index
+
+    def find(self, text: str) -> list:
+        """Leftmost-longest, non-overlapping matches ("machine learning" wins over "learning")."""
+        matches = sorted(self.iter_matches(text), key=lambda m: (m[0], m[0] - m[1]))
+        chosen = []
+        last_end = 0
+        for start, end, index in matches:
+            if start >= last_end:
+                chosen.append((start, end, index))
+                last_end = end
+        return chosen
+
+
+class Taxonomy:
+    """
+    Skills / interests taxonomy compiled into one matcher.
+
+    The JSON file maps each category to canonical terms and their
+    synonyms, e.g. {"skills": {"Machine Learning": ["ml", "deep learning"]}}.
+    extract() returns the canonical terms found per category, in order of
+    first mention, and caches the result by a hash of the text.
+    """
+
+    def __init__(self, categories: dict, cache_size: int = TAXONOMY_CACHE_SIZE):
+        self.categories = list(categories)
+        labels = {}  # pattern -> [(category, canonical term)], in taxonomy order
+        for category, terms in categories.items():
+            for canonical, synonyms in terms.items():
+                for variant in [canonical, *synonyms]:
+                    pattern = normalize(variant)
+                    if pattern and (category, canonical) not in labels.setdefault(pattern, []):
+                        labels[pattern].append((category, canonical))
+        patterns = list(labels)
+        self._labels = [labels[pattern] for pattern in patterns]  # pattern index -> labels
+        self.matcher = AhoCorasick(patterns)
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_file(cls, path: str = TAXONOMY_PATH, **kwargs):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), **kwargs)
+
+    def __len__(self):
+        return len(self.matcher.patterns)
+
+    def extract(self, text: str) -> dict:
+        key = hashlib.sha256((text or "").encode("utf-8")).hexdigest()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        found = {category: [] for category in self.categories}
+        for _start, _end, index in self.matcher.find(normalize(text)):
+            for category, canonical in self._labels[index]:
+                if canonical not in found[category]:
+                    found[category].append(canonical)
+
+        with self._lock:
+            self._cache[key] = found
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return found
+
+
+_taxonomy = None
+_taxonomy_lock = threading.Lock()
+
+
+def get_taxonomy() -> Taxonomy:
+    """The configured taxonomy, compiled on first use."""
+    global _taxonomy
+    with _taxonomy_lock:
+        if _taxonomy is None:
+            _taxonomy = Taxonomy.from_file()
+        return _taxonomy
@@ -0,0 +1,162 @@
+# app/services/timeseries.py
+import os
+import calendar
+from datetime import datetime
+from sqlalchemy import func, case
+from sqlalchemy.orm import Session
+from app.database import SessionLocal, dialect_insert
+from app.models.models import Analytics, MetricPoint, MetricBucket
+from app.services.analytics_rollup import apply_analytics_delta
+from app.services.engagement import engagement_score
+
+HOUR = 3600
+DAY = 86400
+METRIC_FIELDS = ("likes", "comments", "shares", "impressions")
+
+RAW_RETENTION_DAYS = int(os.getenv("METRICS_RAW_RETENTION_DAYS", "7"))
+HOURLY_RETENTION_DAYS = int(os.getenv("METRICS_HOURLY_RETENTION_DAYS", "90"))
+
+
+def to_epoch(value: datetime) -> int:
+    if value.tzinfo is not None:
+        return calendar.timegm(value.utctimetuple())
+    return calendar.timegm(value.timetuple())
+
+
+def from_epoch(ts: int) -> datetime:
+    return datetime.utcfromtimestamp(ts)
+
+
+def append_point(db: Session, post_id: int, values: dict, ts: int = None) -> int:
+    """
+    Append one raw point and fold it into the hourly and daily buckets.
+    A bucket keeps the latest value seen (metrics are cumulative counters),
+    so out-of-order points never overwrite newer ones.
+    """
+    ts = ts if ts is not None else to_epoch(datetime.utcnow())
+    row = {field: int(values.get(field) or 0) for field in METRIC_FIELDS}
+
+    stmt = dialect_insert(db, MetricPoint).values(post_id=post_id, ts=ts, **row)
+    db.execute(stmt.on_conflict_do_update(index_elements=["post_id", "ts"], set_=row))
+
+    for resolution in (HOUR, DAY):
+        stmt = dialect_insert(db, MetricBucket).values(
+            post_id=post_id, resolution=resolution, bucket_start=ts - ts % resolution,
+            last_ts=ts, samples=1, **row
+        )
+        newer = stmt.excluded.last_ts >= MetricBucket.last_ts
+        columns = MetricBucket.__table__.c
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=["post_id", "resolution", "bucket_start"],
+            set_={
+                "samples": columns.samples + 1,
+                **{
+                    field: case((newer, stmt.excluded[field]), else_=columns[field])
+                    for field in ("last_ts",) + METRIC_FIELDS
+                },
+            },
+        ))
+    return ts
+
+
+def latest_ts(db: Session, post_id: int):
+    return db.query(func.max(MetricBucket.last_ts)).filter(
+        MetricBucket.post_id == post_id, MetricBucket.resolution == DAY
+    ).scalar()
+
+
+def record_metrics(db: Session, post_id: int, values: dict, ts: int = None) -> dict:
+    """
+    Ingest a metrics observation: store it in the series and, if it is the
+    newest one, move the post's Analytics snapshot and the global rollup.
+    The snapshot's created_at follows the newest observation, so `days`
+    windows on analytics select recently measured posts. Commits the
+    transaction.
+    """
+    previous_latest = latest_ts(db, post_id)
+    ts = append_point(db, post_id, values, ts)
+
+    snapshot_updated = previous_latest is None or ts >= previous_latest
+    if snapshot_updated:
+        snapshot = db.query(Analytics).filter(Analytics.post_id == post_id).first()
+        new = {field: int(values.get(field) or 0) for field in METRIC_FIELDS}
+        observed_at = from_epoch(ts)
+        if snapshot is None:
+            snapshot = Analytics(post_id=post_id, created_at=observed_at, **new)
+            db.add(snapshot)
+            db.flush()
+            apply_analytics_delta(db, posts=1, **new)
+        else:
+            delta = {field: new[field] - (getattr(snapshot, field) or 0) for field in METRIC_FIELDS}
+            for field in METRIC_FIELDS:
+                setattr(snapshot, field, new[field])
+            snapshot.engagement_score = engagement_score(new["likes"], new["comments"], new["shares"])
+            snapshot.created_at = observed_at
+            db.flush()
+            apply_analytics_delta(db, **delta)
+    db.commit()
+    return {"post_id": post_id, "ts": from_epoch(ts), "snapshot_updated": snapshot_updated}
+
+
+def pick_resolution(start: int, end: int, now: int = None) -> str:
+    """Coarsest data still detailed enough for the span, and not yet compacted away."""
+    now = now if now is not None else to_epoch(datetime.utcnow())
+    span = end - start
+    if span <= 2 * DAY and start >= now - RAW_RETENTION_DAYS * DAY:
+        return "raw"
+    if span <= 60 * DAY and start >= now - HOURLY_RETENTION_DAYS * DAY:
+        return "hour"
+    return "day"
+
+
+def query_series(db: Session, post_id: int, start: int, end: int, resolution: str = "auto") -> dict:
+    if resolution == "auto":
+        resolution = pick_resolution(start, end)
+
+    if resolution == "raw":
+        rows = db.query(MetricPoint).filter(
+            MetricPoint.post_id == post_id, MetricPoint.ts >= start, MetricPoint.ts <= end
+        ).order_by(MetricPoint.ts).all()
+        points = [{"ts": from_epoch(r.ts), **{f: getattr(r, f) for f in METRIC_FIELDS}} for r in rows]
+    else:
+        width = HOUR if resolution == "hour" else DAY
+        rows = db.query(MetricBucket).filter(
+            MetricBucket.post_id == post_id,
+            MetricBucket.resolution == width,
+            MetricBucket.bucket_start >= start - start % width,
+            MetricBucket.bucket_start <= end
+        ).order_by(MetricBucket.bucket_start).all()
+        points = [
+            {"ts": from_epoch(r.bucket_start), "samples": r.samples, **{f: getattr(r, f) for f in METRIC_FIELDS}}
+            for r in rows
+        ]
+    return {"post_id": post_id, "resolution": resolution, "points": points}
+
+
+def compact_metrics(db: Session, now: datetime = None) -> dict:
+    """
+    Retention: drop raw points past METRICS_RAW_RETENTION_DAYS and hourly
+    buckets past METRICS_HOURLY_RETENTION_DAYS. Both are already folded
+    into coarser buckets at write time; daily buckets are kept.
+    """
+    now_ts = to_epoch(now or datetime.utcnow())
+    raw_deleted = db.query(MetricPoint).filter(
+        MetricPoint.ts < now_ts - RAW_RETENTION_DAYS * DAY
+    ).delete(synchronize_session=False)
+    hourly_deleted = db.query(MetricBucket).filter(
+        MetricBucket.resolution == HOUR,
+        MetricBucket.bucket_start < now_ts - HOURLY_RETENTION_DAYS * DAY
+    ).delete(synchronize_session=False)
+    db.commit()
+    return {"raw_deleted": raw_deleted, "hourly_deleted": hourly_deleted}
+
+
+def compact_metrics_job():
+    db = SessionLocal()
+    try:
+        print("metrics retention:", compact_metrics(db))
+    except Exception as e:
+        db.rollback()
+        print("compact_metrics_job error:", e)
+    finally:
+        db.close()
@@ -0,0 +1,457 @@
+# app/services/trends.py
+import os
+import re
+import glob
+import json
+import math
+import html
+import time
+import heapq
+import hashlib
+import threading
+import xml.etree.ElementTree as ET
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+import httpx
+from sqlalchemy import select
+from app.database import SessionLocal, dialect_insert
+from app.models.models import TrendItem, TrendFeed
+
+FEEDS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "feeds")
+
+# comma-separated feed files, globs or http(s) URLs (RSS 2.0, Atom or JSON Feed)
+TREND_FEEDS = os.getenv("TREND_FEEDS", os.path.join(FEEDS_DIR, "*"))
+TREND_INGEST_MINUTES = int(os.getenv("TREND_INGEST_MINUTES", "30"))
+TREND_CACHE_TTL_SECONDS = float(os.getenv("TREND_CACHE_TTL_SECONDS", "300"))
+TREND_HALF_LIFE_HOURS = float(os.getenv("TREND_HALF_LIFE_HOURS", "48"))
+TREND_INDEX_MAX_ITEMS = int(os.getenv("TREND_INDEX_MAX_ITEMS", "50000"))
+TREND_FEED_MAX_BYTES = int(os.getenv("TREND_FEED_MAX_BYTES", str(10 * 1024 * 1024)))
+KEYWORDS_PER_ITEM = 8
+INSERT_CHUNK_SIZE = 500
+
+STOPWORDS = set("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers him his how i if in into is it its itself just let me more most my new no nor
+not now of off on once only or other our ours out over own same she should so some such than that the
+their theirs them then there these they this those through to too under until up very via was we were
+what when where which while who whom why will with would you your yours says said year years week
+today get gets make makes one two three first last latest next way ways use using used like
+""".split())
+
+_TOKEN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+_TAGS = re.compile(r"<[^>]+>")
+
+
+# ---------------------------
+# text helpers
+# ---------------------------
+def normalize_text(text: str) -> str:
+    text = html.unescape(_TAGS.sub(" ", text or ""))
+    return " ".join(text.split())
+
+
+def normalize_term(token: str) -> str:
+    # light plural folding so "startups" matches "startup"
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith("s") and not token.endswith(("ss", "us", "is")):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: str) -> list:
+    terms = []
+    for token in _TOKEN.findall((text or "").lower()):
+        if token in STOPWORDS or token.isdigit() or len(token) < 2:
+            continue
+        terms.append(normalize_term(token))
+    return terms
+
+
+def extract_keywords(title: str, summary: str = "", limit: int = KEYWORDS_PER_ITEM) -> list:
+    """Most frequent meaningful terms; title words count double."""
+    counts = Counter()
+    for term in tokenize(title):
+        counts[term] += 2
+    for term in tokenize(summary):
+        counts[term] += 1
+    return [term for term, _ in counts.most_common(limit)]
+
+
+def content_hash(title: str, summary: str) -> str:
+    # the same story syndicated under different links hashes the same
+    raw = f"{normalize_text(title).lower()}\n{normalize_text(summary).lower()}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _parse_date(value: str):
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = parsedate_to_datetime(value)  # RSS (RFC 822)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))  # Atom / JSON Feed
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+# ---------------------------
+# feed parsing (streamed)
+# ---------------------------
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _xml_item(elem) -> dict:
+    fields = {}
+    for child in elem:
+        name = _local(child.tag)
+        if name == "link":
+            # Atom: <link rel="alternate" href="..."/>; RSS: <link>...</link>
+            href = child.get("href")
+            if href and child.get("rel", "alternate") == "alternate":
+                fields.setdefault("url", href)
+            elif child.text:
+                fields.setdefault("url", child.text.strip())
+        elif name == "title":
+            fields["title"] = child.text or ""
+        elif name in ("description", "summary", "content", "encoded"):
+            fields.setdefault("summary", "".join(child.itertext()))
+        elif name in ("pubDate", "published", "updated", "date"):
+            fields.setdefault("published", child.text)
+    return fields
+
+
+def _json_items(data) -> list:
+    items = data.get("items", []) if isinstance(data, dict) else data
+    return [
+        {
+            "title": item.get("title") or "",
+            "url": item.get("url") or item.get("external_url") or item.get("link"),
+            "summary": item.get("summary") or item.get("content_text") or item.get("content_html") or "",
+            "published": item.get("date_published") or item.get("date_modified") or item.get("published"),
+        }
+        for item in items if isinstance(item, dict)
+    ]
+
+
+def parse_feed(chunks):
+    """
+    Yield raw items from a feed given as an iterable of byte chunks.
+    XML (RSS / Atom) goes through a pull parser, so each <item>/<entry> is
+    yielded and freed as soon as it closes instead of building the whole
+    tree. JSON Feed documents are small enough to load at once.
+    """
+    parser = None
+    json_buffer = None
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        if size > TREND_FEED_MAX_BYTES:
+            raise ValueError(f"feed larger than {TREND_FEED_MAX_BYTES} bytes")
+        if parser is None and json_buffer is None:
+            head = chunk.lstrip()
+            if not head:
+                continue
+            if head[:1] in (b"{", b"["):
+                json_buffer = bytearray()
+            else:
+                parser = ET.XMLPullParser(events=("end",))
+        if json_buffer is not None:
+            json_buffer.extend(chunk)
+            continue
+        parser.feed(chunk)
+        for _event, elem in parser.read_events():
+            if _local(elem.tag) in ("item", "entry"):
+                yield _xml_item(elem)
+                elem.clear()
+    if json_buffer is not None:
+        yield from _json_items(json.loads(bytes(json_buffer)))
+    elif parser is not None:
+        parser.close()
+
+
+def _file_chunks(path: str, size: int = 64 * 1024):
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def resolve_feeds(spec: str = None) -> list:
+    """Expand the TREND_FEEDS setting into feed URLs and file paths."""
+    feeds = []
+    for entry in (spec if spec is not None else TREND_FEEDS).split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        if entry.startswith(("http://", "https://")):
+            feeds.append(entry)
+        else:
+            feeds.extend(sorted(p for p in glob.glob(entry) if os.path.isfile(p)))
+    return feeds
+
+
+# ---------------------------
+# ingestion
+# ---------------------------
+def _store_items(db, source: str, items, now: datetime) -> tuple:
+    """Insert unseen items in chunks; returns (seen, added)."""
+    seen = added = 0
+    batch = {}
+
+    def flush():
+        nonlocal added
+        if not batch:
+            return
+        existing = set(db.execute(
+            select(TrendItem.content_hash).where(TrendItem.content_hash.in_(list(batch)))
+        ).scalars())
+        rows = [row for key, row in batch.items() if key not in existing]
+        if rows:
+            # DO NOTHING covers another ingester inserting the same item meanwhile
+            db.execute(dialect_insert(db, TrendItem).on_conflict_do_nothing(index_elements=["content_hash"]), rows)
+            added += len(rows)
+        db.commit()
+        batch.clear()
+
+    for raw in items:
+        title = normalize_text(raw.get("title"))
+        if not title:
+            continue
+        seen += 1
+        summary = normalize_text(raw.get("summary"))
+        key = content_hash(title, summary)
+        batch[key] = {
+            "content_hash": key,
+            "source": source,
+            "title": title[:500],
+            "url": (raw.get("url") or "").strip() or None,
+            "summary": summary[:2000] or None,
+            "keywords": " ".join(extract_keywords(title, summary)),
+            "published_at": _parse_date(raw.get("published")) or now,
+            "ingested_at": now,
+        }
+        if len(batch) >= INSERT_CHUNK_SIZE:
+            flush()
+    flush()
+    return seen, added
+
+
+def ingest_feed(db, source: str, client: httpx.Client = None) -> dict:
+    """
+    Ingest one feed incrementally. Files are skipped when their mtime is
+    unchanged; URLs are fetched with If-None-Match / If-Modified-Since so
+    an unchanged feed costs a 304. Items already stored are skipped by hash.
+    """
+    now = datetime.utcnow()
+    state = db.get(TrendFeed, source) or TrendFeed(url=source, items_seen=0, items_added=0)
+
+    if source.startswith(("http://", "https://")):
+        headers = {}
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+        own_client = client is None
+        client = client or httpx.Client(timeout=15.0, follow_redirects=True)
+        try:
+            with client.stream("GET", source, headers=headers) as response:
+                if response.status_code == 304:
+                    return {"feed": source, "status": "unchanged", "seen": 0, "added": 0}
+                response.raise_for_status()
+                seen, added = _store_items(db, source, parse_feed(response.iter_bytes()), now)
+                state.etag = response.headers.get("etag")
+                state.last_modified = response.headers.get("last-modified")
+        finally:
+            if own_client:
+                client.close()
+    else:
+        mtime = str(os.stat(source).st_mtime_ns)
+        if state.last_modified == mtime:
+            return {"feed": source, "status": "unchanged", "seen": 0, "added": 0}
+        seen, added = _store_items(db, source, parse_feed(_file_chunks(source)), now)
+        state.last_modified = mtime
+
+    state.fetched_at = now
+    state.items_seen = (state.items_seen or 0) + seen
+    state.items_added = (state.items_added or 0) + added
+    db.merge(state)
+    db.commit()
+    return {"feed": source, "status": "ingested", "seen": seen, "added": added}
+
+
+def ingest_feeds(feeds: list = None, session_factory=SessionLocal) -> dict:
+    """Ingest every configured feed; one bad feed doesn't stop the rest."""
+    results = []
+    db = session_factory()
+    try:
+        for source in feeds if feeds is not None else resolve_feeds():
+            try:
+                results.append(ingest_feed(db, source))
+            except Exception as e:
+                db.rollback()
+                print(f"[TRENDS] failed to ingest {source}:", e)
+                results.append({"feed": source, "status": "error", "error": str(e), "seen": 0, "added": 0})
+    finally:
+        db.close()
+    added = sum(r["added"] for r in results)
+    if added:
+        trend_index.invalidate()
+    return {"feeds": results, "added": added}
+
+
+def ingest_trends_job():
+    result = ingest_feeds()
+    print(f"[TRENDS] ingested {len(result['feeds'])} feeds, {result['added']} new items")
+
+
+# ---------------------------
+# serving
+# ---------------------------
+class TrendIndex:
+    """
+    In-memory inverted index (keyword -> item ids) over stored trend items,
+    scored by matched keywords times an exponential recency decay.
+
+    The index loads incrementally: each refresh only reads rows with an id
+    above the last one seen, so processes that don't ingest still pick up
+    new items within a cache TTL. Query results are cached per
+    (industry, limit) for TREND_CACHE_TTL_SECONDS, which keeps repeated
+    lookups to a dict hit.
+    """
+
+    def __init__(self, session_factory=SessionLocal, ttl: float = TREND_CACHE_TTL_SECONDS,
+                 half_life_hours: float = TREND_HALF_LIFE_HOURS, max_items: int = TREND_INDEX_MAX_ITEMS,
+                 max_cached_queries: int = 256):
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.half_life = half_life_hours * 3600
+        self.max_items = max_items
+        self.max_cached_queries = max_cached_queries
+        self._items = {}      # id -> item dict
+        self._postings = {}   # keyword -> set of ids
+        self._last_id = 0
+        self._refreshed_at = None
+        self._cache = OrderedDict()  # (industry, limit) -> (expires_at, result)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def invalidate(self):
+        """Drop cached results and refresh from the database on the next query."""
+        with self._lock:
+            self._cache.clear()
+            self._refreshed_at = None
+
+    def _add(self, item: dict):
+        self._items[item["id"]] = item
+        for keyword in item["keywords"]:
+            self._postings.setdefault(keyword, set()).add(item["id"])
+
+    def _evict_oldest(self):
+        overflow = len(self._items) - self.max_items
+        if overflow <= 0:
+            return
+        for item in heapq.nsmallest(overflow, self._items.values(), key=lambda i: i["published_ts"]):
+            del self._items[item["id"]]
+            for keyword in item["keywords"]:
+                ids = self._postings.get(keyword)
+                if ids is not None:
+                    ids.discard(item["id"])
+                    if not ids:
+                        del self._postings[keyword]
+
+    def refresh(self) -> int:
+        """Load items stored since the last refresh. Returns how many were added."""
+        db = self.session_factory()
+        try:
+            rows = db.execute(
+                select(TrendItem.id, TrendItem.title, TrendItem.url, TrendItem.source,
+                       TrendItem.keywords, TrendItem.published_at)
+                .where(TrendItem.id > self._last_id)
+                .order_by(TrendItem.id)
+            ).all()
+        finally:
+            db.close()
+        with self._lock:
+            for row in rows:
+                self._add({
+                    "id": row.id,
+                    "title": row.title,
+                    "url": row.url,
+                    "source": row.source,
+                    "keywords": (row.keywords or "").split(),
+                    "published_at": row.published_at,
+                    "published_ts": row.published_at.replace(tzinfo=timezone.utc).timestamp(),
+                })
+                self._last_id = row.id
+            self._evict_oldest()
+            self._refreshed_at = time.monotonic()
+            if rows:
+                self._cache.clear()
+        return len(rows)
+
+    def _recency(self, published_ts: float, now: float) -> float:
+        age = max(0.0, now - published_ts)
+        return math.exp(-math.log(2) * age / self.half_life)
+
+    def search(self, industry: str = None, limit: int = 10) -> list:
+        """Top items for an industry/topic (all items when empty), best first."""
+        key = (" ".join(tokenize(industry)) if industry else "", limit)
+        now_mono = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > now_mono:
+                self._cache.move_to_end(key)
+                return cached[1]
+            stale = self._refreshed_at is None or now_mono - self._refreshed_at >= self.ttl
+        if stale:
+            self.refresh()
+
+        now = time.time()
+        terms = key[0].split()
+        with self._lock:
+            if terms:
+                hits = Counter()
+                for term in set(terms):
+                    for item_id in self._postings.get(term, ()):
+                        hits[item_id] += 1
+                scored = ((count * self._recency(self._items[i]["published_ts"], now), i)
+                          for i, count in hits.items())
+            else:
+                scored = ((self._recency(item["published_ts"], now), i) for i, item in self._items.items())
+            top = heapq.nlargest(limit, scored)
+            result = [self._public(self._items[i], score) for score, i in top]
+            self._cache[key] = (now_mono + self.ttl, result)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_cached_queries:
+                self._cache.popitem(last=False)
+        return result
+
+    @staticmethod
+    def _public(item: dict, score: float) -> dict:
+        source = item["source"] or ""
+        if not source.startswith(("http://", "https://")):
+            source = os.path.basename(source)  # don't expose server paths
+        return {
+            "title": item["title"],
+            "url": item["url"],
+            "source": source,
+            "keywords": item["keywords"],
+            "published_at": item["published_at"].isoformat(),
+            "score": round(score, 6),
+        }
+
+
+trend_index = TrendIndex()
@@ -0,0 +1,39 @@
+# app/worker.py
+"""
+Run the background services (scheduler, publish workers, maintenance)
+as their own process, next to web processes started with APP_ROLE=web:
+
+    APP_ROLE=web uvicorn app.main:app --workers 4
+    python -m app.worker
+
+Start more than one for failover; they elect a leader through the database.
+"""
+import os
+import signal
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def main():
+    from app.services.background import BackgroundServices, run_migrations
+
+    if os.getenv("AUTO_MIGRATE", "true").lower() == "true":
+        run_migrations()
+
+    # several workers (on one or more nodes) may run: one leads, the others stand by
+    services = BackgroundServices(role="worker")
+    services.start()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    print("[WORKER] running; Ctrl+C to stop")
+    stop.wait()
+    services.stop()
+    print("[WORKER] stopped")
+
+
+if __name__ == "__main__":
+    main()
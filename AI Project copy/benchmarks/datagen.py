@@ -0,0 +1,132 @@
+# benchmarks/datagen.py
+"""
+Synthetic data for benchmarks: posts in every status plus analytics rows
+for the published ones, written with chunked Core inserts so 1M posts
+takes minutes, not hours.
+
+    python -m benchmarks.datagen --db sqlite:///./bench.db --posts 100000
+
+Point --db at a scratch database; the app's own DATABASE_URL is not used.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+WORDS = (
+    "ai data leadership growth product launch team career hiring remote startup "
+    "cloud python strategy customer insight lesson mentor founder scale impact "
+    "learning community network brand story milestone design engineering market"
+).split()
+HASHTAGS = ["#AI", "#Leadership", "#Career", "#Startups", "#Python", "#Data", "#Marketing", "#Cloud"]
+STATUS_WEIGHTS = {"draft": 0.35, "scheduled": 0.05, "posted": 0.55, "failed": 0.05}
+
+
+def _content(rng: random.Random) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(80, 250)))
+
+
+def generate(engine, posts: int, days: int = 365, chunk_size: int = 10000, seed: int = 42,
+             progress: bool = False) -> dict:
+    """
+    Insert `posts` posts (and analytics for the posted ones) through `engine`.
+    Ids continue after the current max, so it can top up an existing database.
+    Returns counts and the elapsed time.
+    """
+    from sqlalchemy import func, insert, select
+    from sqlalchemy.orm import Session
+    from app.models.models import Post, Analytics
+    from app.services.engagement import engagement_score
+    from app.services.analytics_rollup import rebuild_rollup
+    from app.services.hashtags import rebuild_hashtags
+
+    rng = random.Random(seed)
+    statuses, weights = zip(*STATUS_WEIGHTS.items())
+    now = datetime.utcnow().replace(microsecond=0)
+    start = time.perf_counter()
+
+    with engine.connect() as conn:
+        next_id = (conn.execute(select(func.max(Post.id))).scalar() or 0) + 1
+
+    written_posts = written_analytics = 0
+    while written_posts < posts:
+        batch = min(chunk_size, posts - written_posts)
+        post_rows, analytics_rows = [], []
+        for post_id in range(next_id, next_id + batch):
+            status = rng.choices(statuses, weights)[0]
+            created_at = now - timedelta(seconds=rng.randint(0, days * 86400))
+            row = {
+                "id": post_id,
+                "prompt": f"Benchmark prompt {post_id}",
+                "content": _content(rng),
+                "hashtags": " ".join(rng.sample(HASHTAGS, 3)),
+                "status": status,
+                "scheduled_time": None,
+                "posted_at": None,
+                "publish_attempts": 0,
+                "created_at": created_at,
+            }
+            if status == "scheduled":
+                row["scheduled_time"] = now + timedelta(minutes=rng.randint(60, 60 * 24 * 30))
+            elif status == "posted":
+                row["posted_at"] = created_at + timedelta(minutes=rng.randint(1, 600))
+                row["publish_attempts"] = 1
+                likes = int(rng.paretovariate(1.5) * 20)
+                metrics = {
+                    "likes": likes,
+                    "comments": rng.randint(0, likes // 5 + 1),
+                    "shares": rng.randint(0, likes // 10 + 1),
+                    "impressions": likes * rng.randint(10, 30),
+                }
+                analytics_rows.append({
+                    "post_id": post_id,
+                    "engagement_score": engagement_score(metrics["likes"], metrics["comments"], metrics["shares"]),
+                    "created_at": row["posted_at"],
+                    **metrics,
+                })
+            post_rows.append(row)
+
+        with engine.begin() as conn:
+            conn.execute(insert(Post), post_rows)
+            if analytics_rows:
+                conn.execute(insert(Analytics), analytics_rows)
+
+        next_id += batch
+        written_posts += batch
+        written_analytics += len(analytics_rows)
+        if progress:
+            print(f"  {written_posts}/{posts} posts ({time.perf_counter() - start:.1f}s)", file=sys.stderr)
+
+    with Session(engine) as db:
+        rebuild_rollup(db)
+        db.commit()
+        rebuild_hashtags(db)
+
+    return {"posts": written_posts, "analytics": written_analytics,
+            "seconds": round(time.perf_counter() - start, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fill a database with synthetic posts and analytics")
+    parser.add_argument("--db", default="sqlite:///./bench.db", help="target DATABASE_URL")
+    parser.add_argument("--posts", type=int, default=10000)
+    parser.add_argument("--days", type=int, default=365, help="spread created_at over this many days")
+    parser.add_argument("--chunk-size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    # app.database reads DATABASE_URL at import time
+    os.environ["DATABASE_URL"] = args.db
+    from app.database import engine, migrate_db
+
+    migrate_db()
+    result = generate(engine, args.posts, days=args.days, chunk_size=args.chunk_size,
+                      seed=args.seed, progress=True)
+    print(f"Inserted {result['posts']} posts and {result['analytics']} analytics rows "
+          f"into {args.db} in {result['seconds']}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""
+Minimal OpenAI-compatible chat completions server for offline tests and
+benchmarks. Latency, jitter, per-token streaming delay and an error rate
+are configurable so load tests can model a real provider.
+
+    python -m benchmarks.groq_stub --port 8089 --latency-ms 400 --jitter-ms 150
+    GROQ_BASE_URL=http://127.0.0.1:8089 GROQ_API_KEY=stub uvicorn app.main:app
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubState:
+    def __init__(self, reply="Stub LinkedIn post\n#AI #Stub #Testing", latency=0.0, status=200,
+                 jitter=0.0, token_delay=0.0, error_rate=0.0, keep_requests=True):
+        self.reply = reply
+        self.latency = latency  # seconds before the response starts
+        self.jitter = jitter  # +/- uniform noise added to latency
+        self.token_delay = token_delay  # seconds between streamed chunks
+        self.status = status
+        self.raw_body = None  # bytes sent verbatim with a 200 instead of a completion (malformed replies)
+        self.error_rate = error_rate  # fraction of requests answered with a 503
+        self.keep_requests = keep_requests
+        self.requests = []
+        self.request_count = 0
+        self.lock = threading.Lock()
+
+    def delay(self) -> float:
+        return max(0.0, self.latency + random.uniform(-self.jitter, self.jitter))
+
+
+def _make_handler(state: StubState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            with state.lock:
+                state.request_count += 1
+                if state.keep_requests:
+                    state.requests.append(payload)
+            delay = state.delay()
+            if delay:
+                time.sleep(delay)
+            status = state.status
+            if status == 200 and state.error_rate and random.random() < state.error_rate:
+                status = 503
+
+            if state.raw_body is not None and status == 200:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(state.raw_body)))
+                self.end_headers()
+                self.wfile.write(state.raw_body)
+                return
+
+            if payload.get("stream") and status == 200:
+                self._stream(payload)
+                return
+
+            if status != 200:
+                body = json.dumps({"error": {"message": "stub failure"}}).encode()
+            else:
+                body = json.dumps({
+                    "id": "stub-1",
+                    "object": "chat.completion",
+                    "model": payload.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": state.reply}, "finish_reason": "stop"}],
+                    "usage": {"prompt_tokens": 10, "completion_tokens": len(state.reply.split()), "total_tokens": 10 + len(state.reply.split())},
+                }).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _stream(self, payload):
+            # OpenAI-style SSE: one chunk per word, then [DONE]
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            words = state.reply.split(" ")
+            for i, word in enumerate(words):
+                piece = word if i == 0 else " " + word
+                chunk = {"choices": [{"index": 0, "delta": {"content": piece}}], "model": payload.get("model")}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                if state.token_delay:
+                    time.sleep(state.token_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return Handler
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 512  # load tests open many connections at once
+
+
+def start_stub_server(port: int = 0, **kwargs):
+    """Start the stub (on a free port by default). Returns (server, state, base_url)."""
+    state = StubState(**kwargs)
+    server = StubServer(("127.0.0.1", port), _make_handler(state))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    return server, state, base_url
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible Groq stub")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=300)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--token-delay-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server, state, base_url = start_stub_server(
+        port=args.port,
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        token_delay=args.token_delay_ms / 1000,
+        error_rate=args.error_rate,
+        keep_requests=False,
+    )
+    print(f"Groq stub listening on {base_url} (set GROQ_BASE_URL to this)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,406 @@
+# benchmarks/run.py
+"""
+Load scenarios against a real uvicorn process.
+
+Starts the Groq stub and the app (in a subprocess, on the given database),
+drives each scenario with a fixed number of requests at a fixed
+concurrency and reports p50/p95/p99 latency, throughput, errors and the
+server's peak RSS. Results are written to benchmarks/results/ as JSON;
+pass --compare with an earlier file to see regressions.
+
+    python -m benchmarks.datagen --db sqlite:///./bench.db --posts 100000
+    python -m benchmarks.run --db sqlite:///./bench.db --compare benchmarks/results/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import httpx
+from sqlalchemy import create_engine, text
+
+from benchmarks.groq_stub import start_stub_server
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(PROJECT_DIR, "benchmarks", "results")
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: list, elapsed: float, errors: int = 0) -> dict:
+    values = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 2)
+    return {
+        "requests": len(values),
+        "errors": errors,
+        "p50_ms": ms(percentile(values, 50)),
+        "p95_ms": ms(percentile(values, 95)),
+        "p99_ms": ms(percentile(values, 99)),
+        "mean_ms": ms(sum(values) / len(values)) if values else 0.0,
+        "max_ms": ms(values[-1]) if values else 0.0,
+        "throughput_rps": round(len(values) / elapsed, 2) if elapsed > 0 else 0.0,
+    }
+
+
+# ---------------------------
+# server process
+# ---------------------------
+class ServerProcess:
+    def __init__(self, db_url: str, stub_url: str, port: int, env: dict = None, quiet: bool = True):
+        self.db_url = db_url
+        self.quiet = quiet
+        self.stub_url = stub_url
+        self.port = port
+        self.env = env or {}
+        self.proc = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 60):
+        env = dict(os.environ)
+        env.update({
+            "DATABASE_URL": self.db_url,
+            "GROQ_BASE_URL": self.stub_url,
+            "GROQ_API_KEY": "benchmark",
+            "PUBLISHER": "mock",
+            "PUBLISH_RATE_PER_SECOND": "1000",
+            "PUBLISH_BURST": "100",
+        })
+        env.update(self.env)
+        self.proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(self.port), "--log-level", "warning"],
+            cwd=PROJECT_DIR, env=env,
+            stdout=subprocess.DEVNULL if self.quiet else None,
+        )
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            if self.proc.poll() is not None:
+                raise RuntimeError("server exited during startup")
+            try:
+                if httpx.get(self.base_url + "/", timeout=1).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError("server did not become ready")
+
+    def _status_kb(self, field: str):
+        try:
+            with open(f"/proc/{self.proc.pid}/status") as f:
+                for line in f:
+                    if line.startswith(field + ":"):
+                        return int(line.split()[1])
+        except OSError:
+            return None
+        return None
+
+    def reset_peak_rss(self):
+        # Linux: writing 5 to clear_refs resets VmHWM (peak RSS)
+        try:
+            with open(f"/proc/{self.proc.pid}/clear_refs", "w") as f:
+                f.write("5")
+        except OSError:
+            pass
+
+    def peak_rss_mb(self):
+        kb = self._status_kb("VmHWM")
+        return round(kb / 1024, 1) if kb is not None else None
+
+    def stop(self):
+        if self.proc and self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+
+
+# ---------------------------
+# load driver
+# ---------------------------
+async def drive(client: httpx.AsyncClient, make_request, requests: int, concurrency: int) -> dict:
+    """Send `requests` requests from `concurrency` workers; make_request(i) -> (method, url, kwargs)."""
+    latencies, errors = [], 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            method, url, kwargs = make_request(i)
+            start = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            latencies.append(time.perf_counter() - start)
+            if not ok:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, time.perf_counter() - start, errors)
+
+
+async def collect_fixtures(client: httpx.AsyncClient, pages: int = 20) -> dict:
+    """Cursors deep into the list and ids of posted posts, gathered through the API."""
+    cursors, posted_ids, cursor = [], [], None
+    for _ in range(pages):
+        params = {"limit": 100, "status": "posted"}
+        if cursor:
+            params["cursor"] = cursor
+        data = (await client.get("/content/list", params=params)).json()
+        posted_ids.extend(p["id"] for p in data["posts"])
+        cursor = data["next_cursor"]
+        if not cursor:
+            break
+        cursors.append(cursor)
+    return {"cursors": cursors or [None], "posted_ids": posted_ids or [1]}
+
+
+# single words, a phrase and a prefix from the datagen vocabulary
+SEARCH_TERMS = ["mentor", "kubernetes", "founder", '"founder story"', "engin*"]
+
+
+def build_scenarios(fixtures: dict, scale: float) -> list:
+    """(name, make_request, requests, concurrency). `scale` multiplies request counts."""
+    rnd = random.Random(7)
+    n = lambda count: max(1, int(count * scale))
+
+    def deep_page(_i):
+        cursor = rnd.choice(fixtures["cursors"])
+        return "GET", "/content/list", {"params": {"limit": 50, **({"cursor": cursor} if cursor else {})}}
+
+    return [
+        ("root", lambda i: ("GET", "/", {}), n(500), 20),
+        ("content_list_first_page", lambda i: ("GET", "/content/list", {"params": {"limit": 50}}), n(500), 20),
+        ("content_list_status_filter", lambda i: ("GET", "/content/list", {"params": {"limit": 50, "status": "posted"}}), n(500), 20),
+        ("content_list_deep_pages", deep_page, n(500), 20),
+        ("content_search", lambda i: ("GET", "/content/search", {"params": {"q": rnd.choice(SEARCH_TERMS)}}), n(300), 20),
+        ("content_search_filtered", lambda i: ("GET", "/content/search", {"params": {"q": rnd.choice(SEARCH_TERMS), "status": "posted"}}), n(300), 20),
+        ("content_analytics_full", lambda i: ("GET", "/content/analytics", {}), n(10), 2),
+        ("analytics_summary", lambda i: ("GET", "/analytics/", {}), n(500), 20),
+        ("analytics_post", lambda i: ("GET", f"/analytics/post/{rnd.choice(fixtures['posted_ids'])}", {}), n(500), 20),
+        ("analytics_top_performing", lambda i: ("GET", "/analytics/top-performing", {"params": {"limit": 10}}), n(300), 20),
+        ("analytics_top_performing_30d", lambda i: ("GET", "/analytics/top-performing", {"params": {"limit": 10, "days": 30}}), n(300), 20),
+        ("generate_llm", lambda i: ("POST", "/content/generate", {"params": {"no_cache": True}, "json": {"prompt": f"Benchmark generate {i}"}}), n(100), 20),
+        ("generate_cached", lambda i: ("POST", "/content/generate", {"json": {"prompt": "Benchmark cached prompt"}}), n(300), 20),
+    ]
+
+
+async def scheduler_drain(client: httpx.AsyncClient, db_url: str, posts: int, timeout: float = 120) -> dict:
+    """
+    Schedule `posts` drafts to be due now and measure how long the
+    dispatcher + publish pool take to post them all, plus per-post lag
+    (posted_at - scheduled_time).
+    """
+    ids = []
+    while len(ids) < posts:
+        prompts = ["Benchmark scheduled post"] * min(100, posts - len(ids))  # BATCH_MAX_PROMPTS
+        response = await client.post("/content/generate/batch", json={"prompts": prompts})
+        ids.extend(r["post_id"] for r in response.json()["results"])
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        client.post("/content/schedule", params={"post_id": post_id, "delay_minutes": 0}) for post_id in ids
+    ))
+
+    engine = create_engine(db_url)
+    id_list = ",".join(str(i) for i in ids)
+    try:
+        posted = 0
+        while time.perf_counter() - start < timeout:
+            with engine.connect() as conn:
+                posted = conn.execute(text(f"SELECT count(*) FROM posts WHERE status = 'posted' AND id IN ({id_list})")).scalar()
+            if posted == len(ids):
+                break
+            await asyncio.sleep(0.05)
+        elapsed = time.perf_counter() - start
+        with engine.connect() as conn:
+            rows = conn.execute(text(f"SELECT scheduled_time, posted_at FROM posts WHERE status = 'posted' AND id IN ({id_list})")).all()
+    finally:
+        engine.dispose()
+
+    def as_dt(value):
+        return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+    lags = sorted((as_dt(p) - as_dt(s)).total_seconds() for s, p in rows if s and p)
+    ms = lambda seconds: round(seconds * 1000, 2)
+    return {
+        "posts": len(ids),
+        "posted": posted,
+        "drain_seconds": round(elapsed, 2),
+        "throughput_posts_per_s": round(posted / elapsed, 2) if elapsed else 0.0,
+        "lag_p50_ms": ms(percentile(lags, 50)),
+        "lag_p95_ms": ms(percentile(lags, 95)),
+        "lag_p99_ms": ms(percentile(lags, 99)),
+    }
+
+
+# ---------------------------
+# results
+# ---------------------------
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def save_results(results: dict, path: str = None) -> str:
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    if path is None:
+        stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+        path = os.path.join(RESULTS_DIR, f"{stamp}_{results['meta']['git']}.json")
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+    return path
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Print p95 / throughput deltas against `baseline`; returns regressed scenario names."""
+    regressions = []
+    print(f"\n{'scenario':34} {'p95 ms':>10} {'base':>10} {'delta':>8} {'rps':>9} {'base':>9}")
+    for name, current in results["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old or "p95_ms" not in current:
+            continue
+        delta = (current["p95_ms"] - old["p95_ms"]) / old["p95_ms"] if old["p95_ms"] else 0.0
+        flag = ""
+        if delta > threshold:
+            flag = "  REGRESSION"
+            regressions.append(name)
+        print(f"{name:34} {current['p95_ms']:>10} {old['p95_ms']:>10} {delta:>+8.0%} "
+              f"{current['throughput_rps']:>9} {old['throughput_rps']:>9}{flag}")
+    return regressions
+
+
+def print_table(results: dict):
+    print(f"\n{'scenario':34} {'reqs':>6} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'rps':>9} {'rss MB':>7}")
+    for name, r in results["scenarios"].items():
+        if "p50_ms" in r:
+            print(f"{name:34} {r['requests']:>6} {r['errors']:>4} {r['p50_ms']:>8} {r['p95_ms']:>8} "
+                  f"{r['p99_ms']:>8} {r['throughput_rps']:>9} {r.get('peak_rss_mb') or '-':>7}")
+        else:
+            print(f"{name:34} {json.dumps(r)}")
+
+
+async def run_all(args, server: ServerProcess) -> dict:
+    scenarios = {}
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=server.base_url, timeout=args.request_timeout, limits=limits) as client:
+        fixtures = await collect_fixtures(client)
+        selected = set(args.only.split(",")) if args.only else None
+        for name, make_request, requests, concurrency in build_scenarios(fixtures, args.scale):
+            if selected and name not in selected:
+                continue
+            await drive(client, make_request, min(requests, 20), min(concurrency, 4))  # warm-up
+            server.reset_peak_rss()
+            result = await drive(client, make_request, requests, args.concurrency or concurrency)
+            result["concurrency"] = args.concurrency or concurrency
+            result["peak_rss_mb"] = server.peak_rss_mb()
+            scenarios[name] = result
+            print(f"  {name}: p95 {result['p95_ms']}ms, {result['throughput_rps']} req/s", file=sys.stderr)
+        if args.scheduler_posts and (not selected or "scheduler_drain" in selected):
+            server.reset_peak_rss()
+            result = await scheduler_drain(client, args.db, args.scheduler_posts)
+            result["peak_rss_mb"] = server.peak_rss_mb()
+            scenarios["scheduler_drain"] = result
+            print(f"  scheduler_drain: {result}", file=sys.stderr)
+    return scenarios
+
+
+def absolute_sqlite_url(url: str) -> str:
+    """The server runs from the project dir; pin relative SQLite paths to the caller's cwd."""
+    prefix = "sqlite:///"
+    if url.startswith(prefix) and not url.startswith(prefix + "/"):
+        return prefix + os.path.abspath(url[len(prefix):])
+    return url
+
+
+def count_posts(db_url: str):
+    engine = create_engine(db_url)
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT count(*) FROM posts")).scalar()
+    except Exception:
+        return None
+    finally:
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the load scenarios and save the results")
+    parser.add_argument("--db", default="sqlite:///./bench.db", help="DATABASE_URL the server runs against")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--llm-jitter-ms", type=float, default=100)
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every scenario's request count")
+    parser.add_argument("--concurrency", type=int, default=None, help="override per-scenario concurrency")
+    parser.add_argument("--max-connections", type=int, default=100)
+    parser.add_argument("--request-timeout", type=float, default=120)
+    parser.add_argument("--scheduler-posts", type=int, default=200, help="0 skips the scheduler drain")
+    parser.add_argument("--only", help="comma-separated scenario names")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/<time>_<git>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="p95 increase counted as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--show-server-output", action="store_true")
+    args = parser.parse_args()
+    args.db = absolute_sqlite_url(args.db)
+
+    stub, _state, stub_url = start_stub_server(
+        latency=args.llm_latency_ms / 1000, jitter=args.llm_jitter_ms / 1000, keep_requests=False
+    )
+    server = ServerProcess(args.db, stub_url, args.port, quiet=not args.show_server_output)
+    server.start()
+    try:
+        scenarios = asyncio.run(run_all(args, server))
+    finally:
+        server.stop()
+        stub.shutdown()
+
+    results = {
+        "meta": {
+            "git": git_revision(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "db": args.db.split("@")[-1],  # drop credentials
+            "posts": count_posts(args.db),
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "scale": args.scale,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "scenarios": scenarios,
+    }
+    print_table(results)
+    path = save_results(results, args.output)
+    print(f"\nSaved {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} scenario(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+            if args.fail_on_regression:
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# migrations/env.py
+from logging.config import fileConfig
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from alembic import context
+from sqlalchemy import create_engine
+from app.database import Base, SQLALCHEMY_DATABASE_URL, configure_engine, engine_options, is_sqlite
+import app.models.models  # noqa: F401  (registers the tables on Base.metadata)
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+url = config.get_main_option("sqlalchemy.url") or SQLALCHEMY_DATABASE_URL
+if url.startswith("driver://"):
+    url = SQLALCHEMY_DATABASE_URL
+# SQLite can't ALTER most things in place; batch mode rebuilds the table instead
+render_as_batch = is_sqlite(url)
+# full-text search objects (0004) are raw SQL, not models; keep autogenerate from dropping them
+SEARCH_OBJECTS = ("posts_fts", "ix_posts_search")
+
+
+def include_name(name, type_, parent_names):
+    return not (name or "").startswith(SEARCH_OBJECTS)
+
+
+def run_migrations_offline():
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=render_as_batch,
+        include_name=include_name,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connectable = configure_engine(create_engine(url, **engine_options(url)))
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=render_as_batch,
+            include_name=include_name,
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+    connectable.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
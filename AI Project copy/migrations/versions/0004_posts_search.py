@@ -0,0 +1,91 @@
+"""posts full-text search
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 07:20:00.000000
+
+SQLite: an external-content FTS5 table over posts(prompt, content,
+hashtags), kept in sync by triggers. PostgreSQL: a GIN index on the
+equivalent tsvector expression (see app/services/search.py).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SQLITE_UPGRADE = [
+    """
+    CREATE VIRTUAL TABLE posts_fts USING fts5(
+        prompt, content, hashtags,
+        content='posts', content_rowid='id',
+        tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER posts_fts_ai AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts(rowid, prompt, content, hashtags)
+        VALUES (new.id, new.prompt, new.content, new.hashtags);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_fts_ad AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, prompt, content, hashtags)
+        VALUES ('delete', old.id, old.prompt, old.content, old.hashtags);
+    END
+    """,
+    # status/schedule updates don't touch the index
+    """
+    CREATE TRIGGER posts_fts_au AFTER UPDATE OF prompt, content, hashtags ON posts BEGIN
+        INSERT INTO posts_fts(posts_fts, rowid, prompt, content, hashtags)
+        VALUES ('delete', old.id, old.prompt, old.content, old.hashtags);
+        INSERT INTO posts_fts(rowid, prompt, content, hashtags)
+        VALUES (new.id, new.prompt, new.content, new.hashtags);
+    END
+    """,
+    # index posts that existed before this migration
+    "INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS posts_fts_au",
+    "DROP TRIGGER IF EXISTS posts_fts_ad",
+    "DROP TRIGGER IF EXISTS posts_fts_ai",
+    "DROP TABLE IF EXISTS posts_fts",
+]
+
+POSTGRES_UPGRADE = [
+    """
+    CREATE INDEX ix_posts_search ON posts USING gin (
+        to_tsvector('english', coalesce(prompt, '') || ' ' || content || ' ' || coalesce(hashtags, ''))
+    )
+    """,
+]
+
+POSTGRES_DOWNGRADE = ["DROP INDEX IF EXISTS ix_posts_search"]
+
+
+def _statements(sqlite, postgresql):
+    dialect = op.get_bind().dialect.name
+    if dialect == "sqlite":
+        return sqlite
+    if dialect == "postgresql":
+        return postgresql
+    return []
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for statement in _statements(SQLITE_UPGRADE, POSTGRES_UPGRADE):
+        op.execute(statement)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for statement in _statements(SQLITE_DOWNGRADE, POSTGRES_DOWNGRADE):
+        op.execute(statement)
@@ -0,0 +1,102 @@
+"""normalized hashtags
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 07:02:20.077672
+
+Hashtags parsed out of posts.hashtags into hashtags / post_hashtags,
+case-folded and de-duplicated, with existing posts backfilled. The parsing
+is frozen here rather than imported from app.services.hashtags.
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, Sequence[str], None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 1000
+SYSTEM_TAGS = {"autoposted", "published"}
+_HASHTAG = re.compile(r"#(\w+)")
+
+posts = sa.table("posts", sa.column("id", sa.Integer), sa.column("hashtags", sa.String))
+hashtags = sa.table(
+    "hashtags", sa.column("id", sa.Integer), sa.column("tag", sa.String), sa.column("display", sa.String)
+)
+post_hashtags = sa.table("post_hashtags", sa.column("hashtag_id", sa.Integer), sa.column("post_id", sa.Integer))
+
+
+def _parse(text):
+    found = {}
+    for display in _HASHTAG.findall(text or ""):
+        tag = display.casefold()
+        if tag not in found and tag not in SYSTEM_TAGS and not display.isdigit():
+            found[tag] = display
+    return found
+
+
+def _backfill():
+    bind = op.get_bind()
+    ids = {}
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(posts.c.id, posts.c.hashtags).where(posts.c.id > last_id).order_by(posts.c.id).limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            return
+        parsed = [(post_id, _parse(text)) for post_id, text in rows]
+        new_tags = {}
+        for _post_id, tags in parsed:
+            for tag, display in tags.items():
+                if tag not in ids:
+                    new_tags.setdefault(tag, display)
+        if new_tags:
+            bind.execute(hashtags.insert(), [{"tag": tag, "display": display} for tag, display in new_tags.items()])
+            ids.update(bind.execute(sa.select(hashtags.c.tag, hashtags.c.id).where(hashtags.c.tag.in_(list(new_tags)))).all())
+        links = [{"hashtag_id": ids[tag], "post_id": post_id} for post_id, tags in parsed for tag in tags]
+        if links:
+            bind.execute(post_hashtags.insert(), links)
+        last_id = rows[-1][0]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('hashtags',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('tag', sa.String(), nullable=False),
+    sa.Column('display', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('tag')
+    )
+    op.create_table('post_hashtags',
+    sa.Column('hashtag_id', sa.Integer(), nullable=False),
+    sa.Column('post_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['hashtag_id'], ['hashtags.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('hashtag_id', 'post_id'),
+    sqlite_with_rowid=False
+    )
+    with op.batch_alter_table('post_hashtags', schema=None) as batch_op:
+        batch_op.create_index('ix_post_hashtags_post_id', ['post_id'], unique=False)
+
+    # ### end Alembic commands ###
+    _backfill()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('post_hashtags', schema=None) as batch_op:
+        batch_op.drop_index('ix_post_hashtags_post_id')
+
+    op.drop_table('post_hashtags')
+    op.drop_table('hashtags')
+    # ### end Alembic commands ###
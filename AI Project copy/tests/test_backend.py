@@ -1,3 +1,4 @@
+import json
 import pytest
 from fastapi.testclient import TestClient
 from app.main import app
@@ -7,6 +8,12 @@ from app.models.models import Post, Profile
 # Create a test client
 client = TestClient(app)
 
+@pytest.fixture(scope="session", autouse=True)
+def app_lifespan():
+    # run the app's lifespan (migrations, background services) once for the session
+    with client:
+        yield
+
 # Setup and teardown for tests
 @pytest.fixture(scope="function")
 def setup_database():
@@ -97,4 +104,1205 @@ def test_schedule_post():
     assert response.status_code == 200
     data = response.json()
     assert "message" in data
-    assert "post_id" in data
\ No newline at end of file
+    assert "post_id" in data
+
+@pytest.fixture
+def groq_stub():
+    """Point the shared LLM client at a local stub server."""
+    from app.services import llm_client
+    from app.services.completion_cache import completion_cache
+    from benchmarks.groq_stub import start_stub_server
+
+    completion_cache.clear()
+    server, state, base_url = start_stub_server()
+    previous = llm_client._client
+    llm_client.set_llm_client(llm_client.LLMClient(base_url=base_url, api_key="test-key", max_concurrency=2, timeout=5))
+    yield state
+    llm_client.set_llm_client(previous)
+    server.shutdown()
+
+def test_generate_content_with_llm_stub(groq_stub):
+    """Generation goes through the shared async client."""
+    response = client.post("/content/generate", json={"prompt": "Stubbed prompt"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["post"]["content"].startswith("Stub LinkedIn post")
+    assert data["post"]["hashtags"] == "#AI #Stub #Testing"
+    assert groq_stub.requests[-1]["messages"][-1]["content"] == "Stubbed prompt"
+
+def test_llm_client_deadline(groq_stub):
+    """A slow provider misses the per-call deadline and falls back to None."""
+    import asyncio
+    from app.services import llm_client
+
+    groq_stub.latency = 1.0
+    text = asyncio.run(llm_client.generate_text("slow", system="test", timeout=0.2))
+    assert text is None
+
+def test_generate_batch(groq_stub):
+    """Batch generation fans out to the LLM and bulk inserts every draft."""
+    from sqlalchemy import event
+    from app.database import async_engine
+
+    inserts = []
+
+    def count_post_inserts(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("INSERT INTO POSTS "):
+            inserts.append(statement)
+
+    prompts = [f"Batch prompt {i}" for i in range(5)]
+    event.listen(async_engine.sync_engine, "before_cursor_execute", count_post_inserts)
+    try:
+        response = client.post("/content/generate/batch", json={"prompts": prompts, "concurrency": 3})
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", count_post_inserts)
+    assert response.status_code == 200
+    data = response.json()
+    assert [r["prompt"] for r in data["results"]] == prompts
+    assert all(r["source"] == "llm" for r in data["results"])
+    assert len({r["post_id"] for r in data["results"]}) == 5
+    assert len(groq_stub.requests) == 5
+    assert len(inserts) == 1  # one multi-row statement, not one per draft
+    db = SessionLocal()
+    try:
+        assert [db.get(Post, r["post_id"]).prompt for r in data["results"]] == prompts
+    finally:
+        db.close()
+
+def test_generate_uses_completion_cache(groq_stub):
+    """Repeated prompts are served from the cache unless bypassed."""
+    first = client.post("/content/generate", json={"prompt": "Cache me  please"})
+    second = client.post("/content/generate", json={"prompt": "Cache me please"})
+    bypass = client.post("/content/generate", params={"no_cache": True}, json={"prompt": "Cache me please"})
+    assert first.json()["source"] == "llm"
+    assert second.json()["source"] == "cache"
+    assert bypass.json()["source"] == "llm"
+    assert len(groq_stub.requests) == 2
+    stats = client.get("/content/cache/stats").json()
+    assert stats["hits"] >= 1
+
+def test_completion_cache_async_tiers_batch_touches():
+    """aget/aset keep the table off the event loop; hit times are written in one batch."""
+    import asyncio
+    from app.models.models import CompletionCache as Row
+    from app.services.completion_cache import CompletionCache
+
+    cache = CompletionCache(max_memory_entries=8)
+    cache.clear()
+    asyncio.run(cache.aset("k1", "cached text", model="m"))
+    with cache._lock:
+        cache._memory.clear()
+    assert asyncio.run(cache.aget("k1")) == "cached text"  # from the table
+    assert asyncio.run(cache.aget("k1")) == "cached text"  # from memory
+    assert cache.db_hits == 1 and cache.memory_hits == 1
+
+    db = SessionLocal()
+    try:
+        stored = db.get(Row, "k1").last_used_at
+        assert stored < cache._touched["k1"]  # hits are not written one by one
+        cache.flush_touches()
+        db.expire_all()
+        assert db.get(Row, "k1").last_used_at > stored
+        assert not cache._touched
+    finally:
+        db.close()
+        cache.clear()
+
+def _read_sse(response):
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        event, data = "message", None
+        for line in block.splitlines():
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+        events.append((event, data))
+    return events
+
+def test_generate_stream(groq_stub):
+    """Tokens are relayed as SSE and the draft is saved when the stream ends."""
+    response = client.get("/content/generate/stream", params={"prompt": "Stream this"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _read_sse(response)
+    tokens = [d["token"] for e, d in events if e == "message"]
+    assert "".join(tokens) == groq_stub.reply
+    assert len(tokens) > 1
+    event, done = events[-1]
+    assert event == "done" and done["source"] == "llm"
+    assert groq_stub.requests[-1]["stream"] is True
+
+def test_generate_stream_local_fallback():
+    """Without a provider the local fallback is streamed instead."""
+    from app.services import llm_client
+
+    previous = llm_client._client
+    llm_client.set_llm_client(llm_client.LLMClient(base_url="http://127.0.0.1:9", api_key=None))
+    try:
+        response = client.get("/content/generate/stream", params={"prompt": "Offline stream", "no_cache": True})
+    finally:
+        llm_client.set_llm_client(previous)
+    events = _read_sse(response)
+    assert "".join(d["token"] for e, d in events if e == "message").startswith("Offline stream")
+    assert events[-1][0] == "done" and events[-1][1]["source"] == "fallback"
+
+def test_list_posts_keyset_pagination():
+    """Pages follow (created_at, id) order without gaps or repeats."""
+    client.post("/content/generate/batch", json={"prompts": [f"Page prompt {i}" for i in range(5)]})
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 2, "status": "draft"}
+        if cursor:
+            params["cursor"] = cursor
+        data = client.get("/content/list", params=params).json()
+        assert len(data["posts"]) <= 2
+        seen.extend(p["id"] for p in data["posts"])
+        cursor = data["next_cursor"]
+        if not data["has_more"]:
+            break
+    assert len(seen) == len(set(seen))
+    assert seen == [p["id"] for p in client.get("/content/list", params={"limit": 200, "status": "draft"}).json()["posts"]][:len(seen)]
+    assert client.get("/content/list", params={"cursor": "not-a-cursor"}).status_code == 400
+
+def test_analytics_summary_rollup():
+    """Publishing updates the rollup incrementally and it matches a full SQL rebuild."""
+    from app.services.post_publisher import publish_post_and_create_analytics
+
+    before = client.get("/analytics/").json()
+    post_id = client.post("/content/generate", json={"prompt": "Rollup post"}).json()["post"]["id"]
+    assert publish_post_and_create_analytics(post_id)
+
+    after = client.get("/analytics/").json()
+    assert after["total_posts"] == before["total_posts"] + 1
+    rebuilt = client.get("/analytics/", params={"refresh": True}).json()
+    assert rebuilt == after
+
+def test_rollup_rebuild_is_safe_when_racing():
+    """Concurrent rebuilds of a missing rollup row upsert instead of failing on the primary key."""
+    import threading
+    from app.models.models import AnalyticsRollup
+    from app.services.analytics_rollup import get_rollup
+
+    db = SessionLocal()
+    try:
+        db.query(AnalyticsRollup).delete()
+        db.commit()
+    finally:
+        db.close()
+
+    barrier, errors, totals = threading.Barrier(4), [], []
+
+    def rebuild():
+        session = SessionLocal()
+        try:
+            barrier.wait()
+            totals.append(get_rollup(session).post_count)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            session.close()
+
+    threads = [threading.Thread(target=rebuild) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len(set(totals)) == 1
+
+def test_top_performing_uses_stored_score():
+    """Scores are stored on write and the top-K list is ordered by them."""
+    from app.database import SessionLocal
+    from app.models.models import Analytics
+
+    post_id = client.post("/content/generate", json={"prompt": "Top post"}).json()["post"]["id"]
+    db = SessionLocal()
+    try:
+        row = Analytics(post_id=post_id, likes=100000, comments=10, shares=1, impressions=5)
+        db.add(row)
+        db.commit()
+        assert row.engagement_score == 100000 + 10 * 2 + 1 * 3
+        row.shares = 2
+        db.commit()
+        assert row.engagement_score == 100000 + 10 * 2 + 2 * 3
+    finally:
+        db.close()
+
+    data = client.get("/analytics/top-performing", params={"limit": 3, "days": 1}).json()
+    assert data["top_posts"][0]["post_id"] == post_id
+    assert data["top_posts"][0]["engagement_score"] == 100026
+
+def test_metric_series_downsampling_and_retention():
+    """Points roll up into hourly/daily buckets and survive raw compaction."""
+    import datetime
+    from app.database import SessionLocal
+    from app.services.timeseries import compact_metrics
+
+    post_id = client.post("/content/generate", json={"prompt": "Series post"}).json()["post"]["id"]
+    base = datetime.datetime.utcnow().replace(minute=0, second=0, microsecond=0) - datetime.timedelta(days=10)
+    observations = [(0, 10), (20, 15), (70, 40), (24 * 60 + 5, 90)]  # (minutes after base, likes)
+    for minutes, likes in observations:
+        ts = (base + datetime.timedelta(minutes=minutes)).isoformat()
+        r = client.post(f"/analytics/post/{post_id}/metrics", json={"likes": likes, "impressions": likes * 10, "ts": ts})
+        assert r.status_code == 200
+    # an older, late-arriving point must not overwrite newer bucket values
+    client.post(f"/analytics/post/{post_id}/metrics", json={"likes": 1, "ts": (base + datetime.timedelta(minutes=5)).isoformat()})
+
+    window = {"start": base.isoformat(), "end": (base + datetime.timedelta(days=2)).isoformat()}
+    hourly = client.get(f"/analytics/post/{post_id}/series", params={**window, "resolution": "hour"}).json()
+    assert [p["likes"] for p in hourly["points"]] == [15, 40, 90]
+    daily = client.get(f"/analytics/post/{post_id}/series", params={**window, "resolution": "day"}).json()
+    assert [p["likes"] for p in daily["points"]][-1] == 90
+    assert client.get(f"/analytics/post/{post_id}").json()["analytics"]["likes"] == 90
+
+    db = SessionLocal()
+    try:
+        assert compact_metrics(db)["raw_deleted"] >= len(observations)
+    finally:
+        db.close()
+    raw = client.get(f"/analytics/post/{post_id}/series", params={**window, "resolution": "raw"}).json()
+    assert raw["points"] == []
+    auto = client.get(f"/analytics/post/{post_id}/series", params=window).json()
+    assert auto["resolution"] == "hour" and len(auto["points"]) == 3
+
+def test_scheduler_claims_exactly_once():
+    """A due post is claimed by exactly one dispatcher pass."""
+    import datetime
+    from app.database import SessionLocal
+    from app.models.models import Post
+    from app.services.scheduler import SchedulerService
+
+    service = SchedulerService()
+    db = SessionLocal()
+    try:
+        post = Post(content="claim me", status="scheduled",
+                    scheduled_time=datetime.datetime.utcnow() + datetime.timedelta(hours=1))
+        db.add(post)
+        db.commit()
+        post_id = post.id
+    finally:
+        db.close()
+
+    future = datetime.datetime.utcnow() + datetime.timedelta(hours=2)
+    first = service.claim_due_posts(now=future)
+    second = service.claim_due_posts(now=future)
+    assert post_id in first
+    assert post_id not in second
+
+def test_scheduled_post_published_promptly():
+    """The running dispatcher is woken by /content/schedule and publishes without polling delay."""
+    import time
+    from app.services.scheduler import scheduler_service
+
+    assert scheduler_service.running
+    post_id = client.post("/content/generate", json={"prompt": "Publish me now"}).json()["post"]["id"]
+    client.post("/content/schedule", params={"post_id": post_id, "delay_minutes": 0})
+    deadline = time.time() + 5
+    status = None
+    while time.time() < deadline:
+        status = next(p["status"] for p in client.get("/content/list", params={"limit": 200}).json()["posts"] if p["id"] == post_id)
+        if status == "posted":
+            break
+        time.sleep(0.05)
+    assert status == "posted"
+
+def test_dispatcher_notices_posts_scheduled_by_other_processes():
+    """A due post written straight to the table (no notify(), as from a web replica) is published within the poll."""
+    import time
+    import datetime
+    from app.services.scheduler import scheduler_service
+
+    assert scheduler_service.running
+    time.sleep(0.2)  # let the dispatcher go back to sleep
+    db = SessionLocal()
+    try:
+        post = Post(content="scheduled elsewhere", status="scheduled", scheduled_time=datetime.datetime.utcnow())
+        db.add(post)
+        db.commit()
+        deadline = time.time() + 5  # well under SCHEDULER_MAX_IDLE_SECONDS
+        while time.time() < deadline:
+            db.refresh(post)
+            if post.status == "posted":
+                break
+            time.sleep(0.05)
+        assert post.status == "posted"
+    finally:
+        db.close()
+
+def test_schedule_refuses_claimed_or_posted_posts():
+    """Rescheduling a post a worker has claimed, or one already posted, is a 409 and leaves it alone."""
+    from app.services.scheduler import schedule_post
+
+    db = SessionLocal()
+    try:
+        publishing = Post(content="being published", status="publishing")
+        posted = Post(content="already out", status="posted")
+        db.add_all([publishing, posted])
+        db.commit()
+        for post in (publishing, posted):
+            r = client.post("/content/schedule", params={"post_id": post.id, "delay_minutes": 0})
+            assert r.status_code == 409
+            assert schedule_post(post.id, post.created_at) is False
+            db.refresh(post)
+        assert (publishing.status, posted.status) == ("publishing", "posted")
+    finally:
+        db.close()
+
+def test_requeued_claim_is_finalized_once():
+    """A worker whose claim was requeued and re-taken can't finalize the post or count its analytics."""
+    import datetime
+    import threading
+    from app.models.models import Analytics
+    from app.services.publisher import Publisher, PublishResult, PublishWorkerPool
+
+    started, release = threading.Event(), threading.Event()
+
+    class SlowPublisher(Publisher):
+        name = "slow"
+        rate_per_second = 100.0
+        burst = 10
+
+        def publish(self, post):
+            started.set()
+            release.wait(5)
+            return PublishResult(urn="urn:li:share:slow", metrics={"likes": 3})
+
+    db = SessionLocal()
+    try:
+        post = Post(content="claimed twice", status="publishing", claimed_at=datetime.datetime.utcnow())
+        db.add(post)
+        db.commit()
+        pool = PublishWorkerPool(SlowPublisher(), concurrency=1)
+        first = pool.submit(post.id)
+        assert started.wait(5)
+        # meanwhile the claim goes stale, is requeued and re-claimed by another dispatcher
+        post.claimed_at = datetime.datetime.utcnow() + datetime.timedelta(seconds=1)
+        db.commit()
+        release.set()
+        assert first.result(timeout=5) is False
+        pool.shutdown()
+        db.refresh(post)
+        assert post.status == "publishing"
+        assert db.query(Analytics).filter(Analytics.post_id == post.id).count() == 0
+    finally:
+        db.close()
+
+def test_token_bucket_limits_rate():
+    """The limiter admits the burst immediately, then paces at the configured rate."""
+    import time
+    from app.services.publisher import TokenBucket
+
+    bucket = TokenBucket(rate=20, capacity=2)
+    start = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    elapsed = time.monotonic() - start
+    assert 0.15 <= elapsed < 1.0  # 4 tokens beyond the burst at 20/s
+
+def test_publish_pool_retries_and_tracks_attempts():
+    """Transient publisher failures are retried with backoff and counted per post."""
+    from app.database import SessionLocal
+    from app.models.models import Post
+    from app.services.publisher import Publisher, PublishResult, PublishError, PublishWorkerPool
+
+    # a publisher without publish() can't be built, let alone handed to a pool
+    with pytest.raises(TypeError):
+        type("IncompletePublisher", (Publisher,), {})()
+
+    class FlakyPublisher(Publisher):
+        name = "flaky"
+        rate_per_second = 100.0
+        burst = 10
+
+        def __init__(self):
+            self.calls = 0
+
+        def publish(self, post):
+            self.calls += 1
+            if self.calls < 3:
+                raise PublishError("503 from provider", retryable=True)
+            return PublishResult(urn="urn:li:share:flaky", metrics={"likes": 7})
+
+    class RejectingPublisher(Publisher):
+        name = "rejecting"
+        rate_per_second = 100.0
+
+        def publish(self, post):
+            raise PublishError("400 bad request", retryable=False)
+
+    db = SessionLocal()
+    try:
+        ok_post = Post(content="flaky publish", status="publishing")
+        bad_post = Post(content="rejected publish", status="publishing")
+        db.add_all([ok_post, bad_post])
+        db.commit()
+        ok_id, bad_id = ok_post.id, bad_post.id
+    finally:
+        db.close()
+
+    flaky = PublishWorkerPool(FlakyPublisher(), concurrency=2, backoff_base=0.01, backoff_max=0.05)
+    assert flaky.submit(ok_id).result(timeout=5) is True
+    rejecting = PublishWorkerPool(RejectingPublisher(), concurrency=1)
+    assert rejecting.submit(bad_id).result(timeout=5) is False
+    flaky.shutdown()
+    rejecting.shutdown()
+
+    db = SessionLocal()
+    try:
+        ok_post, bad_post = db.get(Post, ok_id), db.get(Post, bad_id)
+        assert (ok_post.status, ok_post.publish_attempts, ok_post.published_urn) == ("posted", 3, "urn:li:share:flaky")
+        assert (bad_post.status, bad_post.publish_attempts) == ("failed", 1)
+        assert "400" in bad_post.last_publish_error
+    finally:
+        db.close()
+
+def test_async_session_routes_and_services():
+    """Routes run on the async engine concurrently; services use the injected session."""
+    import asyncio
+    import httpx
+    from app.database import AsyncSessionLocal
+    from app.services.linkedin_service import analyze_linkedin_profile
+
+    client.post("/profile/", params={"name": "Async User", "about": "Python and data"})
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            responses = await asyncio.gather(*(ac.get("/content/list", params={"limit": 5}) for _ in range(20)))
+        async with AsyncSessionLocal() as db:
+            analysis = await analyze_linkedin_profile(db)
+        return responses, analysis
+
+    responses, analysis = asyncio.run(scenario())
+    assert all(r.status_code == 200 for r in responses)
+    assert analysis["name"] and analysis["skills"]
+
+def test_storage_pragmas_and_read_only_engine():
+    """SQLite runs in WAL mode with a busy timeout; the analytics read engine refuses writes."""
+    import asyncio
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+    from app.database import engine, AsyncReadSessionLocal
+
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() >= 1000
+        assert conn.execute(text("SELECT version_num FROM alembic_version")).scalar()
+
+    async def write_through_reader():
+        async with AsyncReadSessionLocal() as db:
+            assert await db.scalar(text("SELECT count(*) FROM posts")) >= 0
+            await db.execute(text("DELETE FROM posts"))
+
+    with pytest.raises(OperationalError):
+        asyncio.run(write_through_reader())
+
+def test_benchmark_datagen_and_percentiles(tmp_path):
+    """The synthetic data generator fills a scratch database; latency summaries use nearest-rank percentiles."""
+    from sqlalchemy import create_engine, text
+    from app.database import Base
+    from benchmarks.datagen import generate
+    from benchmarks.run import percentile, summarize
+
+    scratch = create_engine(f"sqlite:///{tmp_path / 'bench.db'}")
+    Base.metadata.create_all(bind=scratch)
+    result = generate(scratch, posts=500, chunk_size=200)
+    with scratch.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM posts")).scalar() == 500
+        posted = conn.execute(text("SELECT count(*) FROM posts WHERE status = 'posted'")).scalar()
+        assert conn.execute(text("SELECT post_count FROM analytics_rollup")).scalar() == posted == result["analytics"]
+    scratch.dispose()
+
+    values = [i / 1000 for i in range(1, 101)]
+    assert percentile(values, 50) == 0.05 and percentile(values, 99) == 0.099
+    stats = summarize(values, elapsed=2.0, errors=1)
+    assert stats["p95_ms"] == 95.0 and stats["throughput_rps"] == 50.0 and stats["errors"] == 1
+
+def test_newest_metrics_move_analytics_window_and_score():
+    """A fresh observation moves the snapshot into recent `days` windows and re-scores it."""
+    import datetime
+    from app.models.models import Analytics
+    from app.services.engagement import engagement_score
+    from app.services.timeseries import record_metrics, to_epoch
+
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    db = SessionLocal()
+    try:
+        post = Post(content="measured twice", status="posted")
+        db.add(post)
+        db.commit()
+        record_metrics(db, post.id, {"likes": 1}, ts=to_epoch(now - datetime.timedelta(days=10)))
+        snapshot = db.query(Analytics).filter(Analytics.post_id == post.id).one()
+        assert snapshot.created_at == now - datetime.timedelta(days=10)
+
+        record_metrics(db, post.id, {"likes": 40, "comments": 5}, ts=to_epoch(now))
+        db.refresh(snapshot)
+        assert snapshot.created_at == now
+        assert snapshot.engagement_score == engagement_score(40, 5, 0)
+        recent = db.query(Analytics.post_id).filter(Analytics.created_at >= now - datetime.timedelta(days=1))
+        assert post.id in {row.post_id for row in recent}
+    finally:
+        db.close()
+
+def test_metrics_endpoint(groq_stub):
+    """/metrics exposes route latency, per-route SQL, LLM and scheduler series."""
+    import time
+    from app.services.metrics import statement_operation
+
+    post_id = client.post("/content/generate", json={"prompt": "Metrics prompt"}).json()["post"]["id"]
+    client.get(f"/analytics/post/{post_id}")
+    client.post("/content/schedule", params={"post_id": post_id, "delay_minutes": 0})
+    deadline = time.time() + 5
+    while time.time() < deadline and 'outcome="posted"' not in client.get("/metrics").text:
+        time.sleep(0.05)
+
+    body = client.get("/metrics").text
+    assert 'http_request_duration_seconds_count{method="GET",route="/analytics/post/{post_id}",status="200"}' in body
+    assert 'db_queries_total{operation="select",route="/analytics/post/{post_id}"}' in body
+    assert 'db_queries_total{operation="insert",route="/content/generate"}' in body
+    assert 'llm_request_duration_seconds_count{model="llama3-8b-8192",outcome="ok"}' in body
+    assert 'llm_tokens_total{kind="completion",model="llama3-8b-8192"}' in body
+    assert 'content_generations_total{source="llm"}' in body
+    assert "scheduler_publish_lag_seconds_count" in body and "publish_queue_due" in body
+    assert statement_operation("  SELECT 1") == "select" and statement_operation("PRAGMA x") == "other"
+
+def test_background_services_run_in_one_designated_process():
+    """Only the lease holder runs background services; importing the app starts nothing."""
+    import subprocess
+    import sys
+    from app.services.background import BackgroundServices, background_services
+
+    # the app's lifespan already joined the election on this database and leads it
+    assert background_services.designated
+    other_worker = BackgroundServices(role="all", renew_every=0.1)
+    try:
+        assert other_worker.start() is False and not other_worker.designated
+    finally:
+        other_worker.stop()
+    assert background_services.designated
+    assert BackgroundServices(role="web").start() is False
+
+    probe = "import app.main; from app.services.scheduler import scheduler_service; print(scheduler_service.running)"
+    out = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, timeout=60)
+    assert out.stdout.strip() == "False"
+
+def test_leader_lease_election_and_failover():
+    """One holder at a time; a new leader bumps the term on release, expiry or takeover."""
+    import time
+    import uuid
+    from app.services.leader import LeaderElector
+
+    name = f"test-{uuid.uuid4().hex[:8]}"
+    events = []
+    a = LeaderElector(name, ttl=0.5, holder="a", on_elected=lambda: events.append("a+"),
+                      on_demoted=lambda: events.append("a-"))
+    b = LeaderElector(name, ttl=0.5, holder="b", on_elected=lambda: events.append("b+"),
+                      on_demoted=lambda: events.append("b-"))
+
+    assert a.step() and not b.step() and a.term == 1
+    assert a.step() and a.term == 1  # renewing keeps the term
+    a.release()
+    assert b.step() and b.term == 2
+    assert not a.step()  # a saw b's lease and stepped down
+    assert events == ["a+", "b+", "a-"]
+
+    time.sleep(0.6)  # b stops renewing: its lease expires
+    assert a.try_acquire() and a.term == 3
+    assert not b.step() and not b.is_leader
+    assert events[-1] == "b-"
+
+def test_trend_ingestion_dedup_and_cached_search(tmp_path):
+    """Feeds are ingested incrementally, deduped by content, and served from the keyword index."""
+    import os
+    import time
+    import uuid
+    from app.services.trends import TrendIndex, ingest_feeds, extract_keywords
+
+    tag = f"zq{uuid.uuid4().hex[:6]}"
+    rss = tmp_path / "feed.xml"
+    items = [
+        (f"{tag} robotics startups raise record funding", "Mon, 12 Oct 2026 09:00:00 GMT"),
+        (f"{tag} robotics in warehouses", "Wed, 14 Oct 2026 09:00:00 GMT"),
+        (f"{tag} robotics in warehouses", "Wed, 14 Oct 2026 09:00:00 GMT"),  # duplicate story
+    ]
+
+    def write_feed(entries):
+        body = "".join(f"<item><title>{t}</title><link>https://example.com/{i}</link>"
+                       f"<description>News about {tag}.</description><pubDate>{d}</pubDate></item>"
+                       for i, (t, d) in enumerate(entries))
+        rss.write_text(f'<?xml version="1.0"?><rss version="2.0"><channel>{body}</channel></rss>')
+
+    write_feed(items)
+    first = ingest_feeds([str(rss)])
+    assert first["added"] == 2 and first["feeds"][0]["seen"] == 3
+    assert ingest_feeds([str(rss)])["feeds"][0]["status"] == "unchanged"
+
+    index = TrendIndex(ttl=60)
+    results = index.search(f"{tag} Robotics", limit=5)
+    assert [r["title"] for r in results] == [items[1][0], items[0][0]]  # newest first
+    assert results[0]["source"] == "feed.xml"
+
+    # appending an item only stores the new one; the index picks it up incrementally
+    items.append((f"{tag} robotics startups go public", "Fri, 16 Oct 2026 09:00:00 GMT"))
+    write_feed(items)
+    os.utime(rss, ns=(time.time_ns(), time.time_ns() + 1))
+    assert ingest_feeds([str(rss)])["added"] == 1
+    index.invalidate()
+    assert index.search(f"{tag} startup", limit=5)[0]["title"] == items[3][0]
+
+    started = time.perf_counter()
+    assert index.search(f"{tag} startup", limit=5) is index.search(f"{tag} startup", limit=5)
+    assert (time.perf_counter() - started) / 2 < 0.001
+    assert "robotic" in extract_keywords("Robotics robotics startups", "")
+
+    client.post("/trends/ingest")
+    data = client.get("/trends/", params={"industry": "fintech"}).json()
+    assert data["source"] == "feeds" and "Four-day" in data["trends"][0]
+
+def test_taxonomy_matcher_word_boundaries_and_synonyms():
+    """The compiled taxonomy matches whole words and synonyms in one pass and caches by content."""
+    from types import SimpleNamespace
+    from app.services.taxonomy import Taxonomy, get_taxonomy
+    from app.services.linkedin_service import extract_skills_and_interests
+
+    taxonomy = get_taxonomy()
+    assert taxonomy.extract("I maintain a detailed ledger")["skills"] == []  # no "ai" in "maintain"
+    found = taxonomy.extract("Deep-learning engineer: PyTorch, C++ and Postgres. Loves startups & climate tech.")
+    assert found["skills"] == ["Machine Learning", "C++", "SQL"]
+    assert found["interests"] == ["Machine Learning", "Entrepreneurship", "Sustainability"]
+    assert taxonomy.extract("x" * 10) is taxonomy.extract("x" * 10)
+
+    profile = SimpleNamespace(headline="Growth marketer", about="Data-driven marketing for AI startups")
+    skills, interests = extract_skills_and_interests(profile)
+    assert skills == ["Data Analysis", "Digital Marketing", "AI", "Communication", "Leadership"]
+    assert interests == ["Data Science", "Digital Marketing", "AI Research", "Entrepreneurship"]
+
+    # thousands of terms compile into one automaton; longest match wins on overlaps
+    big = Taxonomy({"skills": {f"Skill {i}": [f"term{i}", f"term{i} advanced"] for i in range(5000)}})
+    assert len(big) == 15000
+    assert big.extract("knows term42 advanced and term4999, not term50000")["skills"] == ["Skill 42", "Skill 4999"]
+
+def test_full_text_search_ranks_filters_and_tracks_edits(monkeypatch):
+    """/content/search uses the FTS index: bm25 ranking, snippets, filters, and triggers on edit/delete."""
+    import uuid
+    from app.services.search import fts5_query
+
+    tag = f"zx{uuid.uuid4().hex[:8]}"
+    db = SessionLocal()
+    try:
+        strong = Post(prompt=f"{tag} kubernetes", content=f"Scaling {tag} clusters with kubernetes autoscaling.",
+                      hashtags=f"#{tag} #kubernetes", status="posted")
+        weak = Post(prompt="misc", content=f"A short mention of {tag} among other cloud topics.", status="draft")
+        db.add_all([strong, weak])
+        db.commit()
+        strong_id, weak_id = strong.id, weak.id
+
+        data = client.get("/content/search", params={"q": tag}).json()
+        assert [r["id"] for r in data["results"]] == [strong_id, weak_id]
+        assert f"<mark>{tag}</mark>" in data["results"][0]["snippet"]
+        assert [r["id"] for r in client.get("/content/search", params={"q": tag, "status": "draft"}).json()["results"]] == [weak_id]
+        assert client.get("/content/search", params={"q": f'"{tag} clusters"'}).json()["total"] == 1
+        assert client.get("/content/search", params={"q": f"{tag[:6]}* autoscaling"}).json()["total"] == 1
+        assert client.get("/content/search", params={"q": " "}).status_code == 400
+
+        # broad queries only rank the newest SEARCH_RANK_CANDIDATES matches
+        monkeypatch.setattr("app.services.search.RANK_CANDIDATES", 1)
+        assert [r["id"] for r in client.get("/content/search", params={"q": tag}).json()["results"]] == [weak_id]
+        # ... counted after the filters, so an older filtered match still shows up
+        posted = client.get("/content/search", params={"q": tag, "status": "posted"}).json()["results"]
+        assert [r["id"] for r in posted] == [strong_id]
+        monkeypatch.undo()
+
+        # triggers keep the index in sync with edits and deletes
+        weak.content = "Rewritten without the tag"
+        db.delete(strong)
+        db.commit()
+        assert client.get("/content/search", params={"q": tag}).json()["total"] == 0
+        db.delete(weak)
+        db.commit()
+    finally:
+        db.close()
+    assert fts5_query('ai OR "NEAR(x" -y*') == '"ai" "OR" "NEAR x" "y"*'
+
+def test_near_duplicate_drafts_are_flagged_or_blocked(monkeypatch):
+    """The LSH index flags near-duplicate drafts on generate/schedule and blocks them when configured."""
+    import uuid
+    import random
+    from app.services import dedup
+    from app.services.publisher import PublishWorkerPool, get_publisher
+
+    rnd = random.Random(3)
+    vocab = [f"w{uuid.uuid4().hex[:6]}" for _ in range(300)]
+    prompt = " ".join(rnd.choice(vocab) for _ in range(120))
+    edited = prompt.replace(prompt.split()[60], "changed", 1)
+    unrelated = " ".join(rnd.choice(vocab) for _ in range(120))
+
+    sig = dedup.minhash(prompt)
+    assert dedup.similarity(sig, dedup.minhash(edited)) >= 0.8
+    assert dedup.similarity(sig, dedup.minhash(unrelated)) < 0.3
+
+    first = client.post("/content/generate", json={"prompt": prompt}).json()
+    assert first["near_duplicate"] is None
+    original_id = first["post"]["id"]
+    second = client.post("/content/generate", params={"no_cache": True}, json={"prompt": edited}).json()
+    assert second["near_duplicate"]["post_id"] == original_id
+    assert client.post("/content/generate", json={"prompt": unrelated}).json()["near_duplicate"] is None
+
+    batch = client.post("/content/generate/batch", json={"prompts": [prompt[::-1], prompt[::-1]]}).json()
+    assert batch["results"][0]["near_duplicate"] is None
+    assert batch["results"][1]["near_duplicate"] == {"index": 0, "similarity": 1.0}
+
+    monkeypatch.setattr(dedup, "NEAR_DUPLICATE_ACTION", "block")
+    response = client.post("/content/generate", json={"prompt": edited})
+    assert response.status_code == 409
+    assert response.json()["detail"]["near_duplicate"] == {"post_id": second["post"]["id"], "similarity": 1.0}
+
+    # scheduling a copy of a scheduled post is refused; publishing a copy of a posted one fails
+    assert client.post("/content/schedule", params={"post_id": original_id, "delay_minutes": 600}).status_code == 200
+    response = client.post("/content/schedule", params={"post_id": second["post"]["id"], "delay_minutes": 600})
+    assert response.status_code == 409
+    db = SessionLocal()
+    try:
+        db.query(Post).filter(Post.id == original_id).update({"status": "posted"})
+        db.commit()
+        pool = PublishWorkerPool(get_publisher("mock"), concurrency=1)
+        assert pool.process(second["post"]["id"], require_claim=False) is False
+        pool.shutdown()
+        duplicate = db.get(Post, second["post"]["id"])
+        assert duplicate.status == "failed" and f"post {original_id}" in duplicate.last_publish_error
+    finally:
+        db.close()
+
+def test_near_duplicate_candidates_filter_status_before_cap():
+    """A posted duplicate is found even when more than MAX_CANDIDATES drafts share its buckets."""
+    import uuid
+    from app.services import dedup
+
+    text = " ".join(f"c{uuid.uuid4().hex[:6]}" for _ in range(80))
+    signature = dedup.minhash(text)
+    db = SessionLocal()
+    try:
+        drafts = [Post(prompt="crowd", content=text, status="draft") for _ in range(dedup.MAX_CANDIDATES + 20)]
+        posted = Post(prompt="crowd", content=text, status="posted")
+        db.add_all(drafts + [posted])
+        db.flush()
+        dedup.index_signatures(db, [(p.id, signature) for p in drafts + [posted]])
+        db.commit()
+
+        match = dedup.find_near_duplicate(db, signature, statuses=("posted",))
+        assert match is not None and match["post_id"] == posted.id
+    finally:
+        db.rollback()
+        db.close()
+
+def test_hashtag_index_aggregates_engagement_and_suggests():
+    """Hashtags are case-folded into post_hashtags; /analytics/hashtags aggregates them in SQL."""
+    import uuid
+    from app.models.models import Analytics, PostHashtag
+    from app.services.hashtags import parse_hashtags, add_marker, index_hashtags, invalidate_suggestions
+
+    assert parse_hashtags("#AI great #ai #Data_Science #1 #AutoPosted") == [("ai", "AI"), ("data_science", "Data_Science")]
+    assert add_marker("#AI") == "#AI #AutoPosted"
+    assert add_marker(add_marker("#AI")) == "#AI #AutoPosted"  # republishing doesn't grow the string
+
+    strong, weak = f"Zq{uuid.uuid4().hex[:6]}", f"Zw{uuid.uuid4().hex[:6]}"
+    db = SessionLocal()
+    try:
+        posts = [
+            Post(content="a", hashtags=f"#{strong} #{weak}", status="posted"),
+            Post(content="b", hashtags=f"#{strong.lower()} #{strong.upper()} #AutoPosted", status="posted"),
+            Post(content="c", hashtags=f"#{weak}", status="posted"),
+        ]
+        db.add_all(posts)
+        db.flush()
+        ids = [p.id for p in posts]
+        index_hashtags(db, [(p.id, p.hashtags) for p in posts])
+        for post, likes in zip(posts, (3_000_000, 1_000_000, 10)):
+            db.add(Analytics(post_id=post.id, likes=likes))
+        db.commit()
+
+        rows = {r["tag"]: r for r in client.get("/analytics/hashtags", params={"min_posts": 2, "limit": 100}).json()["hashtags"]}
+        assert rows[strong.casefold()]["posts"] == 2 and rows[strong.casefold()]["hashtag"] == f"#{strong}"
+        assert rows[strong.casefold()]["likes"] == 4_000_000 and rows[weak.casefold()]["likes"] == 3_000_010
+        assert "autoposted" not in rows
+        top = client.get("/analytics/hashtags", params={"limit": 1}).json()["hashtags"][0]
+        assert top["tag"] == strong.casefold() and top["avg_engagement"] == 2_000_000
+        assert client.get("/analytics/hashtags", params={"sort": "bogus"}).status_code == 400
+
+        invalidate_suggestions()
+        assert client.get("/analytics/hashtags/suggestions", params={"limit": 2}).json()["suggestions"] == [f"#{strong}", f"#{weak}"]
+        suggestions = client.get("/analytics/hashtags/suggestions", params={"prompt": f"notes on {weak.lower()}"}).json()
+        assert suggestions["suggestions"][0] == f"#{weak}"
+    finally:
+        db.query(Analytics).filter(Analytics.post_id.in_(ids)).delete(synchronize_session=False)
+        db.query(PostHashtag).filter(PostHashtag.post_id.in_(ids)).delete(synchronize_session=False)
+        db.query(Post).filter(Post.id.in_(ids)).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+        invalidate_suggestions()
+
+def test_export_streams_posts_with_analytics():
+    """/content/export streams NDJSON or CSV joined to analytics, gzip-encoded, with incremental `since`."""
+    import csv
+    import io
+    import datetime
+    from app.models.models import Analytics
+
+    db = SessionLocal()
+    try:
+        post = Post(content='Exported, with "quotes"\nand a newline', hashtags="#Export", status="posted")
+        db.add(post)
+        db.flush()
+        db.add(Analytics(post_id=post.id, likes=7, comments=2, shares=1, impressions=90))
+        db.commit()
+        post_id = post.id
+
+        response = client.get("/content/export")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        assert response.headers["content-encoding"] == "gzip"  # decoded transparently by the client
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        ids = [r["post_id"] for r in rows]
+        assert ids == sorted(ids) and len(ids) == len(set(ids))
+        mine = next(r for r in rows if r["post_id"] == post_id)
+        assert mine["content"] == 'Exported, with "quotes"\nand a newline'
+        assert (mine["likes"], mine["engagement_score"]) == (7, 14)
+
+        response = client.get("/content/export", params={"format": "csv"}, headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in response.headers
+        records = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(records) == len(rows)
+        assert next(r for r in records if r["post_id"] == str(post_id))["content"] == mine["content"]
+
+        # incremental: the watermark of a finished export excludes everything already seen
+        watermark = response.headers["x-export-watermark"]
+        since = (datetime.datetime.utcnow() - datetime.timedelta(minutes=5)).isoformat()
+        assert post_id in [json.loads(l)["post_id"] for l in client.get("/content/export", params={"since": since}).text.splitlines()]
+        later = (datetime.datetime.fromisoformat(watermark) + datetime.timedelta(minutes=5)).isoformat()
+        assert client.get("/content/export", params={"since": later}).text == ""
+        assert client.get("/content/export", params={"format": "xml"}).status_code == 400
+    finally:
+        db.query(Analytics).filter(Analytics.post_id == post_id).delete()
+        db.query(Post).filter(Post.id == post_id).delete()
+        db.commit()
+        db.close()
+
+def test_bulk_import_validates_batches_and_is_idempotent():
+    """/content/import streams NDJSON/CSV into batched inserts keyed by external_id."""
+    import gzip
+    import uuid
+    from app.models.models import Analytics, PostExternalId, PostHashtag
+    from app.services.analytics_rollup import get_rollup
+
+    run = uuid.uuid4().hex[:8]
+    lines = [
+        {"external_id": f"{run}-1", "content": "Imported draft", "hashtags": "#Imported"},
+        {"external_id": f"{run}-2", "content": "Old hit", "posted_at": "2024-03-01T09:00:00+02:00",
+         "analytics": {"likes": 40, "comments": 5, "shares": 2, "impressions": 900}},
+        {"external_id": f"{run}-3", "content": "Queued", "scheduled_time": "2099-01-01T09:00:00Z"},
+        {"external_id": f"{run}-1", "content": "Same id again"},
+        {"external_id": f"{run}-4", "content": " ", "status": "draft"},
+        {"external_id": f"{run}-5", "content": "Bad status", "status": "scheduled"},
+    ]
+    body = "\n".join(json.dumps(line) for line in lines) + "\n{not json\n"
+    db = SessionLocal()
+    try:
+        before = get_rollup(db).total_likes
+        response = client.post("/content/import", content=gzip.compress(body.encode()),
+                               headers={"Content-Encoding": "gzip", "Content-Type": "application/x-ndjson"})
+        assert response.status_code == 200
+        summary = response.json()
+        assert {k: summary[k] for k in ("rows", "imported", "skipped", "invalid", "scheduled")} == \
+            {"rows": 7, "imported": 3, "skipped": 1, "invalid": 3, "scheduled": 1}
+        assert [e["line"] for e in summary["errors"]] == [5, 6, 7]
+        assert "content" in summary["errors"][0]["error"] and "scheduled_time" in summary["errors"][1]["error"]
+
+        ids = dict(db.query(PostExternalId.external_id, PostExternalId.post_id)
+                   .filter(PostExternalId.external_id.like(f"{run}-%")).all())
+        hit = db.get(Post, ids[f"{run}-2"])
+        assert hit.status == "posted" and hit.posted_at.isoformat() == "2024-03-01T07:00:00"
+        assert db.query(Analytics).filter(Analytics.post_id == hit.id).one().engagement_score == 56
+        assert db.get(Post, ids[f"{run}-3"]).status == "scheduled"
+        db.expire_all()
+        assert get_rollup(db).total_likes == before + 40
+
+        # re-running is a no-op; CSV rows (quoted newlines included) join the same id space
+        assert client.post("/content/import", content=body.encode()).json()["imported"] == 0
+        csv_body = f'external_id,content,likes\n{run}-1,dup,\n{run}-6,"two\nlines",3\n'
+        summary = client.post("/content/import", params={"format": "csv"}, content=csv_body).json()
+        assert (summary["imported"], summary["skipped"], summary["invalid"]) == (1, 1, 0)
+        ids = dict(db.query(PostExternalId.external_id, PostExternalId.post_id)
+                   .filter(PostExternalId.external_id.like(f"{run}-%")).all())
+        assert db.get(Post, ids[f"{run}-6"]).content == "two\nlines"
+        assert client.post("/content/import", params={"format": "xml"}, content=b"").status_code == 400
+    finally:
+        post_ids = list(ids.values())
+        db.query(Analytics).filter(Analytics.post_id.in_(post_ids)).delete(synchronize_session=False)
+        db.query(PostHashtag).filter(PostHashtag.post_id.in_(post_ids)).delete(synchronize_session=False)
+        db.query(PostExternalId).filter(PostExternalId.post_id.in_(post_ids)).delete(synchronize_session=False)
+        db.query(Post).filter(Post.id.in_(post_ids)).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+def test_bulk_import_loses_external_id_race_gracefully():
+    """An external_id committed by a concurrent import after the existence check becomes a skip."""
+    import uuid
+    from sqlalchemy import event
+    from app.models.models import PostExternalId
+    from app.services import importer
+
+    run = uuid.uuid4().hex[:8]
+    rows = [importer.ImportRow(external_id=f"{run}-{n}", content=f"Raced {n}") for n in (1, 2)]
+
+    raced = []
+
+    def concurrent_import(conn, cursor, statement, *args):
+        if statement.startswith("INSERT INTO posts") and not raced:
+            raced.append(1)
+            other = SessionLocal()
+            importer.insert_batch(other, rows[:1])
+            other.close()
+    event.listen(engine, "before_cursor_execute", concurrent_import)
+
+    db = SessionLocal()
+    try:
+        assert importer.insert_batch(db, rows) == {"imported": 1, "skipped": 1, "scheduled": 0}
+        ids = dict(db.query(PostExternalId.external_id, PostExternalId.post_id)
+                   .filter(PostExternalId.external_id.like(f"{run}-%")).all())
+        assert len(ids) == 2
+        assert db.query(Post).filter(Post.content.like("Raced %"), Post.id.notin_(ids.values())).count() == 0
+    finally:
+        event.remove(engine, "before_cursor_execute", concurrent_import)
+        db.query(PostExternalId).filter(PostExternalId.external_id.like(f"{run}-%")).delete(synchronize_session=False)
+        db.query(Post).filter(Post.content.like("Raced %")).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+
+def test_llm_gateway_coalesces_hedges_and_breaks(groq_stub, monkeypatch):
+    """Identical calls share one request, slow calls are hedged, a failing model is short-circuited."""
+    import time
+    import asyncio
+    from app.services import llm_gateway
+    from app.services.llm_client import LLMError
+
+    messages = [{"role": "user", "content": "gateway"}]
+
+    # single-flight: five identical concurrent calls, one provider request
+    gateway = llm_gateway.LLMGateway(fallback_models=[], hedge=False)
+    groq_stub.latency = 0.2
+
+    async def identical():
+        return await asyncio.gather(*(gateway.complete(messages, model="m1") for _ in range(5)))
+    assert len(set(asyncio.run(identical()))) == 1
+    assert groq_stub.request_count == 1
+
+    # hedging: the first request stalls past the recent p95, the hedge answers
+    gateway = llm_gateway.LLMGateway(fallback_models=[], hedge=True)
+    monkeypatch.setattr(llm_gateway, "HEDGE_MIN_SECONDS", 0.05)
+    for _ in range(llm_gateway.HEDGE_MIN_SAMPLES):
+        gateway.latency("m1").record(0.05)
+    delays = iter([2.0])
+    groq_stub.delay = lambda: next(delays, 0.0)
+    start = time.perf_counter()
+    assert asyncio.run(gateway.complete(messages, model="m1")).startswith("Stub LinkedIn post")
+    assert time.perf_counter() - start < 1.0
+    assert groq_stub.request_count == 3
+
+    # breaker: two failures open m1's circuit; calls then skip it without a request
+    groq_stub.delay = lambda: 0.0
+    groq_stub.status = 503
+    gateway = llm_gateway.LLMGateway(fallback_models=["backup"], hedge=False)
+    gateway.breakers["m1"] = llm_gateway.CircuitBreaker("m1", failures=2, cooldown=0.3)
+    gateway.breakers["backup"] = llm_gateway.CircuitBreaker("backup", failures=100)
+    for _ in range(2):
+        with pytest.raises(LLMError):
+            asyncio.run(gateway.complete(messages, model="m1"))
+    assert gateway.breakers["m1"].state == llm_gateway.OPEN
+    groq_stub.status = 200
+    before = groq_stub.request_count
+    assert asyncio.run(gateway.complete(messages, model="m1")).startswith("Stub")
+    assert groq_stub.request_count == before + 1
+    assert groq_stub.requests[-1]["model"] == "backup"  # failed over without trying m1
+
+    # after the cooldown one trial call closes the circuit again
+    time.sleep(0.3)
+    asyncio.run(gateway.complete(messages, model="m1"))
+    assert groq_stub.requests[-1]["model"] == "m1"
+    assert gateway.breakers["m1"].state == llm_gateway.CLOSED
+
+def test_llm_junk_reply_falls_back_and_counts_as_failure(groq_stub):
+    """A 200 whose body isn't a completion is an LLMError: the breaker counts it and generation falls back."""
+    import asyncio
+    from app.services import llm_gateway
+
+    messages = [{"role": "user", "content": "junk"}]
+    gateway = llm_gateway.LLMGateway(fallback_models=[], hedge=False)
+    gateway.breakers["m1"] = llm_gateway.CircuitBreaker("m1", failures=2)
+    for body in (b"<html>bad gateway</html>", b'{"choices": []}'):
+        groq_stub.raw_body = body
+        with pytest.raises(llm_gateway.LLMError):
+            asyncio.run(gateway.complete(messages, model="m1"))
+    assert gateway.breakers["m1"].state == llm_gateway.OPEN
+
+    groq_stub.raw_body = b"not json"
+    response = client.post("/content/generate", json={"prompt": "Junk provider reply"})
+    assert response.status_code == 200
+    assert response.json()["source"] == "fallback"
+
+def test_generate_async_job_long_poll_and_callback(groq_stub, monkeypatch):
+    """?async=true queues a persisted job; long-poll and callback both see the result."""
+    import threading
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from app.services import generation_jobs
+
+    # callbacks to internal addresses are refused unless the host is allow-listed
+    for url in ("http://127.0.0.1:9/x", "http://localhost/x", "http://169.254.169.254/latest", "http://10.0.0.5/"):
+        with pytest.raises(ValueError):
+            generation_jobs.check_callback_url(url)
+    refused = client.post("/content/generate", params={"async": True},
+                          json={"prompt": "x", "callback_url": "http://127.0.0.1:9/x"})
+    assert refused.status_code == 422
+    monkeypatch.setattr(generation_jobs, "CALLBACK_ALLOWED_HOSTS", {"127.0.0.1"})
+
+    delivered = []
+    received = threading.Event()
+
+    class Callback(BaseHTTPRequestHandler):
+        def do_POST(self):
+            delivered.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+            self.send_response(204)
+            self.end_headers()
+            received.set()
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Callback)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        groq_stub.latency = 0.3
+        response = client.post("/content/generate", params={"async": True}, json={
+            "prompt": "Queued generation prompt", "callback_url": f"http://127.0.0.1:{server.server_port}/done",
+        })
+        assert response.status_code == 202
+        job_id = response.json()["job_id"]
+        assert response.headers["location"] == f"/content/jobs/{job_id}"
+
+        job = client.get(f"/content/jobs/{job_id}", params={"wait": 10}).json()
+        assert job["status"] == "succeeded"
+        assert job["wait_seconds"] is not None
+        assert job["result"]["post"]["id"] == job["post_id"]
+
+        assert received.wait(5)
+        assert delivered[0]["job_id"] == job_id and delivered[0]["status"] == "succeeded"
+
+        stats = client.get("/content/jobs/stats").json()
+        assert {"queued", "running", "oldest_queued_seconds", "workers"} <= set(stats)
+        assert stats["workers"] > 0
+        assert client.get("/content/jobs/missing").status_code == 404
+        bad = client.post("/content/generate", params={"async": True, "callback_url": "ftp://x"}, json={"prompt": "x"})
+        assert bad.status_code == 422
+    finally:
+        server.shutdown()
+
+def test_generation_worker_survives_database_errors(monkeypatch):
+    """A failing claim or status write is logged and retried; the worker keeps running."""
+    import asyncio
+    from app.services import generation_jobs
+
+    monkeypatch.setattr(generation_jobs, "WORKER_ERROR_BACKOFF_SECONDS", 0.01)
+    monkeypatch.setattr(generation_jobs, "JOB_POLL_SECONDS", 0.01)
+    queue = generation_jobs.GenerationQueue(workers=1)
+    claims = []
+
+    async def flaky_claim():
+        claims.append(1)
+        if len(claims) == 1:
+            raise RuntimeError("database is locked")
+        return None
+
+    queue.claim = flaky_claim
+
+    async def run():
+        queue._wake = asyncio.Event()
+        worker = asyncio.create_task(queue._worker())
+        await asyncio.sleep(0.1)
+        alive = not worker.done()
+        worker.cancel()
+        await asyncio.gather(worker, return_exceptions=True)
+        return alive
+    assert asyncio.run(run())
+    assert len(claims) > 2
+
+    real_factory, opened = queue.session_factory, []
+
+    def flaky_factory():
+        opened.append(1)
+        if len(opened) == 1:
+            raise RuntimeError("database is locked")
+        return real_factory()
+
+    queue.session_factory = flaky_factory
+    job = generation_jobs.GenerationJob(id="no-such-job", started_at=None)
+    # the retry reaches the database, where no running claim matches
+    assert asyncio.run(queue._finish(job, {"status": "failed"})) is False
+    assert len(opened) == 2
+
+def test_generation_finish_skips_a_reclaimed_job():
+    """A run whose job was re-queued and claimed again doesn't overwrite the new run's claim."""
+    import uuid
+    import asyncio
+    from datetime import datetime, timedelta
+    from app.services import generation_jobs
+
+    started = datetime.utcnow() - timedelta(hours=1)
+    db = SessionLocal()
+    job = generation_jobs.GenerationJob(id=uuid.uuid4().hex, prompt="Reclaimed job", status="running",
+                                        started_at=started, created_at=started, attempts=1)
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    db.expunge(job)
+    db.close()
+
+    queue = generation_jobs.GenerationQueue(workers=1)
+    # meanwhile the stale sweep re-queued it and another worker claimed it
+    db = SessionLocal()
+    db.query(generation_jobs.GenerationJob).filter_by(id=job.id).update(
+        {"status": "running", "started_at": datetime.utcnow()})
+    db.commit()
+    db.close()
+
+    assert asyncio.run(queue._finish(job, {"status": "succeeded", "finished_at": datetime.utcnow()})) is False
+    db = SessionLocal()
+    assert db.get(generation_jobs.GenerationJob, job.id).status == "running"
+    db.close()
+
+def test_election_does_not_wait_for_engagement_sync(monkeypatch):
+    """The full-table score sync runs on the periodic scheduler, so the lease thread returns at once."""
+    import time
+    import threading
+    from app.services import engagement
+    from app.services.background import background_services
+
+    done = threading.Event()
+
+    def slow_sync(db):
+        time.sleep(2.0)
+        done.set()
+        return 0
+
+    monkeypatch.setattr(engagement, "sync_engagement_scores", slow_sync)
+    start = time.monotonic()
+    background_services._on_elected()
+    assert time.monotonic() - start < 1.5
+    assert done.wait(10)
+
+def test_async_url_swaps_any_sync_driver():
+    """The async engine URL replaces whatever sync driver the configured URL names."""
+    from app.database import to_async_url
+
+    assert to_async_url("sqlite+pysqlite:////tmp/a.db") == "sqlite+aiosqlite:////tmp/a.db"
+    assert to_async_url("postgresql+psycopg2://u:p%40ss@db:5432/app") == "postgresql+asyncpg://u:p%40ss@db:5432/app"
+    assert to_async_url("postgres://u:p@db/app") == "postgresql+asyncpg://u:p@db/app"